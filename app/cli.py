@@ -1,32 +1,90 @@
+from collections import Counter, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from itertools import chain, repeat
 from pathlib import Path
-import io
+from types import SimpleNamespace
+import asyncio
 import json
+import logging
+import multiprocessing
 import os
+import shutil
+import tempfile
+import time
 from urllib.parse import unquote_plus
 
-import boto3
 import click
 from flask import current_app
 from flask.cli import with_appcontext
 from flask_migrate.cli import db as db_cli
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from pypdf import PdfReader
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import make_url
+import sqlalchemy as sa
 import tiktoken
 
 from app import db
+from app.embeddings import (
+    AsyncOpenAIEmbedder,
+    BaseEmbedder,
+    CachedEmbedder,
+    EmbedderError,
+    EmbeddingWriter,
+    LocalEmbedder,
+    OpenAIEmbedder,
+    build_embedding_cache,
+    content_hash,
+    get_embedder,
+    get_rate_governor,
+    iter_batches,
+    iter_embeddings,
+    openai_max_retries,
+)
+from app.embeddings.cache import normalized_hash
+from app.embeddings.metrics import (
+    JobTimer,
+    TimedEmbedder,
+    record_embedding_job,
+    start_metrics_server,
+)
+from app.embeddings.embedders import (
+    DEFAULT_EMBEDDING_BATCH_MAX_TOKENS,
+    DEFAULT_EMBEDDING_BATCH_SIZE,
+)
 from app.helpers.api_helpers import build_password_hash
+from app.helpers.aws_helpers import download_s3_fileobj, get_s3_client, s3_transfer_options
 from app.models.document import Document
 from app.models.document_embedding import DocumentEmbedding
 from app.models.user import User
+from app.queues import (
+    QueueError,
+    VisibilityHeartbeat,
+    build_queue,
+    default_heartbeat_interval,
+)
 from app.storage import get_storage
+from app.storage.cache import CachedStorageService
 
 
 DEFAULT_CHUNK_TOKENS = 800
 DEFAULT_CHUNK_OVERLAP = 100
-DEFAULT_BATCH_SIZE = 50
+DEFAULT_BATCH_SIZE = 500
 DEFAULT_SQS_WAIT_TIME = 10
+DEFAULT_PDF_PARALLEL_MIN_PAGES = 50
+DEFAULT_PDF_PAGES_PER_TASK = 25
+MAX_PENDING_TEXT = 64 * 1024
+QUEUE_DELETE_ATTEMPTS = 3
+QUEUE_DELETE_RETRY_DELAY = 0.5
+QUEUE_ACK_FLUSH_INTERVAL = 1.0
+DEFAULT_ASYNC_MAX_JOBS = 32
+DEFAULT_ASYNC_EMBEDDING_REQUESTS = 256
 
 
 def _validate_chunking_options(chunk_size, chunk_overlap):
@@ -38,7 +96,7 @@ def _validate_chunking_options(chunk_size, chunk_overlap):
         raise click.ClickException("--chunk-overlap must be less than --chunk-size.")
 
 
-def _openai_client_and_model():
+def _openai_settings():
     use_openai = current_app.config.get("USE_OPENAI", "true")
     if str(use_openai).lower() not in {"1", "true", "yes", "y"}:
         raise click.ClickException("USE_OPENAI is disabled; no OpenAI embedder available.")
@@ -52,10 +110,15 @@ def _openai_client_and_model():
     if not model:
         raise click.ClickException("OPENAI_EMBEDDING_MODEL is required.")
 
+    return api_key, model
+
+
+def _openai_client_and_model():
+    api_key, model = _openai_settings()
     return OpenAI(api_key=api_key), model
 
 
-def _local_embedder():
+def _local_embedder_settings():
     model_path = current_app.config.get("LOCAL_EMBEDDING_MODEL_PATH") or os.getenv(
         "LOCAL_EMBEDDING_MODEL_PATH"
     )
@@ -63,15 +126,6 @@ def _local_embedder():
         raise click.ClickException("LOCAL_EMBEDDING_MODEL_PATH is required.")
     if not os.path.exists(model_path):
         raise click.ClickException(f"Local model not found: {model_path}")
-    if not model_path.lower().endswith(".gguf"):
-        click.echo("Warning: local model does not look like a .gguf file.")
-
-    try:
-        from llama_cpp import Llama
-    except ImportError as exc:
-        raise click.ClickException(
-            "llama-cpp-python is not installed. Add it to requirements and install."
-        ) from exc
 
     n_ctx = int(
         current_app.config.get("LOCAL_EMBEDDING_N_CTX", 2048)
@@ -85,134 +139,275 @@ def _local_embedder():
         current_app.config.get("LOCAL_EMBEDDING_N_BATCH", 64)
         or os.getenv("LOCAL_EMBEDDING_N_BATCH", "64")
     )
+    return {
+        "model_path": model_path,
+        "n_ctx": n_ctx,
+        "n_threads": n_threads,
+        "n_batch": n_batch,
+    }
+
+
+def _local_embedder(settings=None):
+    settings = settings or _local_embedder_settings()
+    if not settings["model_path"].lower().endswith(".gguf"):
+        click.echo("Warning: local model does not look like a .gguf file.")
+
+    try:
+        from llama_cpp import Llama
+    except ImportError as exc:
+        raise click.ClickException(
+            "llama-cpp-python is not installed. Add it to requirements and install."
+        ) from exc
+
+    return Llama(embedding=True, **settings)
+
+
+def _park_existing_embeddings(document_id):
+    """Move existing rows to negative chunk indexes and map them by content hash.
+
+    Parked rows can be re-indexed into the new chunk order without clashing
+    with the ``(document_id, chunk_index)`` unique constraint. Rows that are
+    not reused stay negative and are removed by _delete_stale_embeddings.
+    A failed job can leave parked rows behind, so everything is shifted
+    below the current minimum; the constraint is checked row by row.
+    """
+    min_index, max_index = (
+        db.session.query(
+            db.func.min(DocumentEmbedding.chunk_index),
+            db.func.max(DocumentEmbedding.chunk_index),
+        )
+        .filter(DocumentEmbedding.document_id == document_id)
+        .one()
+    )
+    if max_index is None:
+        return {}
 
-    return Llama(
-        model_path=model_path,
-        embedding=True,
-        n_ctx=n_ctx,
-        n_threads=n_threads,
-        n_batch=n_batch,
+    offset = max_index - min(min_index, 0) + 1
+    DocumentEmbedding.query.filter_by(document_id=document_id).update(
+        {DocumentEmbedding.chunk_index: DocumentEmbedding.chunk_index - offset},
+        synchronize_session=False,
     )
+    rows = (
+        db.session.query(DocumentEmbedding.id, DocumentEmbedding.content_hash)
+        .filter(DocumentEmbedding.document_id == document_id)
+        .filter(DocumentEmbedding.content_hash.isnot(None))
+        .all()
+    )
+    reusable = {}
+    for row_id, row_hash in rows:
+        reusable.setdefault(row_hash, []).append(row_id)
+    return reusable
+
 
+def _reindex_embeddings(updates):
+    if updates:
+        db.session.execute(sa.update(DocumentEmbedding), updates)
 
-def _delete_existing_embeddings(document_id):
-    return DocumentEmbedding.query.filter_by(document_id=document_id).delete(
-        synchronize_session=False
+
+def _delete_stale_embeddings(document_id):
+    return (
+        DocumentEmbedding.query.filter_by(document_id=document_id)
+        .filter(DocumentEmbedding.chunk_index < 0)
+        .delete(synchronize_session=False)
     )
 
 
-def _embed_document_chunks(document, chunks, embed_fn, metadata=None):
-    existing = _delete_existing_embeddings(document.id)
-    if existing:
-        click.echo(f"Removed existing embeddings: {existing}")
+def _embedding_batch_options(batch_size=None):
+    if batch_size is None:
+        batch_size = int(
+            current_app.config.get("EMBEDDING_BATCH_SIZE")
+            or os.getenv("EMBEDDING_BATCH_SIZE", DEFAULT_EMBEDDING_BATCH_SIZE)
+        )
+    if batch_size <= 0:
+        raise click.ClickException("--embedding-batch-size must be greater than 0.")
+    max_tokens = int(
+        current_app.config.get("EMBEDDING_BATCH_MAX_TOKENS")
+        or os.getenv("EMBEDDING_BATCH_MAX_TOKENS", DEFAULT_EMBEDDING_BATCH_MAX_TOKENS)
+    )
+    return batch_size, max_tokens
+
+
+def _embed_document_chunks(
+    document,
+    chunks,
+    embedder,
+    metadata=None,
+    batch_size=None,
+    final_status=None,
+    timer=None,
+):
+    """Embed ``(text, token_count)`` chunks and store them in chunk order.
+
+    Chunks whose content hash matches an existing row of the document keep
+    that row (re-indexed); only new or changed chunks are sent to the embedder.
+    ``final_status`` is recorded on the document in the same transaction as
+    the last rows. Embedding and database time is charged to ``timer``.
+    """
+    timer = timer or JobTimer()
+    metadata = metadata if isinstance(metadata, dict) else None
+    with timer.stage("db_insert"):
+        reusable = _park_existing_embeddings(document.id)
+    batch_size, max_tokens = _embedding_batch_options(batch_size)
+    pending = deque()
+    reindexed = []
+
+    def _changed_chunks():
+        for idx, (chunk, token_count) in enumerate(chunks):
+            chunk_hash = content_hash(embedder.model_name, chunk)
+            row_ids = reusable.get(chunk_hash)
+            if row_ids:
+                reindexed.append(
+                    {"id": row_ids.pop(), "chunk_index": idx, "metadata_": metadata}
+                )
+                continue
+            pending.append((idx, chunk_hash))
+            yield chunk, token_count
+
+    embeddings = iter_embeddings(
+        TimedEmbedder(embedder, timer),
+        _changed_chunks(),
+        batch_size,
+        max_tokens=max_tokens,
+    )
 
     created = 0
+    reused = 0
     batch = []
+    cache_counts = _embedding_cache_counts(embedder)
+    throttled = _throttled_seconds(embedder)
+
+    writer = EmbeddingWriter(db.session, document)
 
-    with click.progressbar(chunks, label="Embedding chunks") as chunk_iter:
-        for idx, chunk in enumerate(chunk_iter):
-            embedding = embed_fn(chunk)
+    with click.progressbar(embeddings, label="Embedding chunks") as embedding_iter:
+        for chunk, embedding in embedding_iter:
+            idx, chunk_hash = pending.popleft()
             batch.append(
-                DocumentEmbedding(
-                    document_id=document.id,
-                    document_type=document.document_type,
-                    embedding=embedding,
-                    chunk_index=idx,
-                    content=chunk,
-                    metadata_=metadata if isinstance(metadata, dict) else None,
-                )
+                {
+                    "chunk_index": idx,
+                    "content": chunk,
+                    "content_hash": chunk_hash,
+                    "embedding": embedding,
+                    "metadata": metadata,
+                }
             )
-            created += 1
 
             if len(batch) >= DEFAULT_BATCH_SIZE:
-                db.session.add_all(batch)
-                db.session.commit()
+                with timer.stage("db_insert"):
+                    created += writer.write(batch)
+                    _reindex_embeddings(reindexed)
+                    reused += len(reindexed)
+                    reindexed.clear()
+                    db.session.commit()
                 batch = []
 
-    if batch:
-        db.session.add_all(batch)
+    with timer.stage("db_insert"):
+        created += writer.write(batch)
+        _reindex_embeddings(reindexed)
+        reused += len(reindexed)
+        removed = _delete_stale_embeddings(document.id)
+        if final_status is not None:
+            _set_document_status(document, final_status, commit=False)
+        # Cached /inquire answers are versioned by their documents' updated_at.
+        document.updated_at = Document._UTCNOW()
         db.session.commit()
+    timer.counts.update(rows=created, reused=reused, removed=removed)
 
+    if reused:
+        click.echo(f"Reused unchanged embeddings: {reused}")
+    if removed:
+        click.echo(f"Removed stale embeddings: {removed}")
     click.echo(f"Rows produced: {created}")
+    if cache_counts is not None:
+        hits, misses = _embedding_cache_counts(embedder)
+        click.echo(
+            f"Embedding cache hits: {hits - cache_counts[0]}, "
+            f"misses: {misses - cache_counts[1]}"
+        )
+    if throttled is not None and _throttled_seconds(embedder) > throttled:
+        waited = _throttled_seconds(embedder) - throttled
+        click.echo(f"Throttled by rate limiter: {waited:.2f}s")
+
 
+def _throttled_seconds(embedder):
+    governor = getattr(embedder, "governor", None)
+    if governor is None:
+        return None
+    return governor.throttled_seconds
 
-def _embed_document_from_bytes(
+
+def _embedding_cache_counts(embedder):
+    if not isinstance(embedder, CachedEmbedder):
+        return None
+    return embedder.hits, embedder.misses
+
+
+def _embed_document_from_file(
     document,
-    data,
+    fileobj,
     chunk_size,
     chunk_overlap,
     embedder,
     metadata=None,
+    batch_size=None,
+    extract_executor=None,
+    final_status=None,
+    timer=None,
 ):
-    text_content = _extract_text(document, data)
-    if not text_content.strip():
-        raise click.ClickException("No text content extracted from document.")
-
-    if embedder["type"] == "openai":
-        encoding = _encoding_for_model(embedder["model"])
-    else:
-        encoding = _encoding_for_model("cl100k_base")
-    tokens = encoding.encode(text_content)
-    chunks = _chunk_tokens(encoding, tokens, chunk_size, chunk_overlap)
-
-    click.echo(f"Total tokens: {len(tokens)}")
-    click.echo(f"Expected chunks: {len(chunks)}")
-
-    if embedder["type"] == "openai":
-        client = embedder["client"]
-        model = embedder["model"]
-
-        def _openai_embed(chunk):
-            response = client.embeddings.create(model=model, input=chunk)
-            return response.data[0].embedding
-
-        _embed_document_chunks(document, chunks, _openai_embed, metadata=metadata)
-        return
-
-    if embedder["type"] == "local":
-        llm = embedder["llm"]
-
-        def _local_embed(chunk):
-            response = llm.create_embedding(chunk)
-            return response["data"][0]["embedding"]
-
-        _embed_document_chunks(document, chunks, _local_embed, metadata=metadata)
-        return
-
-    raise click.ClickException("Unsupported embedder type.")
+    # pages -> text -> tokens -> chunks -> embeddings, one page at a time.
+    timer = timer or JobTimer()
+    with timer.stage("extraction"):
+        pages = _iter_text(document, fileobj, executor=extract_executor)
+        parts = _require_text(timer.iter("extraction", pages))
+    encoding = _encoding_for_model(embedder.encoding_model)
+    total_tokens = 0
+    total_chunks = 0
+
+    def _counted(token_batches):
+        nonlocal total_tokens
+        for tokens in token_batches:
+            total_tokens += len(tokens)
+            yield tokens
+
+    def _counted_chunks(chunks):
+        nonlocal total_chunks
+        for chunk in chunks:
+            total_chunks += 1
+            yield chunk
+
+    token_batches = timer.iter("tokenization", _iter_text_tokens(encoding, parts))
+    chunks = timer.iter(
+        "chunking",
+        _iter_token_chunks(encoding, _counted(token_batches), chunk_size, chunk_overlap),
+    )
+    _embed_document_chunks(
+        document,
+        _counted_chunks(chunks),
+        embedder,
+        metadata=metadata,
+        batch_size=batch_size,
+        final_status=final_status,
+        timer=timer,
+    )
+    timer.counts.update(tokens=total_tokens, chunks=total_chunks)
+    click.echo(f"Total tokens: {total_tokens}")
 
 
-def _build_sqs_client():
-    region = current_app.config.get("SQS_REGION") or os.getenv("SQS_REGION") or None
-    endpoint = current_app.config.get("AWS_SQS_ENDPOINT") or os.getenv(
-        "AWS_SQS_ENDPOINT"
-    )
-    return boto3.client("sqs", region_name=region, endpoint_url=endpoint or None)
+def _build_queue(queue_url=None):
+    try:
+        return build_queue(current_app._get_current_object(), queue_url=queue_url)
+    except QueueError as exc:
+        raise click.ClickException(str(exc)) from exc
 
 
 def _build_s3_client():
-    region = current_app.config.get("AWS_REGION") or os.getenv("AWS_REGION") or None
-    endpoint = current_app.config.get("AWS_S3_ENDPOINT") or os.getenv("AWS_S3_ENDPOINT")
-    access_key = current_app.config.get("AWS_ACCESS_KEY_ID") or os.getenv(
-        "AWS_ACCESS_KEY_ID"
-    )
-    secret_key = current_app.config.get("AWS_SECRET_ACCESS_KEY") or os.getenv(
-        "AWS_SECRET_ACCESS_KEY"
-    )
-    return boto3.client(
-        "s3",
-        region_name=region,
-        endpoint_url=endpoint or None,
-        aws_access_key_id=access_key or None,
-        aws_secret_access_key=secret_key or None,
-    )
+    return get_s3_client(current_app.config)
 
 
 def _parse_payload(body):
     try:
         payload = json.loads(body)
     except json.JSONDecodeError as exc:
-        raise click.ClickException("SQS message body is not valid JSON.") from exc
+        raise click.ClickException("Queue message body is not valid JSON.") from exc
     if isinstance(payload, dict) and "Message" in payload and isinstance(
         payload["Message"], str
     ):
@@ -262,8 +457,17 @@ def _get_or_create_document_from_payload(payload, storage_key, content_type, siz
             raise click.ClickException("Document not found for payload document_id.")
         return document
 
-    document = Document.query.filter_by(storage_key=storage_key).first()
+    # Documents created for presigned uploads are found by their storage key,
+    # which does not include AWS_S3_PREFIX.
+    prefix = (current_app.config.get("AWS_S3_PREFIX") or "").rstrip("/")
+    keys = {storage_key}
+    if prefix and storage_key.startswith(f"{prefix}/"):
+        keys.add(storage_key[len(prefix) + 1 :])
+    document = Document.query.filter(Document.storage_key.in_(keys)).first()
     if document is not None:
+        if document.size_bytes is None:
+            document.size_bytes = size_bytes
+        document.content_type = document.content_type or content_type
         return document
 
     filename = payload.get("original_filename") if isinstance(payload, dict) else None
@@ -289,13 +493,821 @@ def _get_or_create_document_from_payload(payload, storage_key, content_type, siz
     return document
 
 
-def _set_document_status(document, status, enqueue_error=None, embedding_error=None):
+def _set_document_status(
+    document, status, enqueue_error=None, embedding_error=None, commit=True
+):
     document.embedding_status = status
     if enqueue_error is not None:
         document.enqueue_error = enqueue_error
     if embedding_error is not None:
         document.embedding_error = embedding_error
-    db.session.commit()
+    if commit:
+        db.session.commit()
+
+
+def _embedding_cache():
+    try:
+        return build_embedding_cache(current_app.config)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+
+
+def _with_embedding_cache(embedder):
+    cache = _embedding_cache()
+    if cache is None:
+        return embedder
+    return CachedEmbedder(embedder, cache)
+
+
+def _embedding_cache_settings():
+    return (
+        current_app.config.get("EMBEDDING_CACHE_BACKEND") or "",
+        current_app.config.get("EMBEDDING_CACHE_DIR") or "",
+        current_app.config.get("EMBEDDING_CACHE_MAX_BYTES") or 0,
+    )
+
+
+def _embedder_kind(embedder):
+    if embedder.lower() in {"openai", "local"}:
+        return embedder.lower()
+    use_openai = str(current_app.config.get("USE_OPENAI", "true")).lower()
+    return "openai" if use_openai in {"1", "true", "yes", "y"} else "local"
+
+
+def _build_embedder(embedder):
+    """Return the process-wide embedder for ``auto``, ``openai`` or ``local``.
+
+    Each configuration is built once per process (the GGUF model is loaded
+    once) and then reused across documents.
+    """
+    if _embedder_kind(embedder) == "openai":
+        api_key, model = _openai_settings()
+        return get_embedder(
+            ("openai", api_key, model, _embedding_cache_settings()),
+            lambda: _with_embedding_cache(
+                OpenAIEmbedder(
+                    client=OpenAI(
+                        api_key=api_key,
+                        max_retries=openai_max_retries(current_app.config),
+                    ),
+                    model=model,
+                    governor=get_rate_governor(current_app.config, model),
+                )
+            ),
+        )
+
+    settings = _local_embedder_settings()
+    return get_embedder(
+        ("local", tuple(sorted(settings.items())), _embedding_cache_settings()),
+        lambda: _with_embedding_cache(LocalEmbedder(llm=_local_embedder(settings))),
+    )
+
+
+def _warmup_embedder(embedder):
+    click.echo("Warming up embedder...")
+    _build_embedder(embedder).warmup()
+
+
+def _start_job_metrics(metrics_port=None):
+    """Print per-job timing lines and, with a port, serve Prometheus metrics."""
+    logger = logging.getLogger("app.embeddings.metrics")
+    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+
+    if metrics_port is None:
+        metrics_port = int(
+            current_app.config.get("METRICS_PORT") or os.getenv("METRICS_PORT", "0")
+        )
+    if not metrics_port:
+        return
+    try:
+        start_metrics_server(metrics_port)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(f"Serving metrics on port {metrics_port}.")
+
+
+def _build_extract_executor(processes=None):
+    if processes is None:
+        processes = int(
+            current_app.config.get("EXTRACT_PROCESSES")
+            or os.getenv("EXTRACT_PROCESSES", "0")
+        )
+    if processes < 0:
+        raise click.ClickException("--extract-processes must be 0 or greater.")
+    if not processes:
+        return None
+    # Spawn instead of fork: the pool may be started while worker threads are running.
+    return ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def _receive_queue_messages_timed(queue, max_messages, wait_time, visibility_timeout):
+    started = time.perf_counter()
+    messages = queue.receive(
+        max_messages=max_messages,
+        wait_time=wait_time,
+        visibility_timeout=visibility_timeout,
+    )
+    return messages, time.perf_counter() - started
+
+
+def _receive_share(receive_seconds, jobs):
+    # One receive call serves every job it returned; each is charged a share.
+    return receive_seconds / len(jobs) if jobs else receive_seconds
+
+
+def _delete_queue_messages(queue, messages):
+    """Acknowledge ``messages`` in batches of ``queue.delete_batch_size``.
+
+    Entries that fail on the queue side are retried with backoff; sender
+    faults (e.g. an expired receipt handle) are reported and dropped since
+    retrying cannot fix them. Returns the number of deleted messages.
+    """
+    pending = list(messages)
+    deleted = 0
+    for attempt in range(QUEUE_DELETE_ATTEMPTS):
+        if attempt:
+            time.sleep(QUEUE_DELETE_RETRY_DELAY * 2 ** (attempt - 1))
+        retry = []
+        for start in range(0, len(pending), queue.delete_batch_size):
+            batch = pending[start : start + queue.delete_batch_size]
+            by_handle = {message["ReceiptHandle"]: message for message in batch}
+            try:
+                failures = queue.delete_batch(list(by_handle))
+            except Exception as exc:  # noqa: BLE001 - retry the whole batch
+                click.echo(f"Failed to delete queue messages: {exc}")
+                retry.extend(batch)
+                continue
+            deleted += len(batch) - len(failures)
+            for failure in failures:
+                if failure["SenderFault"]:
+                    click.echo(f"Could not delete queue message: {failure['Message']}")
+                else:
+                    retry.append(by_handle[failure["ReceiptHandle"]])
+        pending = retry
+        if not pending:
+            break
+    if pending:
+        click.echo(f"Gave up deleting {len(pending)} queue message(s).")
+    if deleted:
+        click.echo(f"Deleted {deleted} queue message(s).")
+    return deleted
+
+
+def _heartbeat_interval(heartbeat_interval, visibility_timeout):
+    """Validate an explicit --heartbeat-interval or derive it from the timeout."""
+    if heartbeat_interval is None:
+        return default_heartbeat_interval(visibility_timeout)
+    if heartbeat_interval < 0:
+        raise click.ClickException("--heartbeat-interval must be 0 or greater.")
+    if heartbeat_interval and heartbeat_interval >= visibility_timeout:
+        raise click.ClickException(
+            "--heartbeat-interval must be less than --visibility-timeout."
+        )
+    return heartbeat_interval
+
+
+def _message_heartbeat(message, heartbeat):
+    if not heartbeat or not heartbeat.get("interval"):
+        return nullcontext()
+    return VisibilityHeartbeat(
+        heartbeat["queue"],
+        message["ReceiptHandle"],
+        heartbeat["visibility_timeout"],
+        interval=heartbeat["interval"],
+    )
+
+
+def _message_document_key(message):
+    try:
+        payload = _parse_payload(message.get("Body", "{}"))
+    except click.ClickException:
+        # Malformed messages are skipped by the job itself.
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if payload.get("document_id"):
+        return payload["document_id"]
+    _, key = _extract_s3_location(payload)
+    return unquote_plus(key) if key else None
+
+
+def _resolve_sqs_location(payload):
+    """Return ``(document, bucket, key)`` for a job payload, or None to skip it.
+
+    ``document`` is None for raw S3 event payloads; those documents are found
+    or created once the object has been downloaded.
+    """
+    document = None
+    if isinstance(payload, dict) and payload.get("document_id"):
+        document = db.session.get(Document, payload["document_id"])
+        if document is None:
+            click.echo("Skipping message: document not found.")
+            return None
+        key = payload.get("key") or document.storage_key
+        storage = get_storage()
+        if storage.provider != "s3" or isinstance(storage, CachedStorageService):
+            # Opened from the configured storage (or its cache) rather than downloaded.
+            return document, None, unquote_plus(key)
+        bucket = payload.get("bucket") or current_app.config.get(
+            "AWS_S3_BUCKET"
+        ) or os.getenv("AWS_S3_BUCKET")
+        if not key or not bucket:
+            click.echo("Skipping message: missing bucket/key for document.")
+            return None
+    else:
+        bucket, key = _extract_s3_location(payload)
+        if not bucket or not key:
+            click.echo("Skipping message: payload missing S3 bucket/key.")
+            return None
+
+    configured_bucket = current_app.config.get("AWS_S3_BUCKET") or os.getenv(
+        "AWS_S3_BUCKET"
+    )
+    if configured_bucket and bucket != configured_bucket:
+        click.echo("Skipping message: payload bucket does not match AWS_S3_BUCKET.")
+        return None
+
+    return document, bucket, unquote_plus(key)
+
+
+def _download_s3_object(s3, bucket, key, transfer_options=None):
+    return download_s3_fileobj(s3, bucket, key, transfer_options)
+
+
+def _open_job_object(storage, s3, bucket, key, transfer_options=None):
+    """Return ``(fileobj, content_type, size)`` for a job's file.
+
+    Jobs resolved without a bucket read straight from ``storage``.
+    """
+    if bucket is None:
+        metadata = storage.head(key) or {}
+        return storage.open(key), metadata.get("content_type"), metadata.get("size")
+    return _download_s3_object(s3, bucket, key, transfer_options)
+
+
+def _job_location(bucket, key):
+    return f"s3://{bucket}/{key}" if bucket else key
+
+
+def _process_sqs_message(
+    message,
+    embedder,
+    chunk_size,
+    chunk_overlap,
+    embedding_batch_size=None,
+    extract_executor=None,
+    heartbeat=None,
+    timer=None,
+):
+    """Embed the document referenced by one queue message.
+
+    Returns True when the message was handled and can be deleted. ``heartbeat``
+    holds the queue and settings used to extend the message visibility
+    while the job runs; on failure the message is released immediately.
+    Stage timings are recorded once the job has been accepted.
+    """
+    try:
+        payload = _parse_payload(message.get("Body", "{}"))
+    except click.ClickException as exc:
+        click.echo(f"Skipping message: {exc.message}")
+        return False
+    timer = timer or JobTimer()
+    document = None
+    job = None
+    data = None
+    try:
+        location = _resolve_sqs_location(payload)
+        if location is None:
+            return False
+        document, bucket, key = location
+        job = {"content_type": None, "embedder": None, "status": "failed"}
+        if document is not None:
+            _set_document_status(document, "processing")
+
+        with _message_heartbeat(message, heartbeat):
+            click.echo(f"Downloading {_job_location(bucket, key)} ...")
+            with timer.stage("s3_download"):
+                data, content_type, size_bytes = _open_job_object(
+                    get_storage(),
+                    _build_s3_client() if bucket else None,
+                    bucket,
+                    key,
+                    s3_transfer_options(current_app.config),
+                )
+            job["content_type"] = content_type
+
+            if document is None:
+                document = _get_or_create_document_from_payload(
+                    payload, key, content_type, size_bytes
+                )
+                # Created from an S3 event; committed with the first rows.
+                _set_document_status(document, "processing", commit=False)
+
+            resolved_embedder = _build_embedder(embedder)
+            job["embedder"] = resolved_embedder.model_name
+            _embed_document_from_file(
+                document,
+                data,
+                chunk_size,
+                chunk_overlap,
+                resolved_embedder,
+                metadata=payload.get("metadata") if isinstance(payload, dict) else None,
+                batch_size=embedding_batch_size,
+                extract_executor=extract_executor,
+                final_status="embedded",
+                timer=timer,
+            )
+        job["status"] = "embedded"
+        return True
+    except Exception as exc:  # noqa: BLE001 - keep worker running
+        db.session.rollback()
+        if document is not None:
+            _set_document_status(document, "failed", embedding_error=str(exc))
+        click.echo(f"Embedding failed: {exc}")
+        return False
+    finally:
+        if data is not None:
+            data.close()
+        if job is not None:
+            record_embedding_job(
+                timer,
+                document_id=document.id if document is not None else None,
+                **job,
+            )
+
+
+def _process_sqs_message_in_context(app, message, options, timer=None):
+    # Each worker thread gets its own app context and therefore its own session.
+    with app.app_context():
+        try:
+            return _process_sqs_message(message, timer=timer, **options)
+        finally:
+            db.session.remove()
+
+
+def _poll_queue_serial(
+    queue, wait_time, visibility_timeout, delete_message, max_messages, options
+):
+    while True:
+        messages, receive_seconds = _receive_queue_messages_timed(
+            queue, max_messages, wait_time, visibility_timeout
+        )
+        receive_seconds = _receive_share(receive_seconds, messages)
+        for message in messages:
+            handled = _process_sqs_message(
+                message, timer=JobTimer(sqs_receive=receive_seconds), **options
+            )
+            # The heartbeat stops with the job, so acknowledge before the next one.
+            if handled and delete_message:
+                _delete_queue_messages(queue, [message])
+
+
+def _poll_queue_concurrent(
+    app,
+    queue,
+    wait_time,
+    visibility_timeout,
+    delete_message,
+    max_messages,
+    concurrency,
+    options,
+):
+    in_flight = {}
+    active_keys = set()
+    acks = []
+    oldest_ack = None
+
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="embedding-worker"
+    ) as executor:
+        while True:
+            capacity = concurrency - len(in_flight)
+            if capacity > 0:
+                # Only long-poll when idle so finished jobs are acknowledged promptly.
+                messages, receive_seconds = _receive_queue_messages_timed(
+                    queue,
+                    min(max_messages, capacity),
+                    0 if in_flight else wait_time,
+                    visibility_timeout,
+                )
+                accepted = []
+                for message in messages:
+                    document_key = _message_document_key(message)
+                    if document_key is not None and document_key in active_keys:
+                        # Leave it invisible; it is redelivered after the visibility timeout.
+                        click.echo("Deferring message: document is already being embedded.")
+                        continue
+                    accepted.append((message, document_key))
+                    if document_key is not None:
+                        active_keys.add(document_key)
+                receive_seconds = _receive_share(receive_seconds, accepted)
+                for message, document_key in accepted:
+                    future = executor.submit(
+                        _process_sqs_message_in_context,
+                        app,
+                        message,
+                        options,
+                        JobTimer(sqs_receive=receive_seconds),
+                    )
+                    in_flight[future] = (message, document_key)
+
+            if in_flight:
+                timeout = None if len(in_flight) >= concurrency and not acks else 1
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    message, document_key = in_flight.pop(future)
+                    active_keys.discard(document_key)
+                    exc = future.exception()
+                    if exc is not None:
+                        click.echo(f"Embedding worker error: {exc}")
+                        continue
+                    if future.result() and delete_message:
+                        acks.append(message)
+                        oldest_ack = oldest_ack or time.monotonic()
+
+            # Acknowledge in batches, but never hold a finished message for
+            # longer than QUEUE_ACK_FLUSH_INTERVAL or across an idle long-poll.
+            if acks and (
+                len(acks) >= queue.delete_batch_size
+                or not in_flight
+                or time.monotonic() - oldest_ack >= QUEUE_ACK_FLUSH_INTERVAL
+            ):
+                _delete_queue_messages(queue, acks)
+                acks = []
+                oldest_ack = None
+
+
+class _PrecomputedEmbedder(BaseEmbedder):
+    """Serve vectors fetched by the async worker to _embed_document_chunks."""
+
+    def __init__(self, model_name, vectors):
+        self._model_name = model_name
+        self.vectors = vectors
+
+    @property
+    def model_name(self):
+        return self._model_name
+
+    def embed_batch(self, texts, token_count=None):
+        try:
+            return [self.vectors[text] for text in texts]
+        except KeyError as exc:
+            raise EmbedderError(
+                "Document embeddings changed while the job was running."
+            ) from exc
+
+
+def _call_in_app_context(app, func, *args):
+    with app.app_context():
+        try:
+            return func(*args)
+        finally:
+            db.session.remove()
+
+
+def _resolve_async_job(payload):
+    location = _resolve_sqs_location(payload)
+    if location is None:
+        return None
+    document, bucket, key = location
+    return (document.id if document is not None else None), bucket, key
+
+
+def _start_async_job(payload, document_id, key, content_type, size_bytes):
+    """Load or create the job's document and snapshot what the worker needs."""
+    if document_id:
+        document = db.session.get(Document, document_id)
+        if document is None:
+            raise click.ClickException("Document not found for payload document_id.")
+    else:
+        document = _get_or_create_document_from_payload(
+            payload, key, content_type, size_bytes
+        )
+    if document.embedding_status != "processing":
+        _set_document_status(document, "processing")
+    hashes = Counter(
+        row_hash
+        for (row_hash,) in db.session.query(DocumentEmbedding.content_hash)
+        .filter(DocumentEmbedding.document_id == document.id)
+        .filter(DocumentEmbedding.content_hash.isnot(None))
+    )
+    return SimpleNamespace(
+        id=document.id,
+        original_filename=document.original_filename,
+        content_type=document.content_type,
+        hashes=hashes,
+    )
+
+
+def _extract_chunks(
+    document,
+    fileobj,
+    encoding_model,
+    chunk_size,
+    chunk_overlap,
+    extract_executor=None,
+    timer=None,
+):
+    timer = timer or JobTimer()
+    with timer.stage("extraction"):
+        text = _extract_text(document, fileobj, executor=extract_executor)
+    if not text.strip():
+        raise click.ClickException("No text content extracted from document.")
+    encoding = _encoding_for_model(encoding_model)
+    with timer.stage("tokenization"):
+        tokens = encoding.encode(text)
+    with timer.stage("chunking"):
+        chunks = _chunk_tokens(encoding, tokens, chunk_size, chunk_overlap)
+    timer.counts.update(tokens=len(tokens), chunks=len(chunks))
+    return chunks
+
+
+def _store_async_embeddings(
+    document_id, chunks, model_name, vectors, metadata, batch_size, timer=None
+):
+    document = db.session.get(Document, document_id)
+    _embed_document_chunks(
+        document,
+        [(chunk, None) for chunk in chunks],
+        _PrecomputedEmbedder(model_name, vectors),
+        metadata=metadata,
+        batch_size=batch_size,
+        final_status="embedded",
+        timer=timer,
+    )
+
+
+def _mark_embedding_failed(document_id, error):
+    document = db.session.get(Document, document_id)
+    if document is not None:
+        _set_document_status(document, "failed", embedding_error=error)
+
+
+class _AsyncEmbeddingWorker:
+    """Run many queued embedding jobs on one event loop.
+
+    Only the OpenAI requests are awaited natively. Queue and S3 calls run in an
+    I/O thread pool, extraction and chunking in a CPU thread pool (which hands
+    work to the extract process pool when one is configured) and database
+    work in a few threads with their own app contexts. Every stage has its
+    own semaphore, and ``max_jobs`` bounds how many documents are held in
+    memory at once.
+    """
+
+    def __init__(self, app, queue, s3, embedder, settings):
+        self.app = app
+        self.queue = queue
+        self.s3 = s3
+        self.embedder = embedder
+        self.settings = settings
+        self.acks = []
+        self.active_keys = set()
+        self.io_executor = ThreadPoolExecutor(
+            max_workers=settings["max_downloads"] + 2, thread_name_prefix="queue-io"
+        )
+        self.cpu_executor = ThreadPoolExecutor(
+            max_workers=settings["max_extractions"], thread_name_prefix="extract"
+        )
+        self.db_executor = ThreadPoolExecutor(
+            max_workers=settings["max_db_writes"], thread_name_prefix="db"
+        )
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.stages = {
+            "downloads": asyncio.BoundedSemaphore(self.settings["max_downloads"]),
+            "extractions": asyncio.BoundedSemaphore(self.settings["max_extractions"]),
+            "embedding_requests": asyncio.BoundedSemaphore(
+                self.settings["max_embedding_requests"]
+            ),
+            "db_writes": asyncio.BoundedSemaphore(self.settings["max_db_writes"]),
+        }
+        tasks = set()
+        flusher = asyncio.create_task(self._flush_acks_periodically())
+        try:
+            while True:
+                capacity = self.settings["max_jobs"] - len(tasks)
+                if capacity <= 0:
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                messages, receive_seconds = await self._io(
+                    _receive_queue_messages_timed,
+                    self.queue,
+                    min(self.settings["max_messages"], capacity),
+                    self.settings["wait_time"],
+                    self.settings["visibility_timeout"],
+                )
+                accepted = []
+                for message in messages:
+                    document_key = _message_document_key(message)
+                    if document_key is not None and document_key in self.active_keys:
+                        click.echo("Deferring message: document is already being embedded.")
+                        continue
+                    if document_key is not None:
+                        self.active_keys.add(document_key)
+                    accepted.append((message, document_key))
+                receive_seconds = _receive_share(receive_seconds, accepted)
+                for message, document_key in accepted:
+                    task = asyncio.create_task(
+                        self._process(
+                            message, document_key, JobTimer(sqs_receive=receive_seconds)
+                        )
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        finally:
+            flusher.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(flusher, *tasks, return_exceptions=True)
+            await self._flush_acks()
+
+    def close(self):
+        for executor in (self.io_executor, self.cpu_executor, self.db_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _io(self, func, *args):
+        return await self.loop.run_in_executor(self.io_executor, func, *args)
+
+    async def _db(self, func, *args):
+        async with self.stages["db_writes"]:
+            return await self.loop.run_in_executor(
+                self.db_executor, _call_in_app_context, self.app, func, *args
+            )
+
+    async def _cpu(self, func, *args):
+        async with self.stages["extractions"]:
+            return await self.loop.run_in_executor(
+                self.cpu_executor, _call_in_app_context, self.app, func, *args
+            )
+
+    @asynccontextmanager
+    async def _heartbeat(self, message):
+        # Stopping or releasing the heartbeat joins a thread and may call the queue,
+        # so it runs off the event loop.
+        heartbeat = _message_heartbeat(message, self.settings.get("heartbeat"))
+        heartbeat.__enter__()
+        try:
+            yield
+        except BaseException as exc:
+            await self._io(heartbeat.__exit__, type(exc), exc, exc.__traceback__)
+            raise
+        await self._io(heartbeat.__exit__, None, None, None)
+
+    async def _process(self, message, document_key, timer):
+        document_id = None
+        job = None
+        data = None
+        try:
+            payload = _parse_payload(message.get("Body", "{}"))
+            location = await self._db(_resolve_async_job, payload)
+            if location is None:
+                return
+            document_id, bucket, key = location
+            job = {
+                "content_type": None,
+                "embedder": self.embedder.model_name,
+                "status": "failed",
+            }
+
+            async with self._heartbeat(message):
+                async with self.stages["downloads"]:
+                    click.echo(f"Downloading {_job_location(bucket, key)} ...")
+                    started = time.perf_counter()
+                    data, content_type, size_bytes = await self._io(
+                        _open_job_object,
+                        self.settings.get("storage"),
+                        self.s3,
+                        bucket,
+                        key,
+                        self.settings.get("transfer_options"),
+                    )
+                    timer.add("s3_download", time.perf_counter() - started)
+                job["content_type"] = content_type
+                document = await self._db(
+                    _start_async_job, payload, document_id, key, content_type, size_bytes
+                )
+                document_id = document.id
+                chunks = await self._cpu(
+                    _extract_chunks,
+                    document,
+                    data,
+                    self.embedder.encoding_model,
+                    self.settings["chunk_size"],
+                    self.settings["chunk_overlap"],
+                    self.settings.get("extract_executor"),
+                    timer,
+                )
+                data.close()
+
+                # Only chunks without an existing row to reuse are embedded.
+                model_name = self.embedder.model_name
+                reusable = document.hashes
+                missing = {}
+                for chunk in chunks:
+                    chunk_hash = content_hash(model_name, chunk)
+                    if reusable[chunk_hash] > 0:
+                        reusable[chunk_hash] -= 1
+                    else:
+                        missing[chunk] = None
+                vectors = await self._embed_cached(list(missing), timer)
+                await self._db(
+                    _store_async_embeddings,
+                    document_id,
+                    chunks,
+                    model_name,
+                    vectors,
+                    payload.get("metadata") if isinstance(payload, dict) else None,
+                    self.settings["embedding_batch_size"],
+                    timer,
+                )
+            click.echo(f"Embedded document {document_id}: {len(chunks)} chunks.")
+            job["status"] = "embedded"
+            if self.settings["delete_message"]:
+                self.acks.append(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001 - keep worker running
+            click.echo(f"Embedding failed: {exc}")
+            if document_id is not None:
+                await self._db(_mark_embedding_failed, document_id, str(exc))
+        finally:
+            if data is not None:
+                data.close()
+            self.active_keys.discard(document_key)
+            if job is not None:
+                record_embedding_job(timer, document_id=document_id, **job)
+
+    async def _embed_cached(self, texts, timer):
+        """Embed ``texts``, serving those already in the embedding cache.
+
+        Cache entries are shared with the sync workers, which key them by the
+        same normalized hash and model name.
+        """
+        cache = self.settings.get("embedding_cache")
+        vectors = {}
+        keys = {}
+        if cache is not None and texts:
+            model_name = self.embedder.model_name
+            keys = {text: normalized_hash(text) for text in texts}
+            found = await self._db(cache.get_many, model_name, set(keys.values()))
+            vectors = {text: found[key] for text, key in keys.items() if key in found}
+
+        # Wall-clock time; the batches of one document overlap.
+        started = time.perf_counter()
+        embedded = await self._embed([text for text in texts if text not in vectors])
+        timer.add("embedding_api", time.perf_counter() - started)
+
+        if cache is not None and texts:
+            if embedded:
+                await self._db(
+                    cache.set_many,
+                    model_name,
+                    {keys[text]: embedding for text, embedding in embedded.items()},
+                )
+            click.echo(f"Embedding cache hits: {len(vectors)}, misses: {len(embedded)}")
+        vectors.update(embedded)
+        return vectors
+
+    async def _embed(self, texts):
+        """Send every batch at once; the semaphore caps requests in flight."""
+        batch_size, max_tokens = self.settings["embedding_batch_options"]
+        items = [(text, self.settings["chunk_size"]) for text in texts]
+
+        async def _embed_batch(batch):
+            # Chunks are at most chunk_size tokens, so the budget is an upper bound.
+            batch_texts = [text for text, _ in batch]
+            token_count = sum(count for _, count in batch)
+            async with self.stages["embedding_requests"]:
+                embeddings = await self.embedder.embed_batch(
+                    batch_texts, token_count=token_count
+                )
+            return zip(batch_texts, embeddings)
+
+        results = await asyncio.gather(
+            *(
+                _embed_batch(batch)
+                for batch in iter_batches(items, batch_size, max_tokens=max_tokens)
+            )
+        )
+        return {text: embedding for pairs in results for text, embedding in pairs}
+
+    async def _flush_acks_periodically(self):
+        while True:
+            await asyncio.sleep(QUEUE_ACK_FLUSH_INTERVAL)
+            await self._flush_acks()
+
+    async def _flush_acks(self):
+        if not self.acks:
+            return
+        acks, self.acks = self.acks, []
+        await self._io(_delete_queue_messages, self.queue, acks)
 
 
 def register_cli(app):
@@ -444,8 +1456,25 @@ def register_cli(app):
     @click.option(
         "--chunk-overlap", default=DEFAULT_CHUNK_OVERLAP, show_default=True, type=int
     )
+    @click.option(
+        "--embedding-batch-size",
+        default=None,
+        type=int,
+        help="Chunks per embedding request (defaults to EMBEDDING_BATCH_SIZE).",
+    )
+    @click.option(
+        "--extract-processes",
+        default=None,
+        type=int,
+        help=(
+            "Size of the process pool used for text extraction "
+            "(defaults to EXTRACT_PROCESSES; 0 extracts inline)."
+        ),
+    )
     @with_appcontext
-    def openai_embed_document(document_id, chunk_size, chunk_overlap):
+    def openai_embed_document(
+        document_id, chunk_size, chunk_overlap, embedding_batch_size, extract_processes
+    ):
         """Embed a document from storage and save vectors."""
         _validate_chunking_options(chunk_size, chunk_overlap)
 
@@ -453,16 +1482,22 @@ def register_cli(app):
         if document is None:
             raise click.ClickException("Document not found.")
 
-        click.echo(f"Downloading document {document.id}...")
-        data = get_storage().read(document.storage_key)
-        client, model = _openai_client_and_model()
-        _embed_document_from_bytes(
-            document,
-            data,
-            chunk_size,
-            chunk_overlap,
-            {"type": "openai", "client": client, "model": model},
-        )
+        extract_executor = _build_extract_executor(extract_processes)
+        try:
+            click.echo(f"Downloading document {document.id}...")
+            with get_storage().open(document.storage_key) as fileobj:
+                _embed_document_from_file(
+                    document,
+                    fileobj,
+                    chunk_size,
+                    chunk_overlap,
+                    _build_embedder("openai"),
+                    batch_size=embedding_batch_size,
+                    extract_executor=extract_executor,
+                )
+        finally:
+            if extract_executor is not None:
+                extract_executor.shutdown()
 
     @system.command("local-embed-document")
     @click.option("--document-id", required=True)
@@ -470,8 +1505,25 @@ def register_cli(app):
     @click.option(
         "--chunk-overlap", default=DEFAULT_CHUNK_OVERLAP, show_default=True, type=int
     )
+    @click.option(
+        "--embedding-batch-size",
+        default=None,
+        type=int,
+        help="Chunks per embedding request (defaults to EMBEDDING_BATCH_SIZE).",
+    )
+    @click.option(
+        "--extract-processes",
+        default=None,
+        type=int,
+        help=(
+            "Size of the process pool used for text extraction "
+            "(defaults to EXTRACT_PROCESSES; 0 extracts inline)."
+        ),
+    )
     @with_appcontext
-    def local_embed_document(document_id, chunk_size, chunk_overlap):
+    def local_embed_document(
+        document_id, chunk_size, chunk_overlap, embedding_batch_size, extract_processes
+    ):
         """Embed a document from storage using a local GGUF model."""
         _validate_chunking_options(chunk_size, chunk_overlap)
 
@@ -479,16 +1531,22 @@ def register_cli(app):
         if document is None:
             raise click.ClickException("Document not found.")
 
-        click.echo(f"Downloading document {document.id}...")
-        data = get_storage().read(document.storage_key)
-        llm = _local_embedder()
-        _embed_document_from_bytes(
-            document,
-            data,
-            chunk_size,
-            chunk_overlap,
-            {"type": "local", "llm": llm},
-        )
+        extract_executor = _build_extract_executor(extract_processes)
+        try:
+            click.echo(f"Downloading document {document.id}...")
+            with get_storage().open(document.storage_key) as fileobj:
+                _embed_document_from_file(
+                    document,
+                    fileobj,
+                    chunk_size,
+                    chunk_overlap,
+                    _build_embedder("local"),
+                    batch_size=embedding_batch_size,
+                    extract_executor=extract_executor,
+                )
+        finally:
+            if extract_executor is not None:
+                extract_executor.shutdown()
 
     @system.command("process-sqs-embedding")
     @click.option("--queue-url", default=None)
@@ -506,6 +1564,49 @@ def register_cli(app):
     @click.option(
         "--chunk-overlap", default=DEFAULT_CHUNK_OVERLAP, show_default=True, type=int
     )
+    @click.option(
+        "--embedding-batch-size",
+        default=None,
+        type=int,
+        help="Chunks per embedding request (defaults to EMBEDDING_BATCH_SIZE).",
+    )
+    @click.option(
+        "--concurrency",
+        default=1,
+        show_default=True,
+        type=int,
+        help="Number of worker threads processing messages in parallel.",
+    )
+    @click.option(
+        "--extract-processes",
+        default=None,
+        type=int,
+        help=(
+            "Size of the process pool used for text extraction "
+            "(defaults to EXTRACT_PROCESSES; 0 extracts inline)."
+        ),
+    )
+    @click.option(
+        "--heartbeat-interval",
+        default=None,
+        type=int,
+        help=(
+            "Seconds between visibility-timeout extensions while a job runs "
+            "(defaults to a third of --visibility-timeout; 0 disables)."
+        ),
+    )
+    @click.option(
+        "--warmup/--no-warmup",
+        default=True,
+        show_default=True,
+        help="Load the embedder and send one request before polling.",
+    )
+    @click.option(
+        "--metrics-port",
+        default=None,
+        type=int,
+        help="Serve Prometheus metrics on this port (defaults to METRICS_PORT; 0 disables).",
+    )
     @with_appcontext
     def process_sqs_embedding(
         queue_url,
@@ -516,121 +1617,237 @@ def register_cli(app):
         embedder,
         chunk_size,
         chunk_overlap,
+        embedding_batch_size,
+        concurrency,
+        extract_processes,
+        heartbeat_interval,
+        warmup,
+        metrics_port,
     ):
-        """Poll SQS jobs and embed referenced documents."""
+        """Poll the embedding queue and embed referenced documents."""
         _validate_chunking_options(chunk_size, chunk_overlap)
-        queue_url = queue_url or current_app.config.get("SQS_QUEUE_URL") or os.getenv(
-            "SQS_QUEUE_URL"
-        )
-        if not queue_url:
-            raise click.ClickException("SQS_QUEUE_URL is required.")
         if max_messages <= 0 or max_messages > 10:
             raise click.ClickException("--max-messages must be between 1 and 10.")
-
-        sqs = _build_sqs_client()
-        click.echo("Polling SQS. Press Ctrl+C to stop.")
+        if concurrency <= 0:
+            raise click.ClickException("--concurrency must be greater than 0.")
+
+        heartbeat_interval = _heartbeat_interval(heartbeat_interval, visibility_timeout)
+
+        _start_job_metrics(metrics_port)
+        if warmup:
+            _warmup_embedder(embedder)
+
+        queue = _build_queue(queue_url)
+        options = {
+            "embedder": embedder,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "embedding_batch_size": embedding_batch_size,
+            "heartbeat": {
+                "queue": queue,
+                "visibility_timeout": visibility_timeout,
+                "interval": heartbeat_interval,
+            },
+        }
+        extract_executor = _build_extract_executor(extract_processes)
+        if extract_executor is not None:
+            options["extract_executor"] = extract_executor
+        click.echo("Polling the embedding queue. Press Ctrl+C to stop.")
 
         try:
-            while True:
-                response = sqs.receive_message(
-                    QueueUrl=queue_url,
-                    MaxNumberOfMessages=max_messages,
-                    WaitTimeSeconds=wait_time,
-                    VisibilityTimeout=visibility_timeout,
+            if concurrency == 1:
+                _poll_queue_serial(
+                    queue,
+                    wait_time,
+                    visibility_timeout,
+                    delete_message,
+                    max_messages,
+                    options,
                 )
-                messages = response.get("Messages") or []
-                if not messages:
-                    continue
-
-                for message in messages:
-                    payload = _parse_payload(message.get("Body", "{}"))
-                    try:
-                        document = None
-                        bucket = None
-                        key = None
-
-                        if isinstance(payload, dict) and payload.get("document_id"):
-                            document = db.session.get(Document, payload["document_id"])
-                            if document is None:
-                                click.echo("Skipping message: document not found.")
-                                continue
-                            key = payload.get("key") or document.storage_key
-                            bucket = payload.get("bucket") or current_app.config.get(
-                                "AWS_S3_BUCKET"
-                            ) or os.getenv("AWS_S3_BUCKET")
-                            if not key or not bucket:
-                                click.echo("Skipping message: missing bucket/key for document.")
-                                continue
-                        else:
-                            bucket, key = _extract_s3_location(payload)
-                            if not bucket or not key:
-                                click.echo("Skipping message: payload missing S3 bucket/key.")
-                                continue
-
-                        configured_bucket = current_app.config.get("AWS_S3_BUCKET") or os.getenv(
-                            "AWS_S3_BUCKET"
-                        )
-                        if configured_bucket and bucket != configured_bucket:
-                            click.echo(
-                                "Skipping message: payload bucket does not match AWS_S3_BUCKET."
-                            )
-                            continue
-
-                        key = unquote_plus(key)
-                        click.echo(f"Downloading s3://{bucket}/{key} ...")
-                        s3 = _build_s3_client()
-                        obj = s3.get_object(Bucket=bucket, Key=key)
-                        data = obj["Body"].read()
-                        content_type = obj.get("ContentType")
-                        size_bytes = obj.get("ContentLength")
-
-                        if document is None:
-                            document = _get_or_create_document_from_payload(
-                                payload, key, content_type, size_bytes
-                            )
-
-                        _set_document_status(document, "processing", embedding_error=None)
-
-                        if embedder.lower() == "openai":
-                            client, model = _openai_client_and_model()
-                            embedder_config = {"type": "openai", "client": client, "model": model}
-                        elif embedder.lower() == "local":
-                            embedder_config = {"type": "local", "llm": _local_embedder()}
-                        else:
-                            use_openai = str(current_app.config.get("USE_OPENAI", "true")).lower()
-                            if use_openai in {"1", "true", "yes", "y"}:
-                                client, model = _openai_client_and_model()
-                                embedder_config = {"type": "openai", "client": client, "model": model}
-                            else:
-                                embedder_config = {"type": "local", "llm": _local_embedder()}
-
-                        _embed_document_from_bytes(
-                            document,
-                            data,
-                            chunk_size,
-                            chunk_overlap,
-                            embedder_config,
-                            metadata=payload.get("metadata") if isinstance(payload, dict) else None,
-                        )
-
-                        _set_document_status(
-                            document,
-                            "embedded",
-                            enqueue_error=None,
-                            embedding_error=None,
-                        )
+            else:
+                _poll_queue_concurrent(
+                    current_app._get_current_object(),
+                    queue,
+                    wait_time,
+                    visibility_timeout,
+                    delete_message,
+                    max_messages,
+                    concurrency,
+                    options,
+                )
+        except KeyboardInterrupt:
+            click.echo("Shutting down queue poller.")
+        finally:
+            if extract_executor is not None:
+                extract_executor.shutdown(wait=False, cancel_futures=True)
 
-                        if delete_message:
-                            sqs.delete_message(
-                                QueueUrl=queue_url, ReceiptHandle=message["ReceiptHandle"]
-                            )
-                            click.echo("Deleted SQS message.")
-                    except Exception as exc:  # noqa: BLE001 - keep worker running
-                        if "document" in locals() and document is not None:
-                            _set_document_status(document, "failed", embedding_error=str(exc))
-                        click.echo(f"Embedding failed: {exc}")
+    @system.command("process-sqs-embedding-async")
+    @click.option("--queue-url", default=None, help="SQS queue URL (overrides SQS_QUEUE_URL).")
+    @click.option("--wait-time", default=DEFAULT_SQS_WAIT_TIME, show_default=True, type=int)
+    @click.option("--visibility-timeout", default=120, show_default=True, type=int)
+    @click.option("--delete-message/--no-delete-message", default=True, show_default=True)
+    @click.option("--max-messages", default=10, show_default=True, type=int)
+    @click.option("--chunk-size", default=DEFAULT_CHUNK_TOKENS, show_default=True, type=int)
+    @click.option(
+        "--chunk-overlap", default=DEFAULT_CHUNK_OVERLAP, show_default=True, type=int
+    )
+    @click.option(
+        "--embedding-batch-size",
+        default=None,
+        type=int,
+        help="Chunks per embedding request (defaults to EMBEDDING_BATCH_SIZE).",
+    )
+    @click.option(
+        "--max-jobs",
+        default=DEFAULT_ASYNC_MAX_JOBS,
+        show_default=True,
+        type=int,
+        help="Documents processed at the same time.",
+    )
+    @click.option("--max-downloads", default=16, show_default=True, type=int)
+    @click.option(
+        "--max-extractions",
+        default=None,
+        type=int,
+        help="Concurrent extraction and chunking jobs (defaults to the CPU count).",
+    )
+    @click.option(
+        "--max-embedding-requests",
+        default=DEFAULT_ASYNC_EMBEDDING_REQUESTS,
+        show_default=True,
+        type=int,
+        help="OpenAI embedding requests in flight across all documents.",
+    )
+    @click.option(
+        "--max-db-writes",
+        default=4,
+        show_default=True,
+        type=int,
+        help="Concurrent database transactions (keep below the connection pool size).",
+    )
+    @click.option(
+        "--extract-processes",
+        default=None,
+        type=int,
+        help=(
+            "Size of the process pool used for text extraction "
+            "(defaults to EXTRACT_PROCESSES; 0 extracts in threads)."
+        ),
+    )
+    @click.option(
+        "--heartbeat-interval",
+        default=None,
+        type=int,
+        help=(
+            "Seconds between visibility-timeout extensions while a job runs "
+            "(defaults to a third of --visibility-timeout; 0 disables)."
+        ),
+    )
+    @click.option(
+        "--metrics-port",
+        default=None,
+        type=int,
+        help="Serve Prometheus metrics on this port (defaults to METRICS_PORT; 0 disables).",
+    )
+    @with_appcontext
+    def process_sqs_embedding_async(
+        queue_url,
+        wait_time,
+        visibility_timeout,
+        delete_message,
+        max_messages,
+        chunk_size,
+        chunk_overlap,
+        embedding_batch_size,
+        max_jobs,
+        max_downloads,
+        max_extractions,
+        max_embedding_requests,
+        max_db_writes,
+        extract_processes,
+        heartbeat_interval,
+        metrics_port,
+    ):
+        """Poll the embedding queue and embed documents with asyncio (OpenAI only)."""
+        _validate_chunking_options(chunk_size, chunk_overlap)
+        if max_messages <= 0 or max_messages > 10:
+            raise click.ClickException("--max-messages must be between 1 and 10.")
+        max_extractions = max_extractions or os.cpu_count() or 1
+        for name, value in (
+            ("--max-jobs", max_jobs),
+            ("--max-downloads", max_downloads),
+            ("--max-extractions", max_extractions),
+            ("--max-embedding-requests", max_embedding_requests),
+            ("--max-db-writes", max_db_writes),
+        ):
+            if value <= 0:
+                raise click.ClickException(f"{name} must be greater than 0.")
+
+        heartbeat_interval = _heartbeat_interval(heartbeat_interval, visibility_timeout)
+
+        api_key, model = _openai_settings()
+        _start_job_metrics(metrics_port)
+        queue = _build_queue(queue_url)
+        settings = {
+            "wait_time": wait_time,
+            "visibility_timeout": visibility_timeout,
+            "delete_message": delete_message,
+            "max_messages": max_messages,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "embedding_batch_size": embedding_batch_size,
+            "embedding_batch_options": _embedding_batch_options(embedding_batch_size),
+            "max_jobs": max_jobs,
+            "max_downloads": max_downloads,
+            "max_extractions": max_extractions,
+            "max_embedding_requests": max_embedding_requests,
+            "max_db_writes": max_db_writes,
+            "extract_executor": _build_extract_executor(extract_processes),
+            "transfer_options": s3_transfer_options(current_app.config),
+            "storage": get_storage(),
+            "embedding_cache": _embedding_cache(),
+            "heartbeat": {
+                "queue": queue,
+                "visibility_timeout": visibility_timeout,
+                "interval": heartbeat_interval,
+            },
+        }
+
+        async def _run():
+            embedder = AsyncOpenAIEmbedder(
+                client=AsyncOpenAI(
+                    api_key=api_key, max_retries=openai_max_retries(current_app.config)
+                ),
+                model=model,
+                governor=get_rate_governor(current_app.config, model),
+            )
+            worker = _AsyncEmbeddingWorker(
+                current_app._get_current_object(),
+                queue,
+                _build_s3_client(),
+                embedder,
+                settings,
+            )
+            try:
+                await worker.run()
+            finally:
+                worker.close()
+                await embedder.client.close()
+                if embedder.governor is not None:
+                    click.echo(
+                        "Throttled by rate limiter: "
+                        f"{embedder.governor.throttled_seconds:.2f}s "
+                        f"({embedder.governor.rate_limited} rate-limited responses)"
+                    )
+
+        click.echo("Polling the embedding queue with the async worker. Press Ctrl+C to stop.")
+        try:
+            asyncio.run(_run())
         except KeyboardInterrupt:
-            click.echo("Shutting down SQS poller.")
+            click.echo("Shutting down queue poller.")
+        finally:
+            if settings["extract_executor"] is not None:
+                settings["extract_executor"].shutdown(wait=False, cancel_futures=True)
 
 
 def _quote_identifier(name):
@@ -685,63 +1902,155 @@ def create_db():
         click.echo(f"Database created: {db_name}")
 
 
-def _extract_text(document, data):
-    filename = (document.original_filename or "").lower()
-    content_type = (document.content_type or "").lower()
-    is_pdf = (
+def _extract_text(document, fileobj, executor=None):
+    return "\n".join(_iter_text(document, fileobj, executor=executor))
+
+
+def _iter_text(document, fileobj, executor=None):
+    """Yield the text parts of a document read from a seekable binary file."""
+    filename = document.original_filename
+    content_type = document.content_type
+    if executor is None:
+        return _iter_text_content(filename, content_type, fileobj)
+
+    if _document_kind(filename, content_type, fileobj) == "pdf":
+        page_count = len(PdfReader(fileobj).pages)
+        fileobj.seek(0)
+        min_pages = int(
+            current_app.config.get("PDF_PARALLEL_MIN_PAGES")
+            or os.getenv("PDF_PARALLEL_MIN_PAGES", DEFAULT_PDF_PARALLEL_MIN_PAGES)
+        )
+        if page_count >= min_pages:
+            pages_per_task = int(
+                current_app.config.get("PDF_PAGES_PER_TASK")
+                or os.getenv("PDF_PAGES_PER_TASK", DEFAULT_PDF_PAGES_PER_TASK)
+            )
+            return _iter_pdf_text_parallel(fileobj, page_count, executor, pages_per_task)
+
+    with _temporary_copy(fileobj) as path:
+        return executor.submit(_extract_text_parts, filename, content_type, path).result()
+
+
+def _extract_text_parts(filename, content_type, path):
+    with open(path, "rb") as handle:
+        return list(_iter_text_content(filename, content_type, handle))
+
+
+@contextmanager
+def _temporary_copy(fileobj, suffix=None):
+    # Pool processes open a named copy instead of receiving the document
+    # bytes with every task.
+    handle = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        with handle:
+            fileobj.seek(0)
+            shutil.copyfileobj(fileobj, handle)
+        yield handle.name
+    finally:
+        os.unlink(handle.name)
+
+
+def _iter_pdf_text_parallel(fileobj, page_count, executor, pages_per_task):
+    """Extract page ranges in the process pool and yield pages in order."""
+    pages_per_task = max(pages_per_task, 1)
+    with _temporary_copy(fileobj, suffix=".pdf") as path:
+        starts = range(0, page_count, pages_per_task)
+        stops = [min(start + pages_per_task, page_count) for start in starts]
+        for texts in executor.map(_extract_pdf_pages, repeat(path), starts, stops):
+            yield from texts
+
+
+def _extract_pdf_pages(path, start, stop):
+    reader = PdfReader(path)
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+def _require_text(parts):
+    parts = iter(parts)
+    leading = []
+    for part in parts:
+        leading.append(part)
+        if part.strip():
+            return chain(leading, parts)
+    raise click.ClickException("No text content extracted from document.")
+
+
+def _read_header(fileobj, size):
+    position = fileobj.tell()
+    header = fileobj.read(size)
+    fileobj.seek(position)
+    return header
+
+
+def _document_kind(filename, content_type, fileobj):
+    filename = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if (
         content_type == "application/pdf"
         or filename.endswith(".pdf")
-        or data[:4] == b"%PDF"
-    )
-    is_excel = (
+        or _read_header(fileobj, 4) == b"%PDF"
+    ):
+        return "pdf"
+    if (
         content_type
         == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         or filename.endswith(".xlsx")
-    )
-    is_powerpoint = (
+    ):
+        return "excel"
+    if (
         content_type
         == "application/vnd.openxmlformats-officedocument.presentationml.presentation"
         or filename.endswith(".pptx")
-    )
+    ):
+        return "powerpoint"
+    return "text"
 
-    if is_pdf:
-        reader = PdfReader(io.BytesIO(data))
-        parts = [page.extract_text() or "" for page in reader.pages]
-        return "\n".join(parts)
 
-    if is_excel:
+def _iter_text_content(filename, content_type, fileobj):
+    """Yield the text of a document one page, row or shape at a time.
+
+    ``fileobj`` is a seekable binary file; the parsers read it in place.
+    Joining the parts with newlines gives the full document text.
+    """
+    kind = _document_kind(filename, content_type, fileobj)
+
+    if kind == "pdf":
+        reader = PdfReader(fileobj)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    if kind == "excel":
         from openpyxl import load_workbook
 
-        workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
-        parts = []
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
         for sheet in workbook.worksheets:
-            parts.append(f"# Sheet: {sheet.title}")
+            yield f"# Sheet: {sheet.title}"
             for row in sheet.iter_rows(values_only=True):
                 row_values = [str(value) for value in row if value is not None]
                 if row_values:
-                    parts.append("\t".join(row_values))
-        return "\n".join(parts)
+                    yield "\t".join(row_values)
+        return
 
-    if is_powerpoint:
+    if kind == "powerpoint":
         from pptx import Presentation
 
-        presentation = Presentation(io.BytesIO(data))
-        parts = []
+        presentation = Presentation(fileobj)
         for slide_index, slide in enumerate(presentation.slides, start=1):
-            parts.append(f"# Slide {slide_index}")
+            yield f"# Slide {slide_index}"
             for shape in slide.shapes:
                 if getattr(shape, "has_text_frame", False) and shape.text:
-                    parts.append(shape.text)
+                    yield shape.text
                 if getattr(shape, "has_table", False):
                     for row in shape.table.rows:
                         row_values = [
                             cell.text for cell in row.cells if cell.text
                         ]
                         if row_values:
-                            parts.append("\t".join(row_values))
-        return "\n".join(parts)
+                            yield "\t".join(row_values)
+        return
 
-    return data.decode("utf-8", errors="ignore")
+    yield fileobj.read().decode("utf-8", errors="ignore")
 
 
 def _encoding_for_model(model):
@@ -759,3 +2068,61 @@ def _chunk_tokens(encoding, tokens, chunk_size, chunk_overlap):
         encoding.decode(tokens[i : i + chunk_size])
         for i in range(0, len(tokens), step)
     ]
+
+
+def _last_token_boundary(text):
+    # A single space between two non-space characters always starts a new
+    # tiktoken pre-token, so encoding either side separately gives the same
+    # tokens as encoding the joined text.
+    index = text.rfind(" ")
+    while index > 0:
+        if (
+            index + 1 < len(text)
+            and not text[index - 1].isspace()
+            and not text[index + 1].isspace()
+        ):
+            return index
+        index = text.rfind(" ", 0, index)
+    return 0
+
+
+def _iter_text_tokens(encoding, parts):
+    """Tokenize newline-joined text parts without building the full string.
+
+    Only the text after the last safe token boundary is carried into the next
+    part, so the tokens match ``encoding.encode("\\n".join(parts))``. Text
+    without a boundary (space-less scripts, long runs of symbols) is flushed
+    once it reaches ``MAX_PENDING_TEXT`` characters, so it is not rescanned
+    for every part; only the tokens at that cut can differ.
+    """
+    pending = ""
+    for index, part in enumerate(parts):
+        pending = f"{pending}\n{part}" if index else part
+        boundary = _last_token_boundary(pending)
+        if boundary:
+            yield encoding.encode(pending[:boundary])
+            pending = pending[boundary:]
+        if len(pending) >= MAX_PENDING_TEXT:
+            yield encoding.encode(pending)
+            pending = ""
+    if pending:
+        yield encoding.encode(pending)
+
+
+def _iter_token_chunks(encoding, token_batches, chunk_size, chunk_overlap):
+    """Yield ``(text, token_count)`` chunks with the same boundaries as _chunk_tokens.
+
+    Only the current window of at most ``chunk_size`` tokens plus the latest
+    batch is held in memory.
+    """
+    step = max(chunk_size - chunk_overlap, 1)
+    window = []
+    for tokens in token_batches:
+        window.extend(tokens)
+        while len(window) >= chunk_size:
+            yield encoding.decode(window[:chunk_size]), chunk_size
+            del window[:step]
+    while window:
+        piece = window[:chunk_size]
+        yield encoding.decode(piece), len(piece)
+        del window[:step]
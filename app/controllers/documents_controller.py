@@ -1,3 +1,4 @@
+from datetime import datetime, timezone
 from functools import wraps
 
 from flask import current_app, jsonify, request, g
@@ -14,7 +15,9 @@ from app.models.document import Document
 from app.models.document_embedding import DocumentEmbedding
 from app.operations.documents.save import Save as SaveDocument
 from app.operations.documents.enqueue_embedding import EnqueueEmbedding
-from app.storage import get_storage
+from app.operations.documents.finalize_upload import FinalizeUpload
+from app.operations.documents.presign_upload import UPLOADING_STATUS, PresignUpload
+from app.storage import get_download_url
 
 
 ITEMS_PER_PAGE = 20
@@ -29,7 +32,7 @@ def _get_payload():
     return {}
 
 
-def _public_document_payload(document, has_embeddings=False):
+def _public_document_payload(document, has_embeddings=False, include_download_url=True):
     return {
         "id": document.id,
         "name": document.name,
@@ -38,7 +41,9 @@ def _public_document_payload(document, has_embeddings=False):
         "original_filename": document.original_filename,
         "content_type": document.content_type,
         "size_bytes": document.size_bytes,
-        "download_url": get_storage().url(document.storage_key),
+        "download_url": (
+            get_download_url(document.storage_key)["url"] if include_download_url else None
+        ),
         "embedding_status": document.embedding_status,
         "enqueue_error": document.enqueue_error,
         "embedding_error": document.embedding_error,
@@ -95,6 +100,11 @@ def _allowed_document_types_for_user(user):
     return user.allowed_document_types(allowed_types)
 
 
+def _download_urls_requested():
+    value = request.args.get("download_urls")
+    return value is None or value.lower() not in {"0", "false", "no", "n"}
+
+
 def _apply_user_document_type_filter(query, user):
     allowed_types = _allowed_document_types_for_user(user)
     if allowed_types is None:
@@ -106,7 +116,10 @@ def _apply_user_document_type_filter(query, user):
 
 @_maybe_authenticate_public_documents
 def public_index():
-    documents_query = Document.query.order_by(Document.created_at.desc())
+    # Documents still waiting for a direct upload have no file to show yet.
+    documents_query = Document.query.filter(
+        Document.embedding_status != UPLOADING_STATUS
+    ).order_by(Document.created_at.desc())
     user = getattr(g, "current_user", None)
     documents_query = _apply_user_document_type_filter(documents_query, user)
 
@@ -135,8 +148,11 @@ def public_index():
     )
 
     embedding_ids = _document_embedding_ids(documents)
+    include_download_urls = _download_urls_requested()
     records = [
-        _public_document_payload(document, document.id in embedding_ids)
+        _public_document_payload(
+            document, document.id in embedding_ids, include_download_urls
+        )
         for document in documents
     ]
 
@@ -157,18 +173,26 @@ def public_document_types():
     return jsonify({"document_types": _allowed_document_types_for_user(user)})
 
 
-@_maybe_authenticate_public_documents
-def public_show(document_id):
+def _find_public_document(document_id):
+    """Return ``(document, None)`` or ``(None, error_response)`` for the current user."""
     document = db.session.get(Document, document_id)
-    if document is None:
-        return jsonify({"message": "not found"}), 404
+    if document is None or document.embedding_status == UPLOADING_STATUS:
+        return None, (jsonify({"message": "not found"}), 404)
     user = getattr(g, "current_user", None)
     allowed_types = _allowed_document_types_for_user(user)
     if allowed_types is not None and allowed_types:
         if document.document_type not in allowed_types:
-            return jsonify({"message": "unauthorized"}), 403
+            return None, (jsonify({"message": "unauthorized"}), 403)
     elif allowed_types == []:
-        return jsonify({"message": "unauthorized"}), 403
+        return None, (jsonify({"message": "unauthorized"}), 403)
+    return document, None
+
+
+@_maybe_authenticate_public_documents
+def public_show(document_id):
+    document, error = _find_public_document(document_id)
+    if error is not None:
+        return error
     has_embeddings = (
         db.session.query(DocumentEmbedding.document_id)
         .filter(DocumentEmbedding.document_id == document.id)
@@ -178,6 +202,20 @@ def public_show(document_id):
     return jsonify(_public_document_payload(document, has_embeddings))
 
 
+@_maybe_authenticate_public_documents
+def public_download_url(document_id):
+    document, error = _find_public_document(document_id)
+    if error is not None:
+        return error
+    signed = get_download_url(document.storage_key)
+    return jsonify(
+        {
+            "download_url": signed["url"],
+            "expires_at": datetime.fromtimestamp(signed["expires_at"], timezone.utc).isoformat(),
+        }
+    )
+
+
 @authenticate_user
 @authorize_active
 @authorize_admin
@@ -257,6 +295,43 @@ def create():
     return jsonify({"message": cmd.message}), 422
 
 
+@authenticate_user
+@authorize_active
+@authorize_admin
+def create_upload():
+    payload = _get_payload()
+    cmd = PresignUpload(
+        name=payload.get("name"),
+        description=payload.get("description"),
+        document_type=payload.get("document_type"),
+        filename=payload.get("filename"),
+        content_type=payload.get("content_type"),
+        size_bytes=payload.get("size_bytes"),
+        method=payload.get("method"),
+    )
+    cmd.execute()
+
+    if cmd.valid():
+        return jsonify({"document": cmd.document.to_dict(), "upload": cmd.upload})
+    return jsonify({"message": cmd.message}), 422
+
+
+@authenticate_user
+@authorize_active
+@authorize_admin
+def finalize_upload(document_id):
+    document = db.session.get(Document, document_id)
+    if document is None:
+        return jsonify({"message": "not found"}), 404
+
+    cmd = FinalizeUpload(document=document)
+    cmd.execute()
+
+    if cmd.valid():
+        return jsonify(document.to_dict())
+    return jsonify({"message": cmd.message}), 422
+
+
 @authenticate_user
 @authorize_active
 @authorize_admin
@@ -30,6 +30,7 @@ def inquire():
         document_types=requested_types,
         top_k=payload.get("k"),
         config=current_app.config,
+        ef_search=payload.get("ef_search"),
     )
     cmd.execute()
 
@@ -0,0 +1,60 @@
+from flask import jsonify, request, send_file
+
+from app.models.document import Document
+from app.storage import get_storage
+
+
+def _local_storage():
+    storage = get_storage()
+    return storage if storage.provider == "local" else None
+
+
+def _verified(storage, method, key):
+    return storage.verify(
+        method,
+        key,
+        request.args.get("expires"),
+        request.args.get("signature"),
+        max_bytes=request.args.get("max_bytes"),
+    )
+
+
+def _content_type(storage, key):
+    document = Document.query.filter_by(
+        storage_provider=storage.provider, storage_key=key
+    ).first()
+    return (document and document.content_type) or "application/octet-stream"
+
+
+def download(key):
+    storage = _local_storage()
+    if storage is None:
+        return jsonify({"message": "not found"}), 404
+    if not _verified(storage, "GET", key):
+        return jsonify({"message": "unauthorized"}), 403
+    path = storage.path(key)
+    if not path.is_file():
+        return jsonify({"message": "not found"}), 404
+    # send_file hands the open file to the server's wsgi.file_wrapper, which
+    # gunicorn turns into sendfile(2); USE_X_SENDFILE defers it to the proxy.
+    return send_file(
+        path,
+        mimetype=_content_type(storage, key),
+        conditional=True,
+    )
+
+
+def upload(key):
+    storage = _local_storage()
+    if storage is None:
+        return jsonify({"message": "not found"}), 404
+    if not _verified(storage, "PUT", key):
+        return jsonify({"message": "unauthorized"}), 403
+    if request.content_length is None:
+        return jsonify({"message": "content length is required"}), 411
+    max_bytes = request.args.get("max_bytes", type=int)
+    if max_bytes and request.content_length > max_bytes:
+        return jsonify({"message": "file is too large"}), 413
+
+    storage.save(key, request.stream, content_type=request.mimetype or None)
+    return "", 200
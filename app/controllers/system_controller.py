@@ -2,9 +2,15 @@ import os
 
 from flask import current_app, jsonify, request
 
+from app.embeddings.query_cache import get_query_embedding_cache
 from app.helpers.api_helpers import generate_jwt
+from app.operations.inquiries.answer_cache import get_answer_cache
 from app.operations.system.login import Login
-from app.controllers.authenticated_controller import authenticate_user, authorize_active
+from app.controllers.authenticated_controller import (
+    authenticate_user,
+    authorize_active,
+    authorize_admin,
+)
 
 
 def login():
@@ -46,3 +52,19 @@ def environment():
             value = os.getenv(key)
         payload[key] = value
     return jsonify({"env": payload})
+
+
+@authenticate_user
+@authorize_active
+@authorize_admin
+def cache_stats():
+    """Hit rates of this worker process's inquiry caches."""
+    query_embeddings = get_query_embedding_cache(current_app.config)
+    answers = get_answer_cache(current_app.config)
+    return jsonify(
+        {
+            "pid": os.getpid(),
+            "query_embeddings": query_embeddings.stats() if query_embeddings else None,
+            "answers": answers.stats() if answers else None,
+        }
+    )
@@ -0,0 +1,56 @@
+from app.embeddings.cache import (
+    CachedEmbedder,
+    DatabaseEmbeddingCache,
+    DiskEmbeddingCache,
+    build_embedding_cache,
+)
+from app.embeddings.embedders import (
+    AsyncOpenAIEmbedder,
+    BaseEmbedder,
+    EmbedderError,
+    LocalEmbedder,
+    OpenAIEmbedder,
+    content_hash,
+    iter_batches,
+    iter_embeddings,
+)
+from app.embeddings.metrics import JobTimer, record_embedding_job, start_metrics_server
+from app.embeddings.query_cache import (
+    QueryEmbeddingCache,
+    clear_query_embedding_cache,
+    get_query_embedding_cache,
+)
+from app.embeddings.rate_limit import (
+    RateGovernor,
+    get_rate_governor,
+    openai_max_retries,
+)
+from app.embeddings.registry import clear_embedders, get_embedder
+from app.embeddings.writer import EmbeddingWriter
+
+__all__ = [
+    "AsyncOpenAIEmbedder",
+    "BaseEmbedder",
+    "CachedEmbedder",
+    "DatabaseEmbeddingCache",
+    "DiskEmbeddingCache",
+    "EmbedderError",
+    "EmbeddingWriter",
+    "JobTimer",
+    "LocalEmbedder",
+    "OpenAIEmbedder",
+    "QueryEmbeddingCache",
+    "RateGovernor",
+    "build_embedding_cache",
+    "clear_embedders",
+    "clear_query_embedding_cache",
+    "content_hash",
+    "get_embedder",
+    "get_query_embedding_cache",
+    "get_rate_governor",
+    "iter_batches",
+    "iter_embeddings",
+    "openai_max_retries",
+    "record_embedding_job",
+    "start_metrics_server",
+]
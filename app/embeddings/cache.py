@@ -0,0 +1,217 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app import db
+from app.embeddings.embedders import BaseEmbedder
+from app.models.embedding_cache_entry import EmbeddingCacheEntry
+
+
+DEFAULT_EMBEDDING_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def normalized_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _as_floats(embedding):
+    return [float(value) for value in embedding]
+
+
+class BaseEmbeddingCache:
+    def get_many(self, model_name, keys):
+        """Return ``{key: embedding}`` for the keys that are cached."""
+        raise NotImplementedError
+
+    def set_many(self, model_name, entries):
+        raise NotImplementedError
+
+
+class DatabaseEmbeddingCache(BaseEmbeddingCache):
+    """Cache rows in ``embedding_cache_entries``.
+
+    Lookups use the job's session. Writes commit on a short transaction of
+    their own, in key order, so workers embedding overlapping chunks neither
+    deadlock on the rows nor hold them until the other job commits.
+    """
+
+    def get_many(self, model_name, keys):
+        if not keys:
+            return {}
+        rows = (
+            db.session.query(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding)
+            .filter(EmbeddingCacheEntry.model_name == model_name)
+            .filter(EmbeddingCacheEntry.content_hash.in_(list(keys)))
+            .all()
+        )
+        return {key: _as_floats(embedding) for key, embedding in rows}
+
+    def set_many(self, model_name, entries):
+        if not entries:
+            return
+        statement = pg_insert(EmbeddingCacheEntry).values(
+            [
+                {"model_name": model_name, "content_hash": key, "embedding": entries[key]}
+                for key in sorted(entries)
+            ]
+        )
+        with db.engine.begin() as connection:
+            connection.execute(statement.on_conflict_do_nothing())
+
+
+@dataclass
+class DiskEmbeddingCache(BaseEmbeddingCache):
+    """JSON files under ``root`` with least-recently-used eviction by total size."""
+
+    root: str
+    max_bytes: int = DEFAULT_EMBEDDING_CACHE_MAX_BYTES
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _size: int | None = field(default=None, init=False, repr=False)
+
+    def get_many(self, model_name, keys):
+        found = {}
+        for key in keys:
+            path = self._path(model_name, key)
+            try:
+                with path.open("r", encoding="utf-8") as handle:
+                    found[key] = json.load(handle)
+                os.utime(path)
+            except (FileNotFoundError, ValueError):
+                continue
+        return found
+
+    def set_many(self, model_name, entries):
+        written = 0
+        for key, embedding in entries.items():
+            path = self._path(model_name, key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=path.parent, delete=False
+            ) as handle:
+                json.dump(_as_floats(embedding), handle)
+            try:
+                # Overwriting an entry only grows the cache by the difference.
+                written -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(handle.name, path)
+            written += path.stat().st_size
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += written
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _path(self, model_name, key):
+        model_dir = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:16]
+        return Path(self.root) / model_dir / key[:2] / f"{key}.json"
+
+    def _files(self):
+        return [path for path in Path(self.root).glob("*/*/*.json") if path.is_file()]
+
+    def _scan_size(self):
+        return sum(path.stat().st_size for path in self._files())
+
+    def _evict(self):
+        # Trim to 90% of the cap so eviction does not run on every write.
+        target = int(self.max_bytes * 0.9)
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        size = sum(entry[1] for entry in entries)
+        for _, file_size, path in sorted(entries, key=lambda entry: entry[0]):
+            if size <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            size -= file_size
+        self._size = size
+
+
+class CachedEmbedder(BaseEmbedder):
+    """Serve embeddings from a cache and only send misses to ``embedder``."""
+
+    def __init__(self, embedder, cache):
+        self.embedder = embedder
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def type(self):
+        return self.embedder.type
+
+    @property
+    def encoding_model(self):
+        return self.embedder.encoding_model
+
+    @property
+    def model_name(self):
+        return self.embedder.model_name
+
+    @property
+    def governor(self):
+        return getattr(self.embedder, "governor", None)
+
+    def warmup(self):
+        self.embedder.warmup()
+
+    def embed_batch(self, texts, token_count=None):
+        keys = [normalized_hash(text) for text in texts]
+        found = self.cache.get_many(self.model_name, set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            if token_count:
+                token_count = max(token_count * len(missing) // len(texts), 1)
+            embedded = self.embedder.embed_batch(
+                list(missing.values()), token_count=token_count
+            )
+            new_entries = dict(zip(missing.keys(), embedded))
+            self.cache.set_many(self.model_name, new_entries)
+            found.update(new_entries)
+
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        return [found[key] for key in keys]
+
+
+def build_embedding_cache(config):
+    backend = str(config.get("EMBEDDING_CACHE_BACKEND") or "").lower()
+    if not backend or backend == "none":
+        return None
+    if backend == "database":
+        return DatabaseEmbeddingCache()
+    if backend == "disk":
+        return DiskEmbeddingCache(
+            root=config.get("EMBEDDING_CACHE_DIR") or ".cache/embeddings",
+            max_bytes=int(
+                config.get("EMBEDDING_CACHE_MAX_BYTES") or DEFAULT_EMBEDDING_CACHE_MAX_BYTES
+            ),
+        )
+    raise ValueError(f"Unsupported embedding cache backend: {backend}")
@@ -0,0 +1,161 @@
+from dataclasses import dataclass, field
+from typing import Any
+import hashlib
+import os
+import threading
+
+from app.embeddings.rate_limit import estimate_tokens
+
+
+DEFAULT_EMBEDDING_BATCH_SIZE = 64
+DEFAULT_EMBEDDING_BATCH_MAX_TOKENS = 100_000
+
+
+class EmbedderError(Exception):
+    pass
+
+
+class BaseEmbedder:
+    type = None
+    encoding_model = "cl100k_base"
+
+    @property
+    def model_name(self):
+        raise NotImplementedError
+
+    def embed_batch(self, texts, token_count=None):
+        """Embed ``texts``; ``token_count`` is their total size when already known."""
+        raise NotImplementedError
+
+    def warmup(self):
+        """Load the model and open connections before the first real job."""
+        self.embed_batch(["warmup"])
+
+
+@dataclass
+class OpenAIEmbedder(BaseEmbedder):
+    client: Any
+    model: str
+    governor: Any = None
+    type = "openai"
+
+    @property
+    def encoding_model(self):
+        return self.model
+
+    @property
+    def model_name(self):
+        return f"openai:{self.model}"
+
+    def embed_batch(self, texts, token_count=None):
+        texts = list(texts)
+        if self.governor is None:
+            response = self.client.embeddings.create(model=self.model, input=texts)
+        else:
+            # The raw response exposes the rate-limit headers to the governor.
+            response = self.governor.call(
+                lambda: self.client.embeddings.with_raw_response.create(
+                    model=self.model, input=texts
+                ),
+                token_count or estimate_tokens(texts),
+            ).parse()
+        data = sorted(response.data, key=lambda item: item.index)
+        if len(data) != len(texts):
+            raise EmbedderError(
+                f"OpenAI returned {len(data)} embeddings for {len(texts)} inputs."
+            )
+        return [item.embedding for item in data]
+
+
+@dataclass
+class AsyncOpenAIEmbedder(OpenAIEmbedder):
+    """OpenAIEmbedder for an ``AsyncOpenAI`` client; ``embed_batch`` is a coroutine.
+
+    Shares ``model_name`` with OpenAIEmbedder so content hashes written by the
+    sync and async workers are interchangeable.
+    """
+
+    async def embed_batch(self, texts, token_count=None):
+        texts = list(texts)
+        if self.governor is None:
+            response = await self.client.embeddings.create(model=self.model, input=texts)
+        else:
+            raw = await self.governor.call_async(
+                lambda: self.client.embeddings.with_raw_response.create(
+                    model=self.model, input=texts
+                ),
+                token_count or estimate_tokens(texts),
+            )
+            response = raw.parse()
+        data = sorted(response.data, key=lambda item: item.index)
+        if len(data) != len(texts):
+            raise EmbedderError(
+                f"OpenAI returned {len(data)} embeddings for {len(texts)} inputs."
+            )
+        return [item.embedding for item in data]
+
+    async def warmup(self):
+        await self.embed_batch(["warmup"])
+
+
+@dataclass
+class LocalEmbedder(BaseEmbedder):
+    llm: Any
+    type = "local"
+    # llama.cpp contexts are not safe to use from several threads at once.
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def model_name(self):
+        model_path = getattr(self.llm, "model_path", None) or "unknown"
+        return f"local:{os.path.basename(model_path)}"
+
+    def embed_batch(self, texts, token_count=None):
+        with self._lock:
+            response = self.llm.create_embedding(list(texts))
+        data = sorted(response["data"], key=lambda item: item.get("index", 0))
+        if len(data) != len(texts):
+            raise EmbedderError(
+                f"Local model returned {len(data)} embeddings for {len(texts)} inputs."
+            )
+        return [item["embedding"] for item in data]
+
+
+def content_hash(model_name, text):
+    """Hash a chunk together with the model that embeds it.
+
+    Switching embedding models changes every hash, so no vectors from the
+    previous model are reused.
+    """
+    return hashlib.sha256(f"{model_name}\n{text}".encode("utf-8")).hexdigest()
+
+
+def iter_batches(items, batch_size, max_tokens=None):
+    """Group ``(text, token_count)`` items by count and by token total."""
+    if batch_size <= 0:
+        raise ValueError("batch_size must be greater than 0")
+
+    batch = []
+    batch_tokens = 0
+    for text, token_count in items:
+        token_count = token_count or 0
+        if batch and (
+            len(batch) >= batch_size
+            or (max_tokens and batch_tokens + token_count > max_tokens)
+        ):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append((text, token_count))
+        batch_tokens += token_count
+
+    if batch:
+        yield batch
+
+
+def iter_embeddings(embedder, items, batch_size, max_tokens=None):
+    """Yield ``(text, embedding)`` for each ``(text, token_count)`` item, in order."""
+    for batch in iter_batches(items, batch_size, max_tokens=max_tokens):
+        texts = [text for text, _ in batch]
+        token_count = sum(count for _, count in batch) or None
+        yield from zip(texts, embedder.embed_batch(texts, token_count=token_count))
@@ -0,0 +1,156 @@
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+import logging
+import threading
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+JOB_STAGES = (
+    "sqs_receive",
+    "s3_download",
+    "extraction",
+    "tokenization",
+    "chunking",
+    "embedding_api",
+    "db_insert",
+)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_METRICS = None
+_METRICS_LOCK = threading.Lock()
+
+
+class JobTimer:
+    """Accumulate wall-clock seconds per stage for one embedding job.
+
+    Stages nest: entering a stage pauses the enclosing one, so time spent in
+    a generator that pulls from another generator is charged to the inner
+    stage only. Not thread-safe; coroutines that overlap should ``add``
+    their own measurements instead.
+    """
+
+    def __init__(self, **stages):
+        # Stages measured before the job started (the queue receive) count
+        # towards its total.
+        self.stages = defaultdict(float, stages)
+        self.counts = {}
+        self._stack = []
+        self._mark = None
+        self._started = time.perf_counter() - sum(stages.values())
+
+    @contextmanager
+    def stage(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self.stages[self._stack[-1]] += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.stages[self._stack.pop()] += now - self._mark
+            self._mark = now
+
+    def iter(self, name, iterable):
+        """Yield from ``iterable``, charging the time spent producing items to ``name``."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def add(self, name, seconds):
+        self.stages[name] += seconds
+
+    def timings(self):
+        timings = {name: round(self.stages.get(name, 0.0), 6) for name in JOB_STAGES}
+        timings["total"] = round(time.perf_counter() - self._started, 6)
+        return timings
+
+
+class TimedEmbedder:
+    """Charge ``embed_batch`` calls to the ``embedding_api`` stage of ``timer``."""
+
+    def __init__(self, embedder, timer):
+        self.embedder = embedder
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.embedder, name)
+
+    def embed_batch(self, texts, token_count=None):
+        with self.timer.stage("embedding_api"):
+            return self.embedder.embed_batch(texts, token_count=token_count)
+
+
+def record_embedding_job(timer, content_type=None, embedder=None, status="embedded", **fields):
+    """Emit one JSON log line for a finished job and update Prometheus metrics."""
+    content_type = content_type or "unknown"
+    embedder = embedder or "unknown"
+    timings = timer.timings()
+    LOGGER.info(
+        json.dumps(
+            {
+                "event": "embedding_job",
+                "status": status,
+                "content_type": content_type,
+                "embedder": embedder,
+                "timings": timings,
+                **timer.counts,
+                **fields,
+            },
+            default=str,
+        )
+    )
+
+    metrics = _METRICS
+    if metrics is None:
+        return
+    metrics["jobs"].labels(content_type, embedder, status).inc()
+    for stage, seconds in timings.items():
+        metrics["stage_seconds"].labels(stage, content_type, embedder).observe(seconds)
+    for name in ("tokens", "chunks"):
+        if timer.counts.get(name):
+            metrics[name].labels(content_type, embedder).inc(timer.counts[name])
+
+
+def start_metrics_server(port):
+    """Serve Prometheus metrics on ``port``; requires ``prometheus_client``."""
+    global _METRICS
+    try:
+        import prometheus_client
+    except ImportError as exc:
+        raise RuntimeError(
+            "prometheus_client is not installed. Install it to enable the metrics port."
+        ) from exc
+
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            labels = ["content_type", "embedder"]
+            _METRICS = {
+                "jobs": prometheus_client.Counter(
+                    "embedding_jobs_total",
+                    "Embedding jobs processed.",
+                    labels + ["status"],
+                ),
+                "stage_seconds": prometheus_client.Histogram(
+                    "embedding_job_stage_seconds",
+                    "Seconds spent per embedding job stage.",
+                    ["stage"] + labels,
+                    buckets=STAGE_BUCKETS,
+                ),
+                "tokens": prometheus_client.Counter(
+                    "embedding_job_tokens_total", "Tokens read from documents.", labels
+                ),
+                "chunks": prometheus_client.Counter(
+                    "embedding_job_chunks_total", "Chunks produced from documents.", labels
+                ),
+            }
+        prometheus_client.start_http_server(port)
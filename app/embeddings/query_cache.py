@@ -0,0 +1,151 @@
+from array import array
+from collections import OrderedDict
+import os
+import threading
+import time
+
+from app.embeddings.cache import build_embedding_cache, normalized_hash
+
+
+DEFAULT_QUERY_CACHE_SIZE = 1024
+DEFAULT_QUERY_CACHE_TTL = 24 * 60 * 60
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+class QueryEmbeddingCache:
+    """In-process LRU of query embeddings with a time-to-live.
+
+    Keys are the embedding model and the hash of the whitespace- and
+    Unicode-normalized query, so "What is X?" and " what  is X? " differ but
+    repeated spacing does not. Vectors are stored as float32 arrays, which
+    bounds memory to roughly ``max_entries * dimensions * 4`` bytes. Misses
+    fall back to ``shared`` (an embedding cache backend) before the API.
+    """
+
+    def __init__(
+        self,
+        max_entries=DEFAULT_QUERY_CACHE_SIZE,
+        ttl=DEFAULT_QUERY_CACHE_TTL,
+        shared=None,
+        clock=time.monotonic,
+    ):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self.shared = shared
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, model_name, query):
+        key = normalized_hash(query)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get((model_name, key))
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end((model_name, key))
+                self.hits += 1
+                return entry[1].tolist()
+            if entry is not None:
+                del self._entries[(model_name, key)]
+
+        if self.shared is not None:
+            embedding = self.shared.get_many(model_name, {key}).get(key)
+            if embedding is not None:
+                self._store(model_name, key, embedding)
+                with self._lock:
+                    self.shared_hits += 1
+                return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, model_name, query, embedding):
+        key = normalized_hash(query)
+        self._store(model_name, key, embedding)
+        if self.shared is not None:
+            self.shared.set_many(model_name, {key: embedding})
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, model_name, key, embedding):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(model_name, key)] = (self._clock() + self.ttl, array("f", embedding))
+            self._entries.move_to_end((model_name, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def get_query_embedding_cache(config):
+    """Return the process-wide query embedding cache, or None when disabled.
+
+    ``QUERY_EMBEDDING_CACHE_SHARED`` adds the ``EMBEDDING_CACHE_BACKEND``
+    cache behind it, so processes share embedded queries.
+    """
+    global _CACHE
+    max_entries = int(_setting(config, "QUERY_EMBEDDING_CACHE_SIZE", DEFAULT_QUERY_CACHE_SIZE))
+    if max_entries <= 0:
+        return None
+    if _CACHE is not None:
+        return _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            shared = None
+            if str(_setting(config, "QUERY_EMBEDDING_CACHE_SHARED", "false")).lower() in {
+                "1",
+                "true",
+                "yes",
+                "y",
+            }:
+                shared = build_embedding_cache(config)
+            _CACHE = QueryEmbeddingCache(
+                max_entries=max_entries,
+                ttl=float(_setting(config, "QUERY_EMBEDDING_CACHE_TTL", DEFAULT_QUERY_CACHE_TTL)),
+                shared=shared,
+            )
+    return _CACHE
+
+
+def clear_query_embedding_cache():
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = None
+
+
+def _setting(config, name, default):
+    value = config.get(name)
+    if value is None or value == "":
+        value = os.getenv(name)
+    return default if value is None or value == "" else value
+
+
+def _reset_after_fork():
+    global _CACHE_LOCK
+    _CACHE_LOCK = threading.Lock()
+    if _CACHE is not None:
+        _CACHE._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,388 @@
+from contextlib import contextmanager
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts keep state in-process
+    fcntl = None
+
+from openai import DEFAULT_MAX_RETRIES, APIConnectionError
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMIT_ATTEMPTS = 6
+DEFAULT_RATE_LIMIT_RETRY_AFTER = 1.0
+RETRY_BACKOFF = 0.5
+MAX_RETRY_BACKOFF = 8.0
+MIN_RATE_FACTOR = 0.05
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_STEP = 0.02
+LOW_REMAINING_FRACTION = 0.05
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+_TRUTHY = {"1", "true", "yes", "y"}
+
+_GOVERNORS = {}
+_GOVERNORS_LOCK = threading.Lock()
+
+
+def parse_reset(value):
+    """Parse OpenAI reset headers such as ``"1s"``, ``"6m0s"`` or ``"20ms"``."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(amount + unit for amount, unit in parts) == value:
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def estimate_tokens(texts):
+    """Rough token count for callers that have not tokenized their input."""
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+def _header(headers, name):
+    if not headers:
+        return None
+    return headers.get(name)
+
+
+def _int_header(headers, name):
+    value = _header(headers, name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _response_headers(response):
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(response, "response", None), "headers", None)
+    return headers
+
+
+def _is_rate_limited(exc):
+    return getattr(exc, "status_code", None) == 429
+
+
+def _is_transient(exc):
+    # The failures the SDK retries itself; APITimeoutError is an APIConnectionError.
+    if isinstance(exc, APIConnectionError):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status in (408, 409) or (status is not None and status >= 500)
+
+
+def _retry_delay(attempt):
+    # Exponential backoff with jitter, as the SDK does between its retries.
+    return min(RETRY_BACKOFF * 2**attempt, MAX_RETRY_BACKOFF) * (1 - 0.25 * random.random())
+
+
+def _log_transient(exc, delay):
+    LOGGER.warning("OpenAI request failed (%s); retrying in %.2fs.", exc, delay)
+
+
+class RateGovernor:
+    """Pace OpenAI calls to a tokens- and requests-per-minute budget.
+
+    Capacity refills continuously at ``factor * limit`` per minute. Limits
+    come from configuration or, when not configured, from the
+    ``x-ratelimit-limit-*`` response headers. ``factor`` follows AIMD: it is
+    halved on a 429 or when the headers report the budget nearly spent, and
+    grows back by a small step after each successful call. With
+    ``state_path`` the buckets and factor live in a JSON file guarded by
+    ``flock``, so every process on the host draws from the same budget.
+
+    ``throttled_seconds`` is the time this process spent waiting for capacity.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute=0,
+        requests_per_minute=0,
+        state_path=None,
+        max_attempts=DEFAULT_RATE_LIMIT_ATTEMPTS,
+    ):
+        self.tokens_per_minute = tokens_per_minute or 0
+        self.requests_per_minute = requests_per_minute or 0
+        self.state_path = state_path if fcntl is not None else None
+        self.max_attempts = max_attempts
+        self.throttled_seconds = 0.0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._state = None
+
+    def acquire(self, tokens):
+        while True:
+            wait = self.reserve(tokens)
+            if not wait:
+                return
+            self._add_throttled(wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens):
+        # reserve() and record_*() take locks and do file I/O, so they run off the loop.
+        while True:
+            wait = await asyncio.to_thread(self.reserve, tokens)
+            if not wait:
+                return
+            self._add_throttled(wait)
+            await asyncio.sleep(wait)
+
+    def call(self, func, tokens):
+        """Run ``func()`` within the budget.
+
+        429 responses shrink the budget and are retried once it allows;
+        timeouts, connection errors and 5xx responses are retried after an
+        exponential backoff.
+        """
+        for attempt in range(self.max_attempts):
+            self.acquire(tokens)
+            try:
+                response = func()
+            except Exception as exc:
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                if _is_rate_limited(exc):
+                    self.record_rate_limited(_response_headers(exc))
+                elif _is_transient(exc):
+                    delay = _retry_delay(attempt)
+                    _log_transient(exc, delay)
+                    time.sleep(delay)
+                else:
+                    raise
+                continue
+            self.record_response(_response_headers(response))
+            return response
+
+    async def call_async(self, func, tokens):
+        for attempt in range(self.max_attempts):
+            await self.acquire_async(tokens)
+            try:
+                response = await func()
+            except Exception as exc:
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                if _is_rate_limited(exc):
+                    await asyncio.to_thread(self.record_rate_limited, _response_headers(exc))
+                elif _is_transient(exc):
+                    delay = _retry_delay(attempt)
+                    _log_transient(exc, delay)
+                    await asyncio.sleep(delay)
+                else:
+                    raise
+                continue
+            await asyncio.to_thread(self.record_response, _response_headers(response))
+            return response
+
+    def reserve(self, tokens):
+        """Take capacity for one request; return 0 or the seconds to wait."""
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            if state["blocked_until"] > now:
+                return state["blocked_until"] - now
+
+            wait = 0.0
+            needed = {}
+            for bucket, limit, amount in (
+                ("tokens", self._limit(state, "tokens"), tokens),
+                ("requests", self._limit(state, "requests"), 1),
+            ):
+                if not limit:
+                    continue
+                capacity = limit * state["factor"]
+                # A request larger than the whole budget still goes through
+                # once the bucket is full.
+                needed[bucket] = min(amount, capacity)
+                if state[bucket] < needed[bucket]:
+                    wait = max(wait, (needed[bucket] - state[bucket]) * 60 / capacity)
+            if wait:
+                return wait
+            for bucket, amount in needed.items():
+                state[bucket] -= amount
+            return 0.0
+
+    def record_response(self, headers):
+        """Adjust the budget from the rate-limit headers of a successful call."""
+        with self._locked_state() as state:
+            self._learn_limits(state, headers)
+            exhausted = False
+            for bucket in ("tokens", "requests"):
+                limit = _int_header(headers, f"x-ratelimit-limit-{bucket}")
+                remaining = _int_header(headers, f"x-ratelimit-remaining-{bucket}")
+                if not limit or remaining is None:
+                    continue
+                if remaining <= limit * LOW_REMAINING_FRACTION:
+                    exhausted = True
+                    reset = parse_reset(_header(headers, f"x-ratelimit-reset-{bucket}"))
+                    if reset:
+                        state["blocked_until"] = max(
+                            state["blocked_until"], time.time() + reset
+                        )
+            if exhausted:
+                self._decrease(state)
+            else:
+                state["factor"] = min(1.0, state["factor"] + RATE_INCREASE_STEP)
+
+    def record_rate_limited(self, headers):
+        with self._locked_state() as state:
+            self._learn_limits(state, headers)
+            self._decrease(state)
+            retry_after_ms = parse_reset(_header(headers, "retry-after-ms"))
+            if retry_after_ms:
+                retry_after = retry_after_ms / 1000
+            else:
+                retry_after = parse_reset(_header(headers, "retry-after"))
+            if retry_after is None:
+                retry_after = max(
+                    parse_reset(_header(headers, "x-ratelimit-reset-tokens")) or 0,
+                    parse_reset(_header(headers, "x-ratelimit-reset-requests")) or 0,
+                ) or DEFAULT_RATE_LIMIT_RETRY_AFTER
+            state["blocked_until"] = max(state["blocked_until"], time.time() + retry_after)
+            state["tokens"] = min(state["tokens"] or 0, 0)
+            state["requests"] = min(state["requests"] or 0, 0)
+            factor = state["factor"]
+            self.rate_limited += 1
+        LOGGER.warning(
+            "OpenAI rate limit hit; backing off for %.2fs (rate factor %.2f).",
+            retry_after,
+            factor,
+        )
+
+    def _limit(self, state, bucket):
+        if bucket == "tokens":
+            configured = self.tokens_per_minute
+        else:
+            configured = self.requests_per_minute
+        return configured or state[f"{bucket}_limit"]
+
+    def _learn_limits(self, state, headers):
+        for bucket in ("tokens", "requests"):
+            limit = _int_header(headers, f"x-ratelimit-limit-{bucket}")
+            if limit:
+                state[f"{bucket}_limit"] = limit
+
+    def _decrease(self, state):
+        state["factor"] = max(MIN_RATE_FACTOR, state["factor"] * RATE_DECREASE_FACTOR)
+
+    def _refill(self, state, now):
+        elapsed = max(now - state["updated"], 0.0)
+        state["updated"] = now
+        for bucket in ("tokens", "requests"):
+            limit = self._limit(state, bucket)
+            if not limit:
+                continue
+            capacity = limit * state["factor"]
+            if state[bucket] is None:
+                state[bucket] = capacity
+            else:
+                state[bucket] = min(capacity, state[bucket] + elapsed * capacity / 60)
+
+    def _add_throttled(self, seconds):
+        with self._lock:
+            self.throttled_seconds += seconds
+
+    @staticmethod
+    def _new_state():
+        return {
+            "tokens": None,
+            "requests": None,
+            "tokens_limit": 0,
+            "requests_limit": 0,
+            "factor": 1.0,
+            "blocked_until": 0.0,
+            "updated": time.time(),
+        }
+
+    @contextmanager
+    def _locked_state(self):
+        with self._lock:
+            if not self.state_path:
+                if self._state is None:
+                    self._state = self._new_state()
+                yield self._state
+                return
+
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                with os.fdopen(os.dup(fd), "r+", encoding="utf-8") as handle:
+                    try:
+                        state = {**self._new_state(), **json.loads(handle.read() or "{}")}
+                    except ValueError:
+                        state = self._new_state()
+                    yield state
+                    handle.seek(0)
+                    handle.truncate()
+                    json.dump(state, handle)
+            finally:
+                # Closing the last descriptor releases the lock.
+                os.close(fd)
+
+
+def _rate_limit_enabled(config):
+    value = config.get("OPENAI_RATE_LIMIT") or os.getenv("OPENAI_RATE_LIMIT") or "true"
+    return str(value).lower() in _TRUTHY
+
+
+def openai_max_retries(config):
+    """Return ``max_retries`` for OpenAI clients.
+
+    Governed calls retry 429s, 5xx responses, timeouts and connection errors
+    themselves, so the SDK's own retries are turned off instead of
+    multiplying the attempts.
+    """
+    return 0 if _rate_limit_enabled(config) else DEFAULT_MAX_RETRIES
+
+
+def get_rate_governor(config, model, kind="embedding"):
+    """Return the process-wide governor for ``model``, or None when disabled.
+
+    Limits are read from ``OPENAI_<KIND>_TOKENS_PER_MINUTE`` and
+    ``OPENAI_<KIND>_REQUESTS_PER_MINUTE`` (0 learns them from the headers).
+    """
+
+    def _setting(name, default=None):
+        return config.get(name) or os.getenv(name) or default
+
+    if not _rate_limit_enabled(config):
+        return None
+    prefix = f"OPENAI_{kind.upper()}"
+    tokens_per_minute = int(_setting(f"{prefix}_TOKENS_PER_MINUTE", 0))
+    requests_per_minute = int(_setting(f"{prefix}_REQUESTS_PER_MINUTE", 0))
+    state_dir = _setting(
+        "OPENAI_RATE_LIMIT_DIR",
+        os.path.join(tempfile.gettempdir(), "ragflaskapi-rate-limits"),
+    )
+    model_key = hashlib.sha256(model.encode("utf-8")).hexdigest()[:16]
+    state_path = os.path.join(state_dir, f"{model_key}.json")
+
+    key = (model, tokens_per_minute, requests_per_minute, state_path)
+    with _GOVERNORS_LOCK:
+        governor = _GOVERNORS.get(key)
+        if governor is None:
+            os.makedirs(state_dir, exist_ok=True)
+            governor = RateGovernor(
+                tokens_per_minute=tokens_per_minute,
+                requests_per_minute=requests_per_minute,
+                state_path=state_path,
+            )
+            _GOVERNORS[key] = governor
+    return governor
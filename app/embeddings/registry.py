@@ -0,0 +1,35 @@
+import os
+import threading
+
+
+_EMBEDDERS = {}
+_LOCK = threading.Lock()
+
+
+def get_embedder(key, factory):
+    """Return the process-wide embedder for ``key``, building it once with ``factory``."""
+    embedder = _EMBEDDERS.get(key)
+    if embedder is not None:
+        return embedder
+    with _LOCK:
+        embedder = _EMBEDDERS.get(key)
+        if embedder is None:
+            embedder = factory()
+            _EMBEDDERS[key] = embedder
+    return embedder
+
+
+def clear_embedders():
+    with _LOCK:
+        _EMBEDDERS.clear()
+
+
+def _reset_after_fork():
+    # Model handles and HTTP connection pools must not be shared with a forked child.
+    global _LOCK
+    _LOCK = threading.Lock()
+    _EMBEDDERS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
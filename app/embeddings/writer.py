@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+import io
+import json
+
+from sqlalchemy.exc import DBAPIError
+
+from app.models.document_embedding import DocumentEmbedding
+
+
+_COPY_COLUMNS = (
+    "id",
+    "document_id",
+    "document_type",
+    "embedding",
+    "chunk_index",
+    "content",
+    "content_hash",
+    "metadata",
+    "created_at",
+    "updated_at",
+)
+
+
+def _csv_field(value):
+    # Unquoted empty fields are NULL in COPY ... CSV; everything else is quoted.
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _vector_literal(embedding):
+    return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+
+class EmbeddingWriter:
+    """Bulk insert ``document_embeddings`` rows for one document.
+
+    Rows are streamed with ``COPY`` when the session runs on psycopg2 and fall
+    back to a Core ``executemany`` insert otherwise. Both paths skip the ORM
+    ``before_insert`` listener; ``document_type`` is set once per batch from
+    the document instead. The ``(document_id, chunk_index)`` unique constraint
+    still applies to every row.
+    """
+
+    def __init__(self, session, document):
+        self.session = session
+        self.document = document
+
+    def write(self, rows):
+        """Insert ``rows`` of ``chunk_index``, ``content``, ``content_hash``,
+        ``embedding`` and ``metadata`` in the session's transaction."""
+        if not rows:
+            return 0
+        now = datetime.now(timezone.utc)
+        records = [
+            {
+                "id": str(uuid4()),
+                "document_id": self.document.id,
+                "document_type": self.document.document_type,
+                "embedding": row["embedding"],
+                "chunk_index": row["chunk_index"],
+                "content": row.get("content"),
+                "content_hash": row.get("content_hash"),
+                "metadata": row.get("metadata"),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row in rows
+        ]
+        connection = self.session.connection()
+        if self._supports_copy(connection):
+            self._copy(connection, records)
+        else:
+            self._executemany(records)
+        return len(records)
+
+    def _supports_copy(self, connection):
+        if connection.dialect.name != "postgresql":
+            return False
+        dbapi_connection = connection.connection.driver_connection
+        return type(dbapi_connection).__module__.startswith("psycopg2")
+
+    def _copy(self, connection, records):
+        buffer = io.StringIO()
+        for record in records:
+            fields = [
+                record["id"],
+                record["document_id"],
+                record["document_type"],
+                _vector_literal(record["embedding"]),
+                record["chunk_index"],
+                record["content"],
+                record["content_hash"],
+                json.dumps(record["metadata"]) if record["metadata"] is not None else None,
+                record["created_at"].isoformat(),
+                record["updated_at"].isoformat(),
+            ]
+            buffer.write(",".join(_csv_field(value) for value in fields))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        statement = (
+            f"COPY {DocumentEmbedding.__tablename__} ({', '.join(_COPY_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT csv)"
+        )
+        dbapi = connection.dialect.loaded_dbapi
+        with connection.connection.driver_connection.cursor() as cursor:
+            try:
+                cursor.copy_expert(statement, buffer)
+            except dbapi.Error as exc:
+                # Surface driver errors the same way as ORM flushes do
+                # (IntegrityError for duplicate chunk indexes, etc.).
+                raise DBAPIError.instance(statement, None, exc, dbapi.Error) from exc
+
+    def _executemany(self, records):
+        table = DocumentEmbedding.__table__
+        self.session.execute(table.insert(), records)
@@ -0,0 +1,202 @@
+import os
+import tempfile
+import threading
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+
+DEFAULT_AWS_MAX_POOL_CONNECTIONS = 50
+DEFAULT_AWS_MAX_ATTEMPTS = 5
+DEFAULT_AWS_RETRY_MODE = "standard"
+DEFAULT_AWS_CONNECT_TIMEOUT = 5
+DEFAULT_AWS_READ_TIMEOUT = 60
+DEFAULT_S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+DEFAULT_S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+DEFAULT_S3_MAX_CONCURRENCY = 10
+DEFAULT_S3_SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+_CLIENTS = {}
+_LOCK = threading.Lock()
+_SESSION = None
+
+
+def _setting(config, name, default=None):
+    return config.get(name) or os.getenv(name) or default
+
+
+def aws_client_options(config):
+    """Read the shared ``botocore`` tuning options from app config or the environment."""
+    tcp_keepalive = str(_setting(config, "AWS_TCP_KEEPALIVE", "true")).lower()
+    return {
+        "max_pool_connections": int(
+            _setting(config, "AWS_MAX_POOL_CONNECTIONS", DEFAULT_AWS_MAX_POOL_CONNECTIONS)
+        ),
+        "max_attempts": int(_setting(config, "AWS_MAX_ATTEMPTS", DEFAULT_AWS_MAX_ATTEMPTS)),
+        "retry_mode": _setting(config, "AWS_RETRY_MODE", DEFAULT_AWS_RETRY_MODE),
+        "connect_timeout": float(
+            _setting(config, "AWS_CONNECT_TIMEOUT", DEFAULT_AWS_CONNECT_TIMEOUT)
+        ),
+        "read_timeout": float(_setting(config, "AWS_READ_TIMEOUT", DEFAULT_AWS_READ_TIMEOUT)),
+        "tcp_keepalive": tcp_keepalive in {"1", "true", "yes", "y"},
+    }
+
+
+def _botocore_config(options):
+    return Config(
+        max_pool_connections=options["max_pool_connections"],
+        retries={"max_attempts": options["max_attempts"], "mode": options["retry_mode"]},
+        connect_timeout=options["connect_timeout"],
+        read_timeout=options["read_timeout"],
+        tcp_keepalive=options["tcp_keepalive"],
+    )
+
+
+def s3_transfer_options(config):
+    """Read the S3 transfer (multipart and spooling) settings."""
+    return {
+        "multipart_threshold": int(
+            _setting(config, "S3_TRANSFER_MULTIPART_THRESHOLD", DEFAULT_S3_MULTIPART_THRESHOLD)
+        ),
+        "multipart_chunksize": int(
+            _setting(config, "S3_TRANSFER_MULTIPART_CHUNKSIZE", DEFAULT_S3_MULTIPART_CHUNKSIZE)
+        ),
+        "max_concurrency": int(
+            _setting(config, "S3_TRANSFER_MAX_CONCURRENCY", DEFAULT_S3_MAX_CONCURRENCY)
+        ),
+        "spool_max_bytes": int(
+            _setting(config, "S3_DOWNLOAD_SPOOL_MAX_BYTES", DEFAULT_S3_SPOOL_MAX_BYTES)
+        ),
+    }
+
+
+def s3_transfer_config(options=None):
+    options = options or s3_transfer_options({})
+    return TransferConfig(
+        multipart_threshold=options["multipart_threshold"],
+        multipart_chunksize=options["multipart_chunksize"],
+        max_concurrency=options["max_concurrency"],
+    )
+
+
+def download_s3_object(client, bucket, key, fileobj, transfer_options=None, callback=None):
+    """Download an object into the seekable ``fileobj``; return its ``head_object``.
+
+    Objects above the multipart threshold are fetched as concurrent ranged
+    parts. In versioned buckets every part is read from the version ``head``
+    described; s3transfer already keeps the parts of unversioned objects on
+    one ETag.
+    """
+    head = client.head_object(Bucket=bucket, Key=key)
+    client.download_fileobj(
+        bucket,
+        key,
+        fileobj,
+        ExtraArgs={"VersionId": head["VersionId"]} if head.get("VersionId") else None,
+        Callback=callback,
+        Config=s3_transfer_config(transfer_options),
+    )
+    return head
+
+
+def download_s3_fileobj(client, bucket, key, transfer_options=None):
+    """Download an object into a seekable spooled temp file.
+
+    The file stays in memory up to ``spool_max_bytes`` and moves to disk
+    beyond that. Returns ``(file, content_type, content_length)``; the caller
+    closes the file.
+    """
+    options = transfer_options or s3_transfer_options({})
+    handle = tempfile.SpooledTemporaryFile(max_size=options["spool_max_bytes"])
+    try:
+        head = download_s3_object(client, bucket, key, handle, options)
+        handle.seek(0)
+    except BaseException:
+        handle.close()
+        raise
+    return handle, head.get("ContentType"), head.get("ContentLength")
+
+
+def get_aws_client(
+    service_name,
+    region=None,
+    endpoint_url=None,
+    access_key_id=None,
+    secret_access_key=None,
+    options=None,
+):
+    """Return the process-wide boto3 client for these settings, creating it on first use.
+
+    boto3 clients are thread-safe once built, so one client (and its
+    connection pool) is shared by every thread in the process.
+    """
+    options = options or aws_client_options({})
+    key = (
+        service_name,
+        region or None,
+        endpoint_url or None,
+        access_key_id or None,
+        secret_access_key or None,
+        tuple(sorted(options.items())),
+    )
+    client = _CLIENTS.get(key)
+    if client is not None:
+        return client
+
+    global _SESSION
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            # boto3 sessions are not thread-safe; clients are only built under the lock.
+            if _SESSION is None:
+                _SESSION = boto3.session.Session()
+            client = _SESSION.client(
+                service_name,
+                region_name=region or None,
+                endpoint_url=endpoint_url or None,
+                aws_access_key_id=access_key_id or None,
+                aws_secret_access_key=secret_access_key or None,
+                config=_botocore_config(options),
+            )
+            _CLIENTS[key] = client
+    return client
+
+
+def get_s3_client(config):
+    return get_aws_client(
+        "s3",
+        region=_setting(config, "AWS_REGION"),
+        endpoint_url=_setting(config, "AWS_S3_ENDPOINT"),
+        access_key_id=_setting(config, "AWS_ACCESS_KEY_ID"),
+        secret_access_key=_setting(config, "AWS_SECRET_ACCESS_KEY"),
+        options=aws_client_options(config),
+    )
+
+
+def get_sqs_client(config):
+    return get_aws_client(
+        "sqs",
+        region=_setting(config, "SQS_REGION"),
+        endpoint_url=_setting(config, "AWS_SQS_ENDPOINT"),
+        options=aws_client_options(config),
+    )
+
+
+def clear_aws_clients():
+    global _SESSION
+    with _LOCK:
+        _CLIENTS.clear()
+        _SESSION = None
+
+
+def _reset_after_fork():
+    # Pooled sockets must not be shared between a gunicorn master and its workers.
+    global _LOCK, _SESSION
+    _LOCK = threading.Lock()
+    _SESSION = None
+    _CLIENTS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
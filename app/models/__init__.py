@@ -1,5 +1,7 @@
 from app.models.document import Document
 from app.models.document_embedding import DocumentEmbedding
+from app.models.embedding_cache_entry import EmbeddingCacheEntry
+from app.models.queue_message import QueueMessage
 from app.models.user import User
 
-__all__ = ["Document", "DocumentEmbedding", "User"]
+__all__ = ["Document", "DocumentEmbedding", "EmbeddingCacheEntry", "QueueMessage", "User"]
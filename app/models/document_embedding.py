@@ -1,9 +1,10 @@
 from datetime import datetime, timezone
 from uuid import uuid4
+import os
 
 from pgvector.sqlalchemy import Vector
 from sqlalchemy import event
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import object_session
 import sqlalchemy as sa
 
@@ -11,6 +12,33 @@ from app import db
 from app.models.document import Document
 
 
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+# pgvector cannot build HNSW indexes on wider vector columns.
+HNSW_MAX_DIMENSIONS = 2000
+
+# Fixed per deployment to the output size of its embedding model; changing it
+# means re-embedding and re-running the dimension migration.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", DEFAULT_EMBEDDING_DIMENSIONS))
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+# Postgres text search configuration of the generated content_tsv column.
+TEXT_SEARCH_CONFIG = os.getenv("TEXT_SEARCH_CONFIG", "english")
+
+
+def _embedding_indexes():
+    if EMBEDDING_DIMENSIONS > HNSW_MAX_DIMENSIONS:
+        return ()
+    return (
+        db.Index(
+            "ix_document_embeddings_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
+
+
 class DocumentEmbedding(db.Model):
     __tablename__ = "document_embeddings"
     _UTCNOW = staticmethod(lambda: datetime.now(timezone.utc))
@@ -20,9 +48,17 @@ class DocumentEmbedding(db.Model):
         db.String(36), db.ForeignKey("documents.id"), nullable=False, index=True
     )
     document_type = db.Column(db.String(255), nullable=True, index=True)
-    embedding = db.Column(Vector(), nullable=False)
+    embedding = db.Column(Vector(EMBEDDING_DIMENSIONS), nullable=False)
     chunk_index = db.Column(db.Integer, nullable=False, default=0)
     content = db.Column(db.Text, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    content_tsv = db.Column(
+        TSVECTOR,
+        db.Computed(
+            f"to_tsvector('{TEXT_SEARCH_CONFIG}'::regconfig, coalesce(content, ''))",
+            persisted=True,
+        ),
+    )
     metadata_ = db.Column("metadata", JSONB, nullable=True)
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=_UTCNOW)
     updated_at = db.Column(
@@ -42,6 +78,10 @@ class DocumentEmbedding(db.Model):
             "chunk_index",
             name="uq_document_embeddings_document_chunk",
         ),
+        db.Index(
+            "ix_document_embeddings_content_tsv", "content_tsv", postgresql_using="gin"
+        ),
+        *_embedding_indexes(),
     )
 
 
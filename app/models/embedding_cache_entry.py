@@ -0,0 +1,15 @@
+from datetime import datetime, timezone
+
+from pgvector.sqlalchemy import Vector
+
+from app import db
+
+
+class EmbeddingCacheEntry(db.Model):
+    __tablename__ = "embedding_cache_entries"
+    _UTCNOW = staticmethod(lambda: datetime.now(timezone.utc))
+
+    model_name = db.Column(db.String(255), primary_key=True)
+    content_hash = db.Column(db.String(64), primary_key=True)
+    embedding = db.Column(Vector(), nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=_UTCNOW)
@@ -0,0 +1,18 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app import db
+
+
+class QueueMessage(db.Model):
+    __tablename__ = "queue_messages"
+    __table_args__ = (db.Index("ix_queue_messages_queue_visible", "queue_name", "visible_at"),)
+    _UTCNOW = staticmethod(lambda: datetime.now(timezone.utc))
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    queue_name = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    receipt_handle = db.Column(db.String(36), nullable=True, unique=True)
+    receive_count = db.Column(db.Integer, nullable=False, default=0)
+    visible_at = db.Column(db.DateTime(timezone=True), nullable=False, default=_UTCNOW)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=_UTCNOW)
@@ -2,10 +2,10 @@ import json
 import os
 import uuid
 
-import boto3
 from flask import current_app
 
 from app import db
+from app.queues import QueueError, build_queue
 
 
 class EnqueueEmbedding:
@@ -13,11 +13,6 @@ class EnqueueEmbedding:
         self.document = document
 
     def execute(self):
-        queue_url = current_app.config.get("SQS_QUEUE_URL") or os.getenv("SQS_QUEUE_URL")
-        if not queue_url:
-            self._mark_failed("SQS_QUEUE_URL is not configured.")
-            return False
-
         payload = {
             "document_id": self.document.id,
             "name": self.document.name,
@@ -25,23 +20,18 @@ class EnqueueEmbedding:
         }
 
         try:
-            client = self._build_sqs_client()
-            send_kwargs = {"QueueUrl": queue_url, "MessageBody": json.dumps(payload)}
-            if queue_url.endswith(".fifo"):
-                group_id = (
-                    current_app.config.get("SQS_MESSAGE_GROUP_ID")
-                    or os.getenv("SQS_MESSAGE_GROUP_ID")
-                    or "embeddings"
-                )
-                send_kwargs["MessageGroupId"] = group_id
-                dedup_id = (
-                    current_app.config.get("SQS_MESSAGE_DEDUPLICATION_ID")
-                    or os.getenv("SQS_MESSAGE_DEDUPLICATION_ID")
-                )
-                if not dedup_id:
-                    dedup_id = f"{self.document.id}-{uuid.uuid4()}"
-                send_kwargs["MessageDeduplicationId"] = dedup_id
-            client.send_message(**send_kwargs)
+            queue = self._build_queue()
+        except QueueError as exc:
+            self._mark_failed(str(exc))
+            return False
+
+        try:
+            queue.send(
+                json.dumps(payload),
+                group_id=self._setting("SQS_MESSAGE_GROUP_ID"),
+                deduplication_id=self._setting("SQS_MESSAGE_DEDUPLICATION_ID")
+                or f"{self.document.id}-{uuid.uuid4()}",
+            )
             self.document.embedding_status = "pending"
             self.document.enqueue_error = None
             self.document.embedding_error = None
@@ -56,9 +46,8 @@ class EnqueueEmbedding:
         self.document.enqueue_error = message
         db.session.commit()
 
-    def _build_sqs_client(self):
-        region = current_app.config.get("SQS_REGION") or os.getenv("SQS_REGION") or None
-        endpoint = current_app.config.get("AWS_SQS_ENDPOINT") or os.getenv(
-            "AWS_SQS_ENDPOINT"
-        )
-        return boto3.client("sqs", region_name=region, endpoint_url=endpoint or None)
+    def _setting(self, name):
+        return current_app.config.get(name) or os.getenv(name)
+
+    def _build_queue(self):
+        return build_queue(current_app._get_current_object())
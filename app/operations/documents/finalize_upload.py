@@ -0,0 +1,49 @@
+from app import db
+from app.operations.validator import Validator
+from app.operations.documents.enqueue_embedding import EnqueueEmbedding
+from app.operations.documents.presign_upload import UPLOADING_STATUS, upload_max_bytes
+from app.storage import get_storage
+
+
+class FinalizeUpload(Validator):
+    """Record a direct upload and queue the document for embedding.
+
+    Documents that are no longer awaiting their file (finalized before, or
+    picked up from an S3 event) are left as they are.
+    """
+
+    def __init__(self, document):
+        super().__init__()
+
+        self.document = document
+        self.payload = {"message": []}
+        self.message = None
+
+    def execute(self):
+        if self.document.embedding_status != UPLOADING_STATUS:
+            return
+
+        storage = get_storage()
+        metadata = storage.head(self.document.storage_key)
+        if metadata is None:
+            self._mark_invalid("file has not been uploaded")
+            return
+        if metadata["size"] is not None and metadata["size"] > upload_max_bytes():
+            # Presigned PUT URLs cannot limit the object size.
+            storage.delete(self.document.storage_key)
+            self._mark_invalid("file is too large")
+            return
+
+        self.document.size_bytes = metadata["size"]
+        self.document.content_type = self.document.content_type or metadata["content_type"]
+        self.document.embedding_status = "pending"
+        db.session.commit()
+        self._enqueue_embedding(self.document)
+
+    def _mark_invalid(self, message):
+        self.payload["message"] = [message]
+        self.message = message
+        self.num_errors = 1
+
+    def _enqueue_embedding(self, document):
+        EnqueueEmbedding(document=document).execute()
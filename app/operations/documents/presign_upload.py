@@ -0,0 +1,166 @@
+from datetime import timedelta
+import mimetypes
+import os
+from uuid import uuid4
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.document import Document
+from app.operations.validator import Validator
+from app.operations.documents.save import ALLOWED_EXTENSIONS, Save
+from app.storage import get_storage
+
+
+UPLOADING_STATUS = "uploading"
+UPLOAD_METHODS = {"POST", "PUT"}
+DEFAULT_UPLOAD_URL_EXPIRES = 3600
+DEFAULT_UPLOAD_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_UPLOAD_STALE_AFTER = 24 * 60 * 60
+
+
+def upload_max_bytes():
+    return int(
+        current_app.config.get("DOCUMENT_UPLOAD_MAX_BYTES")
+        or os.getenv("DOCUMENT_UPLOAD_MAX_BYTES", DEFAULT_UPLOAD_MAX_BYTES)
+    )
+
+
+def upload_url_expires():
+    return int(
+        current_app.config.get("DOCUMENT_UPLOAD_URL_EXPIRES")
+        or os.getenv("DOCUMENT_UPLOAD_URL_EXPIRES", DEFAULT_UPLOAD_URL_EXPIRES)
+    )
+
+
+def expire_stale_uploads():
+    """Delete documents whose direct upload was never finalized.
+
+    A document still ``uploading`` ``DOCUMENT_UPLOAD_STALE_AFTER`` seconds
+    after it was created (never less than the upload URL lifetime) is
+    removed with its stored object, which frees its name. Returns the number
+    of deleted documents.
+    """
+    stale_after = max(
+        int(
+            current_app.config.get("DOCUMENT_UPLOAD_STALE_AFTER")
+            or os.getenv("DOCUMENT_UPLOAD_STALE_AFTER", DEFAULT_UPLOAD_STALE_AFTER)
+        ),
+        upload_url_expires(),
+    )
+    cutoff = Document._UTCNOW() - timedelta(seconds=stale_after)
+    documents = (
+        Document.query.filter_by(embedding_status=UPLOADING_STATUS)
+        .filter(Document.created_at < cutoff)
+        .all()
+    )
+    for document in documents:
+        Save(document=document).delete()
+    return len(documents)
+
+
+class PresignUpload(Validator):
+    """Create a document awaiting its file and a URL to upload it to storage."""
+
+    def __init__(
+        self,
+        name=None,
+        description=None,
+        document_type=None,
+        filename=None,
+        content_type=None,
+        size_bytes=None,
+        method=None,
+    ):
+        super().__init__()
+
+        self.name = name
+        self.description = description
+        self.document_type = document_type
+        self.filename = filename
+        self.content_type = content_type
+        self.size_bytes = size_bytes
+        self.method = (method or "POST").upper()
+
+        self.document = None
+        self.upload = None
+        self.payload = {"message": []}
+        self.message = None
+
+    def execute(self):
+        expire_stale_uploads()
+        self._validate()
+        if self.valid():
+            self._create_document()
+
+    def _validate(self):
+        if not self.name:
+            self._mark_invalid("name is required")
+            return
+        if Document.query.filter_by(name=self.name).first() is not None:
+            self._mark_invalid("name must be unique")
+            return
+        if not self.filename:
+            self._mark_invalid("filename is required")
+            return
+        extension = self.filename.rsplit(".", 1)[-1].lower() if "." in self.filename else ""
+        if extension not in ALLOWED_EXTENSIONS:
+            self._mark_invalid("unsupported file type")
+            return
+        if self.method not in UPLOAD_METHODS:
+            self._mark_invalid("method must be POST or PUT")
+            return
+        if self.size_bytes is not None:
+            try:
+                self.size_bytes = int(self.size_bytes)
+            except (TypeError, ValueError):
+                self._mark_invalid("size_bytes must be an integer")
+                return
+            if self.size_bytes > upload_max_bytes():
+                self._mark_invalid("file is too large")
+                return
+
+    def _create_document(self):
+        storage = get_storage()
+        content_type = self.content_type or mimetypes.guess_type(self.filename)[0]
+        self.document = Document(
+            name=self.name,
+            description=self.description,
+            document_type=self.document_type,
+            original_filename=self.filename,
+            storage_key=str(uuid4()),
+            storage_provider=storage.provider,
+            content_type=content_type,
+            embedding_status=UPLOADING_STATUS,
+        )
+        try:
+            db.session.add(self.document)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            self.document = None
+            self._mark_invalid("name must be unique")
+            return
+
+        expires_in = upload_url_expires()
+        try:
+            self.upload = storage.presigned_upload(
+                self.document.storage_key,
+                content_type=content_type,
+                expires_in=expires_in,
+                max_bytes=upload_max_bytes(),
+                method=self.method,
+            )
+        except Exception:
+            # Nothing can be uploaded for this document; do not keep its name.
+            db.session.delete(self.document)
+            db.session.commit()
+            self.document = None
+            raise
+        self.upload["expires_in"] = expires_in
+
+    def _mark_invalid(self, message):
+        self.payload["message"] = [message]
+        self.message = message
+        self.num_errors = 1
@@ -6,7 +6,7 @@ from app import db
 from app.models.document import Document
 from app.operations.validator import Validator
 from app.operations.documents.enqueue_embedding import EnqueueEmbedding
-from app.storage import get_storage
+from app.storage import get_storage, invalidate_download_url
 
 
 ALLOWED_EXTENSIONS = {"pdf", "txt", "xlsx", "pptx"}
@@ -52,6 +52,7 @@ class Save(Validator):
 
         storage = get_storage()
         storage.delete(self.document.storage_key)
+        invalidate_download_url(self.document.storage_key)
 
         db.session.delete(self.document)
         db.session.commit()
@@ -94,7 +95,8 @@ class Save(Validator):
         size_bytes = self._file_size(self.upload)
         storage = get_storage()
 
-        storage.save(storage_key, self.upload, content_type=content_type)
+        # Upload from werkzeug's spooled stream; parts are read as they are sent.
+        storage.save(storage_key, self.upload.stream, content_type=content_type)
 
         self.document = Document(
             name=self.name,
@@ -102,7 +104,7 @@ class Save(Validator):
             document_type=self.document_type,
             original_filename=self.upload.filename or self.name,
             storage_key=storage_key,
-            storage_provider="s3",
+            storage_provider=storage.provider,
             content_type=content_type,
             size_bytes=size_bytes,
         )
@@ -126,7 +128,7 @@ class Save(Validator):
             content_type = self.upload.mimetype
             size_bytes = self._file_size(self.upload)
 
-            storage.save(new_storage_key, self.upload, content_type=content_type)
+            storage.save(new_storage_key, self.upload.stream, content_type=content_type)
 
             old_storage_key = self.document.storage_key
             self.document.storage_key = new_storage_key
@@ -147,6 +149,7 @@ class Save(Validator):
                 self._enqueue_embedding(self.document)
             if old_storage_key:
                 storage.delete(old_storage_key)
+                invalidate_download_url(old_storage_key)
         except IntegrityError:
             db.session.rollback()
             if new_storage_key:
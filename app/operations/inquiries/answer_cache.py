@@ -0,0 +1,157 @@
+from array import array
+from collections import OrderedDict
+import math
+import operator
+import os
+import threading
+import time
+
+from app.embeddings.cache import normalized_hash
+
+
+DEFAULT_ANSWER_CACHE_SIZE = 256
+DEFAULT_ANSWER_CACHE_TTL = 60 * 60
+DEFAULT_ANSWER_CACHE_SIMILARITY = 0.98
+DEFAULT_ANSWER_CACHE_MAX_CHARS = 64 * 1024
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _dot(left, right):
+    sumprod = getattr(math, "sumprod", None)
+    if sumprod is not None:
+        return sumprod(left, right)
+    return sum(map(operator.mul, left, right))
+
+
+def _unit(embedding):
+    norm = math.sqrt(_dot(embedding, embedding)) or 1.0
+    return array("f", (value / norm for value in embedding))
+
+
+class AnswerCache:
+    """In-process cache of generated answers, matched by question similarity.
+
+    Answers are grouped by ``scope`` (models, document types and ``k``) and
+    stored with the corpus version they were generated from. A lookup
+    returns the answer whose question embedding is most similar to the new
+    one, if the cosine similarity reaches ``similarity`` and the corpus
+    version still matches. Entries for other versions are dropped on lookup.
+    At most ``max_entries`` answers are kept, least recently used first out.
+    """
+
+    def __init__(
+        self,
+        max_entries=DEFAULT_ANSWER_CACHE_SIZE,
+        ttl=DEFAULT_ANSWER_CACHE_TTL,
+        similarity=DEFAULT_ANSWER_CACHE_SIMILARITY,
+        max_chars=DEFAULT_ANSWER_CACHE_MAX_CHARS,
+        clock=time.monotonic,
+    ):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self.similarity = float(similarity)
+        self.max_chars = int(max_chars)
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scope, corpus_version, query, embedding):
+        """Return the cached answer deltas for a matching question, or None."""
+        query_key = normalized_hash(query)
+        vector = _unit(embedding)
+        now = self._clock()
+        with self._lock:
+            best_key, best_score = None, self.similarity
+            for key, entry in list(self._entries.items()):
+                if key[0] != scope:
+                    continue
+                if entry["corpus_version"] != corpus_version or entry["expires_at"] <= now:
+                    del self._entries[key]
+                    continue
+                score = 1.0 if key[1] == query_key else _dot(vector, entry["embedding"])
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return list(self._entries[best_key]["deltas"])
+
+    def set(self, scope, corpus_version, query, embedding, deltas):
+        if self.max_entries <= 0 or sum(len(delta) for delta in deltas) > self.max_chars:
+            return
+        key = (scope, normalized_hash(query))
+        with self._lock:
+            self._entries[key] = {
+                "corpus_version": corpus_version,
+                "embedding": _unit(embedding),
+                "deltas": tuple(deltas),
+                "expires_at": self._clock() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_answer_cache(config):
+    """Return the process-wide answer cache, or None when ``ANSWER_CACHE_SIZE`` is 0."""
+    global _CACHE
+    max_entries = int(_setting(config, "ANSWER_CACHE_SIZE", DEFAULT_ANSWER_CACHE_SIZE))
+    if max_entries <= 0:
+        return None
+    if _CACHE is not None:
+        return _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = AnswerCache(
+                max_entries=max_entries,
+                ttl=float(_setting(config, "ANSWER_CACHE_TTL", DEFAULT_ANSWER_CACHE_TTL)),
+                similarity=float(
+                    _setting(config, "ANSWER_CACHE_SIMILARITY", DEFAULT_ANSWER_CACHE_SIMILARITY)
+                ),
+            )
+    return _CACHE
+
+
+def clear_answer_cache():
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = None
+
+
+def _setting(config, name, default):
+    value = config.get(name)
+    if value is None or value == "":
+        value = os.getenv(name)
+    return default if value is None or value == "" else value
+
+
+def _reset_after_fork():
+    global _CACHE_LOCK
+    _CACHE_LOCK = threading.Lock()
+    if _CACHE is not None:
+        _CACHE._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
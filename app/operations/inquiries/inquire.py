@@ -2,21 +2,52 @@ import logging
 import os
 
 from openai import OpenAI
+import sqlalchemy as sa
+from sqlalchemy.orm import load_only
+import tiktoken
 
-from app.models.document_embedding import DocumentEmbedding
+from app import db
+from app.embeddings.query_cache import get_query_embedding_cache
+from app.embeddings.rate_limit import (
+    estimate_tokens,
+    get_rate_governor,
+    openai_max_retries,
+)
+from app.models.document import Document
+from app.models.document_embedding import TEXT_SEARCH_CONFIG, DocumentEmbedding
+from app.operations.inquiries.answer_cache import get_answer_cache
 from app.operations.validator import Validator
 
 
 DEFAULT_TOP_K = 5
+DEFAULT_EF_SEARCH = 40
+# pgvector's upper bound for hnsw.ef_search.
+MAX_EF_SEARCH = 1000
+DEFAULT_HYBRID_CANDIDATES = 40
+DEFAULT_RRF_K = 60
+
+
+def _count_tokens(model, text):
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return len(encoding.encode(text))
+    except Exception:  # noqa: BLE001 - pacing only needs an estimate
+        return estimate_tokens([text])
 
 
 class Inquire(Validator):
-    def __init__(self, query=None, document_types=None, top_k=None, config=None):
+    def __init__(
+        self, query=None, document_types=None, top_k=None, config=None, ef_search=None
+    ):
         super().__init__()
         self.query = query
         self.document_types = document_types
         self.top_k = top_k if top_k is not None else DEFAULT_TOP_K
         self.config = config or {}
+        self.ef_search = ef_search
         self.payload = {}
         self.status_code = 422
         self._stream = None
@@ -53,24 +84,31 @@ class Inquire(Validator):
             self._mark_error("OPENAI_INFERENCE_MODEL is required", status_code=500)
             return
 
-        client = OpenAI(api_key=api_key)
-        embedding_response = client.embeddings.create(
-            model=embedding_model, input=self.query
-        )
-        query_embedding = embedding_response.data[0].embedding
+        client = OpenAI(api_key=api_key, max_retries=openai_max_retries(self.config))
+        query_embedding = self._embed_query(client, embedding_model)
         LOGGER.info("Inquiry embedding: %s", query_embedding)
         print(f"Inquiry embedding: {query_embedding}")
 
-        embeddings_query = DocumentEmbedding.query.filter(
-            DocumentEmbedding.document_type.in_(self.document_types)
-        )
-        results = (
-            embeddings_query.order_by(
-                DocumentEmbedding.embedding.cosine_distance(query_embedding)
+        answer_cache = get_answer_cache(self.config)
+        if answer_cache is not None:
+            scope = (
+                embedding_model,
+                inference_model,
+                tuple(sorted(set(self.document_types))),
+                self.top_k,
             )
-            .limit(self.top_k)
-            .all()
-        )
+            corpus_version = self._corpus_version()
+            cached = answer_cache.get(scope, corpus_version, self.query, query_embedding)
+            LOGGER.info(
+                "Answer cache %s (hit rate %.1f%%)",
+                "miss" if cached is None else "hit",
+                answer_cache.stats()["hit_rate"] * 100,
+            )
+            if cached is not None:
+                self._stream = lambda: iter(cached)
+                return
+
+        results = self._retrieve(query_embedding)
 
         context_parts = [row.content for row in results if row.content]
         context = "\n\n---\n\n".join(context_parts) if context_parts else ""
@@ -81,18 +119,32 @@ class Inquire(Validator):
         )
         user_prompt = f"Context:\n{context}\n\nQuestion: {self.query}"
 
+        inference_governor = get_rate_governor(
+            self.config, inference_model, kind="inference"
+        )
+        prompt_tokens = _count_tokens(inference_model, system_prompt + user_prompt)
+
         def generate():
-            stream = client.responses.create(
-                model=inference_model,
-                input=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                stream=True,
+            stream = self._governed(
+                inference_governor,
+                lambda: client.responses.create(
+                    model=inference_model,
+                    input=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    stream=True,
+                ),
+                prompt_tokens,
             )
+            deltas = []
             for event in stream:
                 if event.type == "response.output_text.delta":
+                    deltas.append(event.delta)
                     yield event.delta
+            # Only answers that streamed to the end are cached.
+            if answer_cache is not None:
+                answer_cache.set(scope, corpus_version, self.query, query_embedding, deltas)
 
         self._stream = generate
 
@@ -114,6 +166,14 @@ class Inquire(Validator):
             self._mark_error("k must be a positive integer")
             return
 
+        if self.ef_search is not None and (
+            not isinstance(self.ef_search, int)
+            or isinstance(self.ef_search, bool)
+            or not 0 < self.ef_search <= MAX_EF_SEARCH
+        ):
+            self._mark_error(f"ef_search must be an integer between 1 and {MAX_EF_SEARCH}")
+            return
+
         allowed_types = self.config.get("DOCUMENT_TYPES")
         if isinstance(allowed_types, list):
             invalid_types = [
@@ -126,6 +186,150 @@ class Inquire(Validator):
                 )
                 return
 
+    def _embed_query(self, client, embedding_model):
+        cache = get_query_embedding_cache(self.config)
+        if cache is not None:
+            embedding = cache.get(embedding_model, self.query)
+            LOGGER.info(
+                "Query embedding cache %s (hit rate %.1f%%)",
+                "miss" if embedding is None else "hit",
+                cache.stats()["hit_rate"] * 100,
+            )
+            if embedding is not None:
+                return embedding
+
+        embedding_governor = get_rate_governor(self.config, embedding_model)
+        if embedding_governor is None:
+            embedding_response = client.embeddings.create(
+                model=embedding_model, input=self.query
+            )
+        else:
+            # The raw response exposes the rate-limit headers to the governor.
+            embedding_response = self._governed(
+                embedding_governor,
+                lambda: client.embeddings.with_raw_response.create(
+                    model=embedding_model, input=self.query
+                ),
+                _count_tokens(embedding_model, self.query),
+            ).parse()
+        embedding = embedding_response.data[0].embedding
+        if cache is not None:
+            cache.set(embedding_model, self.query, embedding)
+        return embedding
+
+    def _retrieve(self, query_embedding):
+        """Return the ``top_k`` chunks closest to the question.
+
+        In ``hybrid`` mode (the default) the nearest vector candidates and the
+        best full-text matches on ``content_tsv`` are merged with reciprocal
+        rank fusion, ``sum(1 / (RRF_K + rank))``, in a single statement, so
+        exact terms such as line codes rank even when their vectors do not.
+        """
+        mode = str(self._setting("RETRIEVAL_MODE", "hybrid")).lower()
+        candidates = max(
+            int(self._setting("HYBRID_CANDIDATES", DEFAULT_HYBRID_CANDIDATES)), self.top_k
+        )
+        self._set_ef_search(candidates if mode == "hybrid" else self.top_k)
+
+        type_filter = DocumentEmbedding.document_type.in_(self.document_types)
+        distance = DocumentEmbedding.embedding.cosine_distance(query_embedding)
+        if mode != "hybrid":
+            return (
+                DocumentEmbedding.query.options(load_only(DocumentEmbedding.content))
+                .filter(type_filter)
+                .order_by(distance)
+                .limit(self.top_k)
+                .all()
+            )
+
+        vector = (
+            sa.select(
+                DocumentEmbedding.id, sa.func.rank().over(order_by=distance).label("rank")
+            )
+            .where(type_filter)
+            .order_by(distance)
+            .limit(candidates)
+            .cte("vector_candidates")
+        )
+        tsquery = sa.func.websearch_to_tsquery(
+            sa.literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"), self.query
+        )
+        text_rank = sa.func.ts_rank_cd(DocumentEmbedding.content_tsv, tsquery)
+        lexical = (
+            sa.select(
+                DocumentEmbedding.id,
+                sa.func.rank().over(order_by=text_rank.desc()).label("rank"),
+            )
+            .where(type_filter, DocumentEmbedding.content_tsv.op("@@")(tsquery))
+            .order_by(text_rank.desc())
+            .limit(candidates)
+            .cte("lexical_candidates")
+        )
+        ranked = sa.union_all(
+            sa.select(vector.c.id, vector.c.rank), sa.select(lexical.c.id, lexical.c.rank)
+        ).subquery("ranked")
+        rrf_k = int(self._setting("RRF_K", DEFAULT_RRF_K))
+        score = sa.func.sum(1.0 / (rrf_k + ranked.c.rank)).label("score")
+        fused = (
+            sa.select(ranked.c.id, score)
+            .group_by(ranked.c.id)
+            .order_by(score.desc())
+            .limit(self.top_k)
+            .subquery("fused")
+        )
+        return (
+            DocumentEmbedding.query.options(load_only(DocumentEmbedding.content))
+            .join(fused, fused.c.id == DocumentEmbedding.id)
+            .order_by(fused.c.score.desc())
+            .all()
+        )
+
+    def _setting(self, name, default=None):
+        value = self.config.get(name)
+        if value is None or value == "":
+            value = os.getenv(name)
+        return default if value is None or value == "" else value
+
+    def _corpus_version(self):
+        """Identify the documents behind an answer.
+
+        Embedding jobs, type changes and edits touch ``updated_at`` and
+        deletions change the count, so any of them changes the version.
+        """
+        count, updated_at = (
+            db.session.query(sa.func.count(Document.id), sa.func.max(Document.updated_at))
+            .filter(Document.document_type.in_(self.document_types))
+            .one()
+        )
+        return f"{count}:{updated_at.isoformat() if updated_at else ''}"
+
+    def _set_ef_search(self, limit):
+        """Size the HNSW candidate list for this request's transaction only.
+
+        The index returns at most ``ef_search`` rows before the document type
+        filter is applied, so it never goes below the ``limit`` rows needed.
+        """
+        if db.session.get_bind().dialect.name != "postgresql":
+            return
+        ef_search = self.ef_search or int(self._setting("HNSW_EF_SEARCH", DEFAULT_EF_SEARCH))
+        ef_search = min(max(ef_search, limit), MAX_EF_SEARCH)
+        db.session.execute(
+            sa.text("SELECT set_config('hnsw.ef_search', :value, true)"),
+            {"value": str(ef_search)},
+        )
+
+    def _governed(self, governor, func, tokens):
+        if governor is None:
+            return func()
+        throttled = governor.throttled_seconds
+        response = governor.call(func, tokens)
+        if governor.throttled_seconds > throttled:
+            LOGGER.info(
+                "Inquiry throttled by rate limiter for %.2fs",
+                governor.throttled_seconds - throttled,
+            )
+        return response
+
     def _openai_enabled(self):
         return str(self.config.get("USE_OPENAI", "true")).lower() in {
             "1",
@@ -0,0 +1,89 @@
+import os
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from app import db
+from app.helpers.aws_helpers import aws_client_options
+from app.models.queue_message import QueueMessage
+from app.queues.heartbeat import VisibilityHeartbeat, default_heartbeat_interval
+from app.queues.services import (
+    BaseQueueService,
+    DatabaseQueueService,
+    QueueError,
+    SqsQueueService,
+)
+
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def _setting(config, name, default=None):
+    return config.get(name) or os.getenv(name) or default
+
+
+def _queue_engine(url):
+    """Return the process-wide engine for a dedicated queue database.
+
+    The table is created on first use since migrations only manage the
+    application database.
+    """
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(url)
+        if engine is None:
+            options = {"pool_pre_ping": True}
+            if make_url(url).get_backend_name() == "sqlite":
+                options = {"connect_args": {"timeout": 30}}
+            engine = create_engine(url, **options)
+            QueueMessage.__table__.create(engine, checkfirst=True)
+            _ENGINES[url] = engine
+    return engine
+
+
+def build_queue(app, queue_url=None):
+    """Build the embedding job queue selected by ``QUEUE_BACKEND``.
+
+    ``sqs`` (the default) uses ``queue_url`` or ``SQS_QUEUE_URL``. ``database``
+    uses the ``queue_messages`` table of ``QUEUE_DATABASE_URL``, or of the
+    application database when it is not set; the latter needs an app context.
+    """
+    config = app.config
+    backend = str(_setting(config, "QUEUE_BACKEND", "sqs")).lower()
+    if backend == "sqs":
+        return SqsQueueService(
+            queue_url=queue_url or _setting(config, "SQS_QUEUE_URL"),
+            region=_setting(config, "SQS_REGION"),
+            endpoint_url=_setting(config, "AWS_SQS_ENDPOINT"),
+            client_options=aws_client_options(config),
+        )
+    if backend == "database":
+        database_url = _setting(config, "QUEUE_DATABASE_URL")
+        return DatabaseQueueService(
+            engine=_queue_engine(database_url) if database_url else db.engine,
+            queue_name=_setting(config, "QUEUE_NAME", "embeddings"),
+            poll_interval=float(_setting(config, "QUEUE_POLL_INTERVAL", 1.0)),
+        )
+    raise QueueError(f"Unsupported queue backend: {backend}")
+
+
+def _reset_after_fork():
+    global _ENGINES_LOCK
+    _ENGINES_LOCK = threading.Lock()
+    for engine in _ENGINES.values():
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+__all__ = [
+    "BaseQueueService",
+    "DatabaseQueueService",
+    "QueueError",
+    "SqsQueueService",
+    "VisibilityHeartbeat",
+    "build_queue",
+    "default_heartbeat_interval",
+]
@@ -0,0 +1,73 @@
+import logging
+import threading
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def default_heartbeat_interval(visibility_timeout):
+    """Return a third of ``visibility_timeout``: whole seconds, but always below it."""
+    if visibility_timeout <= 0:
+        return 0
+    interval = max(visibility_timeout // 3, 1)
+    return interval if interval < visibility_timeout else visibility_timeout / 3
+
+
+class VisibilityHeartbeat:
+    """Keep an in-flight queue message invisible while a long job runs.
+
+    A background thread extends the visibility timeout every ``interval``
+    seconds. ``stop()`` ends the heartbeat after a successful job so the caller
+    can delete the message; ``release()`` ends it and makes the message visible
+    again right away so another worker can retry it.
+    """
+
+    def __init__(self, queue, receipt_handle, visibility_timeout, interval=None):
+        self.queue = queue
+        self.receipt_handle = receipt_handle
+        self.visibility_timeout = visibility_timeout
+        self.interval = interval or default_heartbeat_interval(visibility_timeout)
+        self.beats = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.stop()
+        else:
+            self.release()
+        return False
+
+    def start(self):
+        if self._thread is not None or not self.interval:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="queue-visibility-heartbeat", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def release(self):
+        self.stop()
+        self._change_visibility(0)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            if self._change_visibility(self.visibility_timeout):
+                self.beats += 1
+
+    def _change_visibility(self, timeout):
+        try:
+            self.queue.change_visibility(self.receipt_handle, timeout)
+            return True
+        except Exception as exc:  # noqa: BLE001 - heartbeat must not kill the job
+            LOGGER.warning("Failed to change queue message visibility: %s", exc)
+            return False
@@ -0,0 +1,229 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import time
+
+import sqlalchemy as sa
+
+from app.helpers.aws_helpers import get_aws_client
+from app.models.queue_message import QueueMessage
+
+
+DEFAULT_QUEUE_POLL_INTERVAL = 1.0
+
+
+class QueueError(Exception):
+    pass
+
+
+class BaseQueueService:
+    """Job queue with SQS semantics.
+
+    Received messages are dicts in the SQS shape (``MessageId``,
+    ``ReceiptHandle``, ``Body``) and stay invisible to other consumers for
+    ``visibility_timeout`` seconds unless they are deleted first.
+    """
+
+    delete_batch_size = 10
+
+    def send(self, body, group_id=None, deduplication_id=None):
+        raise NotImplementedError
+
+    def receive(self, max_messages=1, wait_time=0, visibility_timeout=30):
+        raise NotImplementedError
+
+    def delete_batch(self, receipt_handles):
+        """Delete up to ``delete_batch_size`` messages.
+
+        Returns the failures as ``{"ReceiptHandle", "SenderFault", "Message"}``
+        dicts; sender faults cannot succeed on retry.
+        """
+        raise NotImplementedError
+
+    def change_visibility(self, receipt_handle, visibility_timeout):
+        raise NotImplementedError
+
+
+@dataclass
+class SqsQueueService(BaseQueueService):
+    queue_url: str
+    region: str | None = None
+    endpoint_url: str | None = None
+    client_options: dict | None = None
+    client: object | None = None
+
+    def __post_init__(self):
+        if not self.queue_url:
+            raise QueueError("SQS_QUEUE_URL is not configured.")
+
+    @property
+    def _client(self):
+        if self.client is not None:
+            return self.client
+        return get_aws_client(
+            "sqs",
+            region=self.region,
+            endpoint_url=self.endpoint_url,
+            options=self.client_options,
+        )
+
+    def send(self, body, group_id=None, deduplication_id=None):
+        params = {"QueueUrl": self.queue_url, "MessageBody": body}
+        if self.queue_url.endswith(".fifo"):
+            params["MessageGroupId"] = group_id or "embeddings"
+            params["MessageDeduplicationId"] = deduplication_id or str(uuid4())
+        return self._client.send_message(**params).get("MessageId")
+
+    def receive(self, max_messages=1, wait_time=0, visibility_timeout=30):
+        response = self._client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max_messages,
+            WaitTimeSeconds=wait_time,
+            VisibilityTimeout=visibility_timeout,
+        )
+        return response.get("Messages") or []
+
+    def delete_batch(self, receipt_handles):
+        receipt_handles = list(receipt_handles)
+        response = self._client.delete_message_batch(
+            QueueUrl=self.queue_url,
+            Entries=[
+                {"Id": str(index), "ReceiptHandle": receipt_handle}
+                for index, receipt_handle in enumerate(receipt_handles)
+            ],
+        )
+        return [
+            {
+                "ReceiptHandle": receipt_handles[int(failure["Id"])],
+                "SenderFault": bool(failure.get("SenderFault")),
+                "Message": failure.get("Message") or failure.get("Code"),
+            }
+            for failure in response.get("Failed") or []
+        ]
+
+    def change_visibility(self, receipt_handle, visibility_timeout):
+        self._client.change_message_visibility(
+            QueueUrl=self.queue_url,
+            ReceiptHandle=receipt_handle,
+            VisibilityTimeout=visibility_timeout,
+        )
+
+
+@dataclass
+class DatabaseQueueService(BaseQueueService):
+    """Queue stored in the ``queue_messages`` table of Postgres or SQLite.
+
+    Postgres consumers claim rows with ``SELECT ... FOR UPDATE SKIP LOCKED``.
+    SQLite has no row locks, so a claim only succeeds if the row is still
+    visible when it is updated; either way a message goes to one consumer.
+    Message groups and deduplication ids are accepted and ignored.
+    """
+
+    engine: sa.engine.Engine
+    queue_name: str = "embeddings"
+    poll_interval: float = DEFAULT_QUEUE_POLL_INTERVAL
+
+    delete_batch_size = 100
+    _table = QueueMessage.__table__
+
+    def send(self, body, group_id=None, deduplication_id=None):
+        message_id = str(uuid4())
+        now = _utcnow()
+        with self.engine.begin() as connection:
+            connection.execute(
+                self._table.insert().values(
+                    id=message_id,
+                    queue_name=self.queue_name,
+                    body=body,
+                    receive_count=0,
+                    visible_at=now,
+                    created_at=now,
+                )
+            )
+        return message_id
+
+    def receive(self, max_messages=1, wait_time=0, visibility_timeout=30):
+        deadline = time.monotonic() + wait_time
+        while True:
+            messages = self._claim(max_messages, visibility_timeout)
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                return messages
+            time.sleep(min(self.poll_interval, remaining))
+
+    def delete_batch(self, receipt_handles):
+        receipt_handles = list(receipt_handles)
+        if not receipt_handles:
+            return []
+        table = self._table
+        with self.engine.begin() as connection:
+            found = set(
+                connection.execute(
+                    sa.select(table.c.receipt_handle).where(
+                        table.c.receipt_handle.in_(receipt_handles)
+                    )
+                ).scalars()
+            )
+            if found:
+                connection.execute(table.delete().where(table.c.receipt_handle.in_(found)))
+        return [
+            {
+                "ReceiptHandle": receipt_handle,
+                "SenderFault": True,
+                "Message": "The receipt handle is no longer valid.",
+            }
+            for receipt_handle in receipt_handles
+            if receipt_handle not in found
+        ]
+
+    def change_visibility(self, receipt_handle, visibility_timeout):
+        table = self._table
+        with self.engine.begin() as connection:
+            updated = connection.execute(
+                table.update()
+                .where(table.c.receipt_handle == receipt_handle)
+                .values(visible_at=_utcnow() + timedelta(seconds=visibility_timeout))
+            ).rowcount
+        if not updated:
+            raise QueueError("The receipt handle is no longer valid.")
+
+    def _claim(self, max_messages, visibility_timeout):
+        table = self._table
+        now = _utcnow()
+        visible_at = now + timedelta(seconds=visibility_timeout)
+        messages = []
+        with self.engine.begin() as connection:
+            rows = connection.execute(
+                sa.select(table.c.id, table.c.body, table.c.receive_count)
+                .where(table.c.queue_name == self.queue_name, table.c.visible_at <= now)
+                .order_by(table.c.visible_at, table.c.created_at)
+                .limit(max_messages)
+                .with_for_update(skip_locked=True)
+            ).all()
+            for row in rows:
+                receipt_handle = str(uuid4())
+                claimed = connection.execute(
+                    table.update()
+                    .where(table.c.id == row.id, table.c.visible_at <= now)
+                    .values(
+                        receipt_handle=receipt_handle,
+                        receive_count=table.c.receive_count + 1,
+                        visible_at=visible_at,
+                    )
+                ).rowcount
+                if claimed:
+                    messages.append(
+                        {
+                            "MessageId": row.id,
+                            "ReceiptHandle": receipt_handle,
+                            "Body": row.body,
+                            "Attributes": {
+                                "ApproximateReceiveCount": str(row.receive_count + 1)
+                            },
+                        }
+                    )
+        return messages
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
@@ -1,13 +1,20 @@
 from flask import Blueprint
 
 from app.controllers.health_controller import health
-from app.controllers.system_controller import environment as system_environment, login as login_user
+from app.controllers.system_controller import (
+    cache_stats as system_cache_stats,
+    environment as system_environment,
+    login as login_user,
+)
 from app.controllers.documents_controller import (
     create as create_document,
+    create_upload as create_document_upload,
     delete as delete_document,
     document_types as document_types,
+    finalize_upload as finalize_document_upload,
     index as list_documents,
     public_document_types as public_document_types,
+    public_download_url as public_document_download_url,
     public_index as public_list_documents,
     public_show as public_show_document,
     retry_enqueue as retry_document_enqueue,
@@ -15,6 +22,7 @@ from app.controllers.documents_controller import (
     update as update_document,
 )
 from app.controllers.inquiries_controller import inquire
+from app.controllers.storage_controller import download as storage_download, upload as storage_upload
 from app.controllers.users_controller import (
     create as create_user,
     delete as delete_user,
@@ -33,6 +41,12 @@ def register_routes(app):
         methods=["GET"],
         endpoint="system_env",
     )
+    api_bp.add_url_rule(
+        "/system/cache_stats",
+        view_func=system_cache_stats,
+        methods=["GET"],
+        endpoint="system_cache_stats",
+    )
     api_bp.add_url_rule("/users", view_func=list_users, methods=["GET"], endpoint="users_index")
     api_bp.add_url_rule("/users", view_func=create_user, methods=["POST"], endpoint="users_create")
     api_bp.add_url_rule("/users/<string:user_id>", view_func=show_user, methods=["GET"], endpoint="users_show")
@@ -46,6 +60,12 @@ def register_routes(app):
         methods=["GET"],
         endpoint="public_documents_show",
     )
+    api_bp.add_url_rule(
+        "/public/documents/<string:document_id>/download_url",
+        view_func=public_document_download_url,
+        methods=["GET"],
+        endpoint="public_documents_download_url",
+    )
     api_bp.add_url_rule(
         "/public/document_types", view_func=public_document_types, methods=["GET"], endpoint="public_document_types"
     )
@@ -53,6 +73,18 @@ def register_routes(app):
         "/documents/types", view_func=document_types, methods=["GET"], endpoint="documents_types"
     )
     api_bp.add_url_rule("/documents", view_func=create_document, methods=["POST"], endpoint="documents_create")
+    api_bp.add_url_rule(
+        "/documents/uploads",
+        view_func=create_document_upload,
+        methods=["POST"],
+        endpoint="documents_uploads_create",
+    )
+    api_bp.add_url_rule(
+        "/documents/<string:document_id>/finalize",
+        view_func=finalize_document_upload,
+        methods=["POST"],
+        endpoint="documents_finalize",
+    )
     api_bp.add_url_rule(
         "/documents/<string:document_id>", view_func=show_document, methods=["GET"], endpoint="documents_show"
     )
@@ -69,5 +101,11 @@ def register_routes(app):
         endpoint="documents_enqueue",
     )
     api_bp.add_url_rule("/inquire", view_func=inquire, methods=["POST"], endpoint="inquire")
+    api_bp.add_url_rule(
+        "/storage/<path:key>", view_func=storage_download, methods=["GET"], endpoint="storage_download"
+    )
+    api_bp.add_url_rule(
+        "/storage/<path:key>", view_func=storage_upload, methods=["PUT"], endpoint="storage_upload"
+    )
 
     app.register_blueprint(api_bp)
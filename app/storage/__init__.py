@@ -2,17 +2,66 @@ import os
 
 from flask import current_app
 
-from app.storage.services import AmazonStorageService
+from app.helpers.aws_helpers import aws_client_options, s3_transfer_options
+from app.storage.cache import DEFAULT_STORAGE_CACHE_MAX_BYTES, CachedStorageService
+from app.storage.services import (
+    DEFAULT_UPLOAD_CHECKSUM_ALGORITHM,
+    AmazonStorageService,
+    LocalStorageService,
+    StorageError,
+)
+from app.storage.url_cache import (
+    DEFAULT_URL_CACHE_SIZE,
+    DEFAULT_URL_EXPIRES,
+    DEFAULT_URL_REFRESH_MARGIN,
+    PresignedUrlCache,
+)
 
 
 def _environment_for(app):
     return os.getenv("FLASK_ENV", app.config.get("FLASK_ENV", "development"))
 
 
+def _checksum_algorithm(app):
+    algorithm = app.config.get("S3_UPLOAD_CHECKSUM_ALGORITHM")
+    if algorithm is None:
+        algorithm = os.getenv("S3_UPLOAD_CHECKSUM_ALGORITHM", DEFAULT_UPLOAD_CHECKSUM_ALGORITHM)
+    return algorithm.upper() or None
+
+
+def _setting(app, name, default=None):
+    return app.config.get(name) or os.getenv(name) or default
+
+
 def build_storage_service(app):
+    """Build the storage selected by ``STORAGE_BACKEND``: ``s3`` (default) or ``local``.
+
+    Reads go through a disk cache when ``STORAGE_CACHE_DIR`` is set.
+    """
+    storage = _build_backend(app)
+    cache_dir = _setting(app, "STORAGE_CACHE_DIR")
+    if not cache_dir:
+        return storage
+    return CachedStorageService(
+        storage=storage,
+        root=cache_dir,
+        max_bytes=_int_setting(app, "STORAGE_CACHE_MAX_BYTES", DEFAULT_STORAGE_CACHE_MAX_BYTES),
+    )
+
+
+def _build_backend(app):
     env = _environment_for(app)
     if env not in {"test", "development", "production"}:
         raise ValueError(f"Unsupported environment for storage: {env}")
+    backend = str(_setting(app, "STORAGE_BACKEND", "s3")).lower()
+    if backend == "local":
+        return LocalStorageService(
+            root=_setting(app, "STORAGE_LOCAL_ROOT", ""),
+            secret_key=app.config.get("SECRET_KEY") or "",
+            base_url=_setting(app, "STORAGE_LOCAL_BASE_URL", ""),
+        )
+    if backend != "s3":
+        raise StorageError(f"Unsupported storage backend: {backend}")
     return AmazonStorageService(
         bucket=app.config.get("AWS_S3_BUCKET", ""),
         region=app.config.get("AWS_REGION", ""),
@@ -20,12 +69,42 @@ def build_storage_service(app):
         secret_access_key=app.config.get("AWS_SECRET_ACCESS_KEY", ""),
         endpoint_url=app.config.get("AWS_S3_ENDPOINT", "") or None,
         prefix=app.config.get("AWS_S3_PREFIX", "") or None,
+        client_options=aws_client_options(app.config),
+        transfer_options=s3_transfer_options(app.config),
+        checksum_algorithm=_checksum_algorithm(app),
+    )
+
+
+def _int_setting(app, name, default):
+    value = app.config.get(name)
+    if value is None:
+        value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def build_url_cache(app):
+    return PresignedUrlCache(
+        expires_in=_int_setting(app, "STORAGE_URL_EXPIRES", DEFAULT_URL_EXPIRES),
+        refresh_margin=_int_setting(app, "STORAGE_URL_REFRESH_MARGIN", DEFAULT_URL_REFRESH_MARGIN),
+        max_entries=_int_setting(app, "STORAGE_URL_CACHE_SIZE", DEFAULT_URL_CACHE_SIZE),
     )
 
 
 def init_storage(app):
     app.extensions["storage"] = build_storage_service(app)
+    app.extensions["storage_urls"] = build_url_cache(app)
 
 
 def get_storage():
     return current_app.extensions["storage"]
+
+
+def get_download_url(key):
+    """Return ``{"url", "expires_at"}`` for ``key`` from the signed URL cache."""
+    return current_app.extensions["storage_urls"].get(get_storage(), key)
+
+
+def invalidate_download_url(key):
+    urls = current_app.extensions.get("storage_urls")
+    if urls is not None:
+        urls.invalidate(key)
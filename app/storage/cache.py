@@ -0,0 +1,166 @@
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import logging
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts evict without a shared lock
+    fcntl = None
+
+from app.storage.services import BaseStorageService
+
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_STORAGE_CACHE_MAX_BYTES = 5 * 1024 * 1024 * 1024
+
+
+@dataclass
+class CachedStorageService(BaseStorageService):
+    """Read-through disk cache in front of another storage service.
+
+    Files are cached under ``root`` by storage key and ETag, so a changed
+    object is fetched again, and the least recently read files are evicted
+    once the cache holds more than ``max_bytes``. Worker processes can share
+    ``root``: entries are renamed into place complete, eviction runs under an
+    ``flock`` on the cache directory, and files evicted while another process
+    has them open stay readable until closed. Writes, deletes and URLs go
+    straight to ``storage``.
+    """
+
+    storage: BaseStorageService
+    root: str
+    max_bytes: int = DEFAULT_STORAGE_CACHE_MAX_BYTES
+
+    def __post_init__(self):
+        os.makedirs(self.root, exist_ok=True)
+
+    @property
+    def provider(self):
+        return self.storage.provider
+
+    def __getattr__(self, name):
+        # Backend-specific helpers such as LocalStorageService.verify.
+        if name == "storage":
+            raise AttributeError(name)
+        return getattr(self.storage, name)
+
+    def save(self, key, data, content_type=None):
+        self.storage.save(key, data, content_type=content_type)
+
+    def read(self, key):
+        with self.open(key) as handle:
+            return handle.read()
+
+    def open(self, key):
+        metadata = self.storage.head(key)
+        if not metadata or not metadata.get("etag"):
+            return self.storage.open(key)
+        if metadata.get("size") and metadata["size"] > self.max_bytes:
+            return self.storage.open(key)
+
+        path = self._path(key, metadata["etag"])
+        try:
+            handle = path.open("rb")
+        except FileNotFoundError:
+            return self._fill(key, metadata["etag"], path)
+        os.utime(path)
+        return handle
+
+    def download(self, key, fileobj, etag=None):
+        self.storage.download(key, fileobj, etag=etag)
+
+    def delete(self, key):
+        self.storage.delete(key)
+        for path in self._versions(key):
+            with suppress(FileNotFoundError):
+                path.unlink()
+
+    def url(self, key, expires_in=3600):
+        return self.storage.url(key, expires_in=expires_in)
+
+    def presigned_upload(
+        self, key, content_type=None, expires_in=3600, max_bytes=None, method="POST"
+    ):
+        return self.storage.presigned_upload(
+            key,
+            content_type=content_type,
+            expires_in=expires_in,
+            max_bytes=max_bytes,
+            method=method,
+        )
+
+    def head(self, key):
+        return self.storage.head(key)
+
+    def _fill(self, key, etag, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = tempfile.NamedTemporaryFile(dir=path.parent, prefix=".fill-", delete=False)
+        try:
+            self.storage.download(key, handle, etag=etag)
+            handle.flush()
+            os.replace(handle.name, path)
+        except BaseException:
+            handle.close()
+            with suppress(FileNotFoundError):
+                os.unlink(handle.name)
+            raise
+        # The renamed file is still open; older versions of the key are dropped.
+        handle.seek(0)
+        for stale in self._versions(key):
+            if stale != path:
+                with suppress(FileNotFoundError):
+                    stale.unlink()
+        self._evict()
+        return handle
+
+    def _key_hash(self, key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _path(self, key, etag):
+        key_hash = self._key_hash(key)
+        etag_hash = hashlib.sha256(etag.encode("utf-8")).hexdigest()[:16]
+        return Path(self.root) / key_hash[:2] / f"{key_hash}-{etag_hash}"
+
+    def _versions(self, key):
+        key_hash = self._key_hash(key)
+        return list((Path(self.root) / key_hash[:2]).glob(f"{key_hash}-*"))
+
+    @contextmanager
+    def _eviction_lock(self):
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(os.path.join(self.root, ".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _evict(self):
+        with self._eviction_lock():
+            entries = []
+            for path in Path(self.root).glob("*/*"):
+                if path.name.startswith("."):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            size = sum(entry[1] for entry in entries)
+            if size <= self.max_bytes:
+                return
+            # Trim to 90% of the cap so eviction does not run on every fill.
+            target = int(self.max_bytes * 0.9)
+            for _, file_size, path in sorted(entries, key=lambda entry: entry[0]):
+                if size <= target:
+                    break
+                with suppress(FileNotFoundError):
+                    path.unlink()
+                size -= file_size
+            LOGGER.info("Evicted storage cache entries down to %d bytes", size)
@@ -1,6 +1,29 @@
+from contextlib import suppress
 from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote, urlencode
+import hashlib
+import hmac
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
 
-import boto3
+from botocore.exceptions import ClientError
+
+from app.helpers.aws_helpers import (
+    download_s3_fileobj,
+    download_s3_object,
+    get_aws_client,
+    s3_transfer_config,
+)
+
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_UPLOAD_CHECKSUM_ALGORITHM = "CRC32"
 
 
 class StorageError(Exception):
@@ -8,20 +31,40 @@ class StorageError(Exception):
 
 
 class BaseStorageService:
+    provider = None
+
     def save(self, key, data, content_type=None):
         raise NotImplementedError
 
     def read(self, key):
         raise NotImplementedError
 
+    def open(self, key):
+        """Return a seekable binary file object with the contents of ``key``."""
+        return io.BytesIO(self.read(key))
+
+    def download(self, key, fileobj, etag=None):
+        """Write the contents of ``key`` to ``fileobj``, failing if its ETag is no longer ``etag``."""
+        with self.open(key) as handle:
+            shutil.copyfileobj(handle, fileobj, 1024 * 1024)
+
     def delete(self, key):
         raise NotImplementedError
 
     def url(self, key, expires_in=3600):
         raise NotImplementedError
 
+    def presigned_upload(
+        self, key, content_type=None, expires_in=3600, max_bytes=None, method="POST"
+    ):
+        """Return ``{"method", "url", "fields" | "headers"}`` for a direct client upload."""
+        raise NotImplementedError
+
+    def head(self, key):
+        """Return ``{"size", "content_type", "etag"}`` for a stored object, or None if missing."""
+        raise NotImplementedError
+
 
-@dataclass
 @dataclass
 class AmazonStorageService(BaseStorageService):
     bucket: str
@@ -30,16 +73,26 @@ class AmazonStorageService(BaseStorageService):
     secret_access_key: str
     endpoint_url: str | None = None
     prefix: str | None = None
+    client_options: dict | None = None
+    transfer_options: dict | None = None
+    checksum_algorithm: str | None = DEFAULT_UPLOAD_CHECKSUM_ALGORITHM
+
+    provider = "s3"
 
     def __post_init__(self):
         if not self.bucket:
             raise StorageError("AWS_S3_BUCKET is required for amazon storage")
-        self._client = boto3.client(
+
+    @property
+    def _client(self):
+        # Looked up on every call so the pooled client is rebuilt after a fork.
+        return get_aws_client(
             "s3",
-            region_name=self.region or None,
-            aws_access_key_id=self.access_key_id or None,
-            aws_secret_access_key=self.secret_access_key or None,
-            endpoint_url=self.endpoint_url or None,
+            region=self.region,
+            endpoint_url=self.endpoint_url,
+            access_key_id=self.access_key_id,
+            secret_access_key=self.secret_access_key,
+            options=self.client_options,
         )
 
     def _object_key(self, key):
@@ -49,22 +102,69 @@ class AmazonStorageService(BaseStorageService):
         return key
 
     def save(self, key, data, content_type=None):
+        """Upload ``data`` (bytes or a binary stream) to ``key``.
+
+        Streams above the multipart threshold are sent as concurrent parts
+        read straight from the stream; non-seekable streams are buffered one
+        part at a time. S3 verifies the upload against ``checksum_algorithm``.
+        """
         object_key = self._object_key(key)
         extra_args = {}
         if content_type:
             extra_args["ContentType"] = content_type
+        if self.checksum_algorithm:
+            extra_args["ChecksumAlgorithm"] = self.checksum_algorithm
+        started = time.perf_counter()
         if hasattr(data, "read"):
-            self._client.upload_fileobj(data, self.bucket, object_key, ExtraArgs=extra_args or None)
+            progress = _TransferProgress()
+            self._client.upload_fileobj(
+                data,
+                self.bucket,
+                object_key,
+                ExtraArgs=extra_args or None,
+                Callback=progress,
+                Config=s3_transfer_config(self.transfer_options),
+            )
+            size = progress.bytes
         else:
             params = {"Bucket": self.bucket, "Key": object_key, "Body": data}
             params.update(extra_args)
             self._client.put_object(**params)
+            size = len(data)
+        _log_transfer("Uploaded", object_key, size, time.perf_counter() - started)
 
     def read(self, key):
         object_key = self._object_key(key)
         response = self._client.get_object(Bucket=self.bucket, Key=object_key)
         return response["Body"].read()
 
+    def open(self, key):
+        object_key = self._object_key(key)
+        started = time.perf_counter()
+        handle, _content_type, length = download_s3_fileobj(
+            self._client, self.bucket, object_key, self.transfer_options
+        )
+        _log_transfer("Downloaded", object_key, length, time.perf_counter() - started)
+        return handle
+
+    def download(self, key, fileobj, etag=None):
+        object_key = self._object_key(key)
+        started = time.perf_counter()
+        progress = _TransferProgress()
+        head = download_s3_object(
+            self._client,
+            self.bucket,
+            object_key,
+            fileobj,
+            self.transfer_options,
+            callback=progress,
+        )
+        # The bytes all come from the version ``head`` described, so its ETag
+        # is the one to check.
+        if etag and head.get("ETag") != etag:
+            raise StorageError(f"{object_key} changed from ETag {etag} to {head.get('ETag')}")
+        _log_transfer("Downloaded", object_key, progress.bytes, time.perf_counter() - started)
+
     def delete(self, key):
         object_key = self._object_key(key)
         self._client.delete_object(Bucket=self.bucket, Key=object_key)
@@ -76,3 +176,187 @@ class AmazonStorageService(BaseStorageService):
             Params={"Bucket": self.bucket, "Key": object_key},
             ExpiresIn=expires_in,
         )
+
+    def presigned_upload(
+        self, key, content_type=None, expires_in=3600, max_bytes=None, method="POST"
+    ):
+        object_key = self._object_key(key)
+        if method == "PUT":
+            params = {"Bucket": self.bucket, "Key": object_key}
+            headers = {}
+            if content_type:
+                params["ContentType"] = content_type
+                headers["Content-Type"] = content_type
+            url = self._client.generate_presigned_url(
+                "put_object", Params=params, ExpiresIn=expires_in
+            )
+            return {"method": "PUT", "url": url, "headers": headers}
+
+        # POST policies can also cap the object size, which PUT URLs cannot.
+        fields = {}
+        conditions = []
+        if content_type:
+            fields["Content-Type"] = content_type
+            conditions.append({"Content-Type": content_type})
+        if max_bytes:
+            conditions.append(["content-length-range", 1, max_bytes])
+        post = self._client.generate_presigned_post(
+            self.bucket,
+            object_key,
+            Fields=fields or None,
+            Conditions=conditions or None,
+            ExpiresIn=expires_in,
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"]}
+
+    def head(self, key):
+        try:
+            response = self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in {"404", "NoSuchKey", "NotFound"}:
+                return None
+            raise
+        return {
+            "size": response.get("ContentLength"),
+            "content_type": response.get("ContentType"),
+            "etag": response.get("ETag"),
+        }
+
+
+@dataclass
+class LocalStorageService(BaseStorageService):
+    """Files under ``root``, for single-node deployments without S3.
+
+    Writes go to a temporary file in the target directory that is renamed
+    over the key, so readers never see a partial file. Download and upload
+    URLs point at the app's ``/storage/<key>`` route and are signed with
+    ``secret_key`` the same way S3 presigned URLs are.
+    """
+
+    root: str
+    secret_key: str
+    base_url: str = ""
+
+    provider = "local"
+
+    def __post_init__(self):
+        if not self.root:
+            raise StorageError("STORAGE_LOCAL_ROOT is required for local storage")
+        if not self.secret_key:
+            raise StorageError("SECRET_KEY is required to sign local storage URLs")
+        os.makedirs(self.root, exist_ok=True)
+        # Resolve symlinks once so ``path`` compares resolved keys against
+        # the resolved root.
+        self.root = str(Path(self.root).resolve())
+
+    def path(self, key):
+        root = Path(self.root)
+        path = (root / key.lstrip("/")).resolve()
+        if path == root or root not in path.parents:
+            raise StorageError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, key, data, content_type=None):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                if hasattr(data, "read"):
+                    shutil.copyfileobj(data, handle, 1024 * 1024)
+                else:
+                    handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+                size = handle.tell()
+            os.replace(temp_path, path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.unlink(temp_path)
+            raise
+        _log_transfer("Wrote", key, size, time.perf_counter() - started, backend="local")
+
+    def read(self, key):
+        # Callers that do not need the whole file in memory use ``open``.
+        with open(self.path(key), "rb") as handle:
+            return handle.read()
+
+    def open(self, key):
+        return open(self.path(key), "rb")
+
+    def delete(self, key):
+        with suppress(FileNotFoundError):
+            os.unlink(self.path(key))
+
+    def url(self, key, expires_in=3600):
+        return self._signed_url("GET", key, expires_in)
+
+    def presigned_upload(
+        self, key, content_type=None, expires_in=3600, max_bytes=None, method="POST"
+    ):
+        # The upload route takes the raw body, so every upload is a PUT.
+        headers = {"Content-Type": content_type} if content_type else {}
+        url = self._signed_url("PUT", key, expires_in, max_bytes=max_bytes)
+        return {"method": "PUT", "url": url, "headers": headers}
+
+    def head(self, key):
+        try:
+            stat = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        # Files are only ever replaced by a rename, which changes the inode.
+        return {
+            "size": stat.st_size,
+            "content_type": None,
+            "etag": f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}",
+        }
+
+    def verify(self, method, key, expires, signature, max_bytes=None):
+        """Return True if ``signature`` was issued by ``url`` or ``presigned_upload``."""
+        try:
+            if int(expires) < time.time():
+                return False
+        except (TypeError, ValueError):
+            return False
+        expected = self._signature(method, key, expires, max_bytes)
+        return hmac.compare_digest(expected, signature or "")
+
+    def _signed_url(self, method, key, expires_in, max_bytes=None):
+        expires = str(int(time.time()) + int(expires_in))
+        params = {"expires": expires}
+        if max_bytes:
+            params["max_bytes"] = str(max_bytes)
+        params["signature"] = self._signature(method, key, expires, params.get("max_bytes"))
+        return f"{self.base_url.rstrip('/')}/storage/{quote(key.lstrip('/'))}?{urlencode(params)}"
+
+    def _signature(self, method, key, expires, max_bytes=None):
+        message = "\n".join([method, key.lstrip("/"), str(expires), str(max_bytes or "")])
+        return hmac.new(
+            self.secret_key.encode("utf-8"), message.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+
+class _TransferProgress:
+    """Byte counter for boto3 transfer callbacks, which run on worker threads."""
+
+    def __init__(self):
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.bytes += bytes_amount
+
+
+def _log_transfer(action, object_key, size, seconds, backend="s3"):
+    size = size or 0
+    LOGGER.info(
+        "%s %s object %s: %d bytes in %.3fs (%.2f MB/s)",
+        action,
+        backend,
+        object_key,
+        size,
+        seconds,
+        size / seconds / 1_000_000 if seconds > 0 else 0.0,
+    )
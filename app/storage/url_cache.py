@@ -0,0 +1,88 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+import weakref
+
+
+DEFAULT_URL_EXPIRES = 3600
+DEFAULT_URL_REFRESH_MARGIN = 300
+DEFAULT_URL_CACHE_SIZE = 10000
+
+_CACHES = weakref.WeakSet()
+
+
+class PresignedUrlCache:
+    """Process-local cache of signed download URLs.
+
+    Entries are keyed by storage key and expiry bucket. Buckets last
+    ``expires_in - refresh_margin`` seconds, so a URL handed out from the
+    current bucket is always valid for at least ``refresh_margin`` more
+    seconds, and the next bucket signs a fresh one. Storage keys change
+    whenever a document's file does, so replaced entries are never served;
+    ``invalidate`` only frees them early.
+    """
+
+    def __init__(
+        self,
+        expires_in=DEFAULT_URL_EXPIRES,
+        refresh_margin=DEFAULT_URL_REFRESH_MARGIN,
+        max_entries=DEFAULT_URL_CACHE_SIZE,
+        clock=time.time,
+    ):
+        self.expires_in = int(expires_in)
+        self.refresh_margin = min(int(refresh_margin), self.expires_in - 1)
+        self.max_entries = int(max_entries)
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        _CACHES.add(self)
+
+    @property
+    def bucket_seconds(self):
+        return max(self.expires_in - self.refresh_margin, 1)
+
+    def get(self, storage, key):
+        """Return ``{"url", "expires_at"}`` for ``key``, signing it on a miss."""
+        now = self._clock()
+        cache_key = (key, int(now // self.bucket_seconds))
+        if self.max_entries > 0:
+            with self._lock:
+                entry = self._entries.get(cache_key)
+                if entry is not None:
+                    self._entries.move_to_end(cache_key)
+                    return dict(entry)
+
+        entry = {
+            "url": storage.url(key, expires_in=self.expires_in),
+            "expires_at": int(now) + self.expires_in,
+        }
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[cache_key] = entry
+                self._entries.move_to_end(cache_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return dict(entry)
+
+    def invalidate(self, key):
+        with self._lock:
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == key]:
+                del self._entries[cache_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _reset_after_fork():
+    # A lock held by another thread at fork time would never be released in the child.
+    for cache in list(_CACHES):
+        cache._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
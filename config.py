@@ -62,22 +62,91 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv("SECRET_KEY", "default-flask-api-secret")
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+    STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "storage")
+    STORAGE_LOCAL_BASE_URL = os.getenv("STORAGE_LOCAL_BASE_URL", "")
+    STORAGE_CACHE_DIR = os.getenv("STORAGE_CACHE_DIR", "")
+    STORAGE_CACHE_MAX_BYTES = int(
+        os.getenv("STORAGE_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024))
+    )
     AWS_S3_BUCKET = os.getenv("AWS_S3_BUCKET", "")
     AWS_REGION = os.getenv("AWS_REGION", "")
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "")
     AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
     AWS_S3_ENDPOINT = os.getenv("AWS_S3_ENDPOINT", "")
     AWS_S3_PREFIX = os.getenv("AWS_S3_PREFIX", "")
+    DOCUMENT_UPLOAD_MAX_BYTES = int(
+        os.getenv("DOCUMENT_UPLOAD_MAX_BYTES", str(1024 * 1024 * 1024))
+    )
+    DOCUMENT_UPLOAD_URL_EXPIRES = int(os.getenv("DOCUMENT_UPLOAD_URL_EXPIRES", "3600"))
+    DOCUMENT_UPLOAD_STALE_AFTER = int(os.getenv("DOCUMENT_UPLOAD_STALE_AFTER", "86400"))
+    STORAGE_URL_EXPIRES = int(os.getenv("STORAGE_URL_EXPIRES", "3600"))
+    STORAGE_URL_REFRESH_MARGIN = int(os.getenv("STORAGE_URL_REFRESH_MARGIN", "300"))
+    STORAGE_URL_CACHE_SIZE = int(os.getenv("STORAGE_URL_CACHE_SIZE", "10000"))
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
     OPENAI_INFERENCE_MODEL = os.getenv("OPENAI_INFERENCE_MODEL", "")
     USE_OPENAI = os.getenv("USE_OPENAI", "true")
+    OPENAI_RATE_LIMIT = os.getenv("OPENAI_RATE_LIMIT", "true")
+    OPENAI_RATE_LIMIT_DIR = os.getenv("OPENAI_RATE_LIMIT_DIR", "")
+    OPENAI_EMBEDDING_TOKENS_PER_MINUTE = int(
+        os.getenv("OPENAI_EMBEDDING_TOKENS_PER_MINUTE", "0")
+    )
+    OPENAI_EMBEDDING_REQUESTS_PER_MINUTE = int(
+        os.getenv("OPENAI_EMBEDDING_REQUESTS_PER_MINUTE", "0")
+    )
+    OPENAI_INFERENCE_TOKENS_PER_MINUTE = int(
+        os.getenv("OPENAI_INFERENCE_TOKENS_PER_MINUTE", "0")
+    )
+    OPENAI_INFERENCE_REQUESTS_PER_MINUTE = int(
+        os.getenv("OPENAI_INFERENCE_REQUESTS_PER_MINUTE", "0")
+    )
     AUTHENTICATE_PUBLIC_DOCUMENTS = os.getenv("AUTHENTICATE_PUBLIC_DOCUMENTS", "false")
     DOCUMENT_TYPES = _load_document_types()
+    QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "sqs")
+    QUEUE_DATABASE_URL = os.getenv("QUEUE_DATABASE_URL", "")
+    QUEUE_NAME = os.getenv("QUEUE_NAME", "embeddings")
+    QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "1"))
     SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL", "")
     SQS_REGION = os.getenv("SQS_REGION", os.getenv("AWS_REGION", ""))
     AWS_SQS_ENDPOINT = os.getenv("AWS_SQS_ENDPOINT", "")
+    AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+    AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "5"))
+    AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "standard")
+    AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "5"))
+    AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "60"))
+    AWS_TCP_KEEPALIVE = os.getenv("AWS_TCP_KEEPALIVE", "true")
+    S3_TRANSFER_MULTIPART_THRESHOLD = int(
+        os.getenv("S3_TRANSFER_MULTIPART_THRESHOLD", str(8 * 1024 * 1024))
+    )
+    S3_TRANSFER_MULTIPART_CHUNKSIZE = int(
+        os.getenv("S3_TRANSFER_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024))
+    )
+    S3_TRANSFER_MAX_CONCURRENCY = int(os.getenv("S3_TRANSFER_MAX_CONCURRENCY", "10"))
+    S3_UPLOAD_CHECKSUM_ALGORITHM = os.getenv("S3_UPLOAD_CHECKSUM_ALGORITHM", "CRC32")
+    S3_DOWNLOAD_SPOOL_MAX_BYTES = int(
+        os.getenv("S3_DOWNLOAD_SPOOL_MAX_BYTES", str(16 * 1024 * 1024))
+    )
     LOCAL_EMBEDDING_MODEL_PATH = os.getenv("LOCAL_EMBEDDING_MODEL_PATH", "")
     LOCAL_EMBEDDING_N_CTX = int(os.getenv("LOCAL_EMBEDDING_N_CTX", "2048"))
     LOCAL_EMBEDDING_N_THREADS = int(os.getenv("LOCAL_EMBEDDING_N_THREADS", "4"))
     LOCAL_EMBEDDING_N_BATCH = int(os.getenv("LOCAL_EMBEDDING_N_BATCH", "64"))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+    EXTRACT_PROCESSES = int(os.getenv("EXTRACT_PROCESSES", "0"))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+    PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "25"))
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "40"))
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    QUERY_EMBEDDING_CACHE_TTL = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "86400"))
+    QUERY_EMBEDDING_CACHE_SHARED = os.getenv("QUERY_EMBEDDING_CACHE_SHARED", "false")
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+    ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.98"))
+    EMBEDDING_CACHE_BACKEND = os.getenv("EMBEDDING_CACHE_BACKEND", "")
+    EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+    EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024**3)))
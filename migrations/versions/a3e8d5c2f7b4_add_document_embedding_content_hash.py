@@ -0,0 +1,29 @@
+"""add document embedding content hash
+
+Revision ID: a3e8d5c2f7b4
+Revises: 7c5b1a2d9f01
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a3e8d5c2f7b4"
+down_revision = "7c5b1a2d9f01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("document_embeddings", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("content_hash", sa.String(length=64), nullable=True))
+        batch_op.create_index(
+            batch_op.f("ix_document_embeddings_content_hash"), ["content_hash"], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("document_embeddings", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_document_embeddings_content_hash"))
+        batch_op.drop_column("content_hash")
@@ -0,0 +1,31 @@
+"""added embedding cache entry model
+
+Revision ID: c41f6e9a2b8d
+Revises: a3e8d5c2f7b4
+Create Date: 2026-10-17 00:10:00.000000
+
+"""
+from alembic import op
+from pgvector.sqlalchemy import Vector
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c41f6e9a2b8d"
+down_revision = "a3e8d5c2f7b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "embedding_cache_entries",
+        sa.Column("model_name", sa.String(length=255), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("embedding", Vector(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("model_name", "content_hash"),
+    )
+
+
+def downgrade():
+    op.drop_table("embedding_cache_entries")
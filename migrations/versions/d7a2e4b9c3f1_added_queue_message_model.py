@@ -0,0 +1,41 @@
+"""added queue message model
+
+Revision ID: d7a2e4b9c3f1
+Revises: c41f6e9a2b8d
+Create Date: 2026-10-17 00:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d7a2e4b9c3f1"
+down_revision = "c41f6e9a2b8d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "queue_messages",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("queue_name", sa.String(length=255), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("receipt_handle", sa.String(length=36), nullable=True),
+        sa.Column("receive_count", sa.Integer(), nullable=False),
+        sa.Column("visible_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("receipt_handle"),
+    )
+    op.create_index(
+        "ix_queue_messages_queue_visible",
+        "queue_messages",
+        ["queue_name", "visible_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_queue_messages_queue_visible", table_name="queue_messages")
+    op.drop_table("queue_messages")
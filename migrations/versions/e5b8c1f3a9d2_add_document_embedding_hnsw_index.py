@@ -0,0 +1,51 @@
+"""add document embedding hnsw index
+
+Revision ID: e5b8c1f3a9d2
+Revises: d7a2e4b9c3f1
+Create Date: 2026-10-17 00:30:00.000000
+
+"""
+import os
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e5b8c1f3a9d2"
+down_revision = "d7a2e4b9c3f1"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_document_embeddings_embedding_hnsw"
+HNSW_MAX_DIMENSIONS = 2000
+
+
+def _int_env(name, default):
+    return int(os.getenv(name) or default)
+
+
+def upgrade():
+    # Existing rows must already have this many dimensions; the cast fails otherwise.
+    dimensions = _int_env("EMBEDDING_DIMENSIONS", 1536)
+    op.execute(
+        "ALTER TABLE document_embeddings "
+        f"ALTER COLUMN embedding TYPE vector({dimensions}) "
+        f"USING embedding::vector({dimensions})"
+    )
+    if dimensions > HNSW_MAX_DIMENSIONS:
+        print(
+            f"Skipping {INDEX_NAME}: HNSW supports at most "
+            f"{HNSW_MAX_DIMENSIONS} dimensions."
+        )
+        return
+    op.execute(
+        f"CREATE INDEX {INDEX_NAME} ON document_embeddings "
+        "USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = {_int_env('HNSW_M', 16)}, "
+        f"ef_construction = {_int_env('HNSW_EF_CONSTRUCTION', 64)})"
+    )
+
+
+def downgrade():
+    op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+    op.execute("ALTER TABLE document_embeddings ALTER COLUMN embedding TYPE vector")
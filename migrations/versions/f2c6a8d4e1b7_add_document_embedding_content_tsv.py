@@ -0,0 +1,35 @@
+"""add document embedding content tsv
+
+Revision ID: f2c6a8d4e1b7
+Revises: e5b8c1f3a9d2
+Create Date: 2026-10-17 00:40:00.000000
+
+"""
+import os
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "f2c6a8d4e1b7"
+down_revision = "e5b8c1f3a9d2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rewrites the table to fill the column for existing rows.
+    config = os.getenv("TEXT_SEARCH_CONFIG") or "english"
+    op.execute(
+        "ALTER TABLE document_embeddings ADD COLUMN content_tsv tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{config}'::regconfig, coalesce(content, ''))) STORED"
+    )
+    op.execute(
+        "CREATE INDEX ix_document_embeddings_content_tsv "
+        "ON document_embeddings USING gin (content_tsv)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_document_embeddings_content_tsv")
+    op.execute("ALTER TABLE document_embeddings DROP COLUMN content_tsv")
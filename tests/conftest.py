@@ -5,8 +5,11 @@ from sqlalchemy import text
 from sqlalchemy.engine import make_url
 
 os.environ.setdefault("FLASK_ENV", "test")
+os.environ.setdefault("EMBEDDING_DIMENSIONS", "3")
 
 from app import create_app, db
+from app.embeddings.query_cache import clear_query_embedding_cache
+from app.operations.inquiries.answer_cache import clear_answer_cache
 from app.helpers.api_helpers import build_jwt_header, generate_jwt
 from tests.factories import UserFactory
 
@@ -21,6 +24,8 @@ def app():
             db.session.commit()
         db.create_all()
         yield app
+        clear_query_embedding_cache()
+        clear_answer_cache()
         db.session.remove()
         db.drop_all()
 
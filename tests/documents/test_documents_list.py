@@ -70,3 +70,30 @@ def test_public_list_documents_filter_by_embedding_status(client):
     records = response.json["records"]
     assert len(records) == 1
     assert records[0]["id"] == embedded.id
+
+
+def test_public_list_documents_can_defer_download_urls(client, auth_headers, app, monkeypatch):
+    app.config["DOCUMENT_TYPES"] = ["national_budget"]
+    document = DocumentFactory(document_type="national_budget")
+    signed = []
+
+    def _get_download_url(key):
+        signed.append(key)
+        return {"url": f"https://files.example.com/{key}", "expires_at": 1_900_000_000}
+
+    monkeypatch.setattr(
+        "app.controllers.documents_controller.get_download_url", _get_download_url
+    )
+
+    response = client.get("/public/documents?download_urls=false", headers=auth_headers)
+    assert response.status_code == 200
+    assert [record["id"] for record in response.json["records"]] == [document.id]
+    assert response.json["records"][0]["download_url"] is None
+    assert signed == []
+
+    response = client.get(
+        f"/public/documents/{document.id}/download_url", headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json["download_url"] == f"https://files.example.com/{document.storage_key}"
+    assert signed == [document.storage_key]
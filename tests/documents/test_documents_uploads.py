@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta, timezone
+import json
+
+import pytest
+
+from app import db
+from app.models.document import Document
+from app.models.queue_message import QueueMessage
+from tests.factories import DocumentFactory
+
+
+def _presign(client, auth_headers, **overrides):
+    payload = {"name": "Large report", "filename": "report.pdf"}
+    payload.update(overrides)
+    return client.post("/documents/uploads", json=payload, headers=auth_headers)
+
+
+def test_presigned_upload_creates_a_waiting_document(client, auth_headers):
+    response = _presign(client, auth_headers)
+
+    assert response.status_code == 200
+    document = response.json["document"]
+    assert document["embedding_status"] == "uploading"
+    assert document["content_type"] == "application/pdf"
+    upload = response.json["upload"]
+    assert upload["method"] == "POST"
+    assert upload["fields"]["key"].endswith(document["storage_key"])
+    assert Document.query.filter_by(name="Large report").first() is not None
+
+
+def test_presigned_put_upload_returns_headers(client, auth_headers):
+    response = _presign(client, auth_headers, method="put")
+
+    assert response.status_code == 200
+    assert response.json["upload"]["method"] == "PUT"
+    assert response.json["upload"]["headers"] == {"Content-Type": "application/pdf"}
+
+
+def test_presigned_upload_validates_the_file(client, auth_headers):
+    response = _presign(client, auth_headers, filename="script.exe")
+    assert response.status_code == 422
+    assert response.json["message"] == "unsupported file type"
+
+    response = _presign(client, auth_headers, size_bytes=10 * 1024 * 1024 * 1024)
+    assert response.status_code == 422
+    assert response.json["message"] == "file is too large"
+
+
+def test_finalize_requires_the_uploaded_file(client, auth_headers):
+    document_id = _presign(client, auth_headers).json["document"]["id"]
+
+    response = client.post(f"/documents/{document_id}/finalize", headers=auth_headers)
+
+    assert response.status_code == 422
+    assert response.json["message"] == "file has not been uploaded"
+
+
+def test_finalize_records_the_upload_and_enqueues(client, auth_headers, app):
+    app.config["QUEUE_BACKEND"] = "database"
+    document = _presign(client, auth_headers).json["document"]
+    app.extensions["storage"].save(
+        document["storage_key"], b"%PDF-1.4 report", content_type="application/pdf"
+    )
+
+    response = client.post(f"/documents/{document['id']}/finalize", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json["size_bytes"] == len(b"%PDF-1.4 report")
+    assert response.json["embedding_status"] == "pending"
+    assert response.json["enqueue_error"] is None
+    message = QueueMessage.query.one()
+    assert json.loads(message.body)["document_id"] == document["id"]
+
+
+def test_finalize_ignores_documents_that_are_not_uploading(client, auth_headers):
+    document = DocumentFactory(embedding_status="embedded")
+
+    response = client.post(f"/documents/{document.id}/finalize", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json["embedding_status"] == "embedded"
+
+
+def test_presigned_upload_requires_admin(client, user_headers):
+    response = client.post(
+        "/documents/uploads", json={"name": "Doc", "filename": "doc.pdf"}, headers=user_headers
+    )
+    assert response.status_code == 403
+
+
+def test_uploading_documents_are_not_public_until_finalized(client, auth_headers, app):
+    app.config["DOCUMENT_TYPES"] = ["national_budget"]
+    app.config["QUEUE_BACKEND"] = "database"
+    embedded = DocumentFactory(document_type="national_budget", embedding_status="embedded")
+    document = _presign(client, auth_headers, document_type="national_budget").json["document"]
+
+    def public_ids():
+        response = client.get("/public/documents?download_urls=false", headers=auth_headers)
+        assert response.status_code == 200
+        return {record["id"] for record in response.json["records"]}
+
+    assert public_ids() == {embedded.id}
+    assert client.get(f"/public/documents/{document['id']}", headers=auth_headers).status_code == 404
+    response = client.get(f"/public/documents/{document['id']}/download_url", headers=auth_headers)
+    assert response.status_code == 404
+
+    app.extensions["storage"].save(
+        document["storage_key"], b"%PDF-1.4 report", content_type="application/pdf"
+    )
+    response = client.post(f"/documents/{document['id']}/finalize", headers=auth_headers)
+    assert response.status_code == 200
+
+    assert public_ids() == {embedded.id, document["id"]}
+    response = client.get(f"/public/documents/{document['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json["embedding_status"] == "pending"
+
+
+def test_stale_uploads_are_removed_and_free_their_name(client, auth_headers):
+    stale = DocumentFactory(
+        name="Large report",
+        embedding_status="uploading",
+        created_at=datetime.now(timezone.utc) - timedelta(days=2),
+    )
+    recent = DocumentFactory(embedding_status="uploading")
+    stale_id = stale.id
+
+    response = _presign(client, auth_headers)
+
+    assert response.status_code == 200
+    assert db.session.get(Document, stale_id) is None
+    assert db.session.get(Document, recent.id) is not None
+
+
+def test_failed_upload_urls_do_not_keep_the_document(client, auth_headers, app, monkeypatch):
+    def _fail(*args, **kwargs):
+        raise RuntimeError("signing failed")
+
+    monkeypatch.setattr(app.extensions["storage"], "presigned_upload", _fail)
+
+    with pytest.raises(RuntimeError):
+        _presign(client, auth_headers)
+    assert Document.query.filter_by(name="Large report").first() is None
@@ -0,0 +1,114 @@
+from io import BytesIO
+from types import SimpleNamespace
+
+from openpyxl import Workbook
+import tiktoken
+
+from app import cli
+from app.cli import _chunk_tokens, _iter_text_tokens, _iter_token_chunks
+
+
+CL100K_PATTERN = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+|"""
+    r""" ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+)
+
+
+def _encoding():
+    ranks = {bytes([i]): i for i in range(256)}
+    for merge in [b"th", b"he", b" t", b"the", b" the", b"  ", b"\n\n", b"12"]:
+        ranks[merge] = len(ranks)
+    return tiktoken.Encoding(
+        "test", pat_str=CL100K_PATTERN, mergeable_ranks=ranks, special_tokens={}
+    )
+
+
+PAGES = [
+    "The budget for 2025  covers the education sector.",
+    "  Page two starts with spaces and ends with a newline\n",
+    "",
+    "Line items: 123456 pesos, 78 agencies; it's the third page.",
+]
+
+
+def test_streamed_tokens_match_full_text():
+    encoding = _encoding()
+    expected = encoding.encode("\n".join(PAGES))
+
+    streamed = [token for batch in _iter_text_tokens(encoding, PAGES) for token in batch]
+
+    assert streamed == expected
+
+
+def test_streamed_chunks_match_chunk_boundaries():
+    encoding = _encoding()
+    tokens = encoding.encode("\n".join(PAGES))
+
+    chunks = list(
+        _iter_token_chunks(encoding, _iter_text_tokens(encoding, PAGES), 16, 4)
+    )
+
+    assert [text for text, _ in chunks] == _chunk_tokens(encoding, tokens, 16, 4)
+    assert [count for _, count in chunks] == [
+        len(tokens[i : i + 16]) for i in range(0, len(tokens), 12)
+    ]
+
+
+def test_text_without_boundaries_is_flushed_at_the_pending_limit(monkeypatch):
+    monkeypatch.setattr(cli, "MAX_PENDING_TEXT", 32)
+    encoding = _encoding()
+    pages = ["一二三四五六七八九十" * 2] * 6
+
+    batches = list(_iter_text_tokens(encoding, pages))
+
+    assert len(batches) > 1
+    assert max(len(encoding.decode(batch)) for batch in batches) < 2 * 32
+    assert "".join(encoding.decode(batch) for batch in batches) == "\n".join(pages)
+
+
+def _embedded_chunks(monkeypatch, document, data, chunk_size=16, chunk_overlap=4):
+    chunks = []
+    monkeypatch.setattr(cli, "_encoding_for_model", lambda model: _encoding())
+    monkeypatch.setattr(
+        cli,
+        "_embed_document_chunks",
+        lambda document, parts, embedder, **kwargs: chunks.extend(parts),
+    )
+    cli._embed_document_from_file(
+        document,
+        BytesIO(data),
+        chunk_size,
+        chunk_overlap,
+        SimpleNamespace(encoding_model="test"),
+    )
+    return chunks
+
+
+def test_text_documents_are_extracted_and_chunked(monkeypatch):
+    document = SimpleNamespace(original_filename="notes.txt", content_type="text/plain")
+    text = "\n".join(PAGES)
+
+    chunks = _embedded_chunks(monkeypatch, document, text.encode())
+
+    encoding = _encoding()
+    assert [chunk for chunk, _ in chunks] == _chunk_tokens(
+        encoding, encoding.encode(text), 16, 4
+    )
+
+
+def test_spreadsheets_are_extracted_and_chunked(monkeypatch):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Prices"
+    sheet.append(["item", "price"])
+    sheet.append(["apple", 3])
+    buffer = BytesIO()
+    workbook.save(buffer)
+    document = SimpleNamespace(
+        original_filename="prices.xlsx",
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+    chunks = _embedded_chunks(monkeypatch, document, buffer.getvalue(), chunk_size=64)
+
+    assert [chunk for chunk, _ in chunks] == ["# Sheet: Prices\nitem\tprice\napple\t3"]
@@ -0,0 +1,27 @@
+from app.embeddings import clear_embedders, get_embedder
+
+
+def test_get_embedder_builds_once_per_key():
+    clear_embedders()
+    built = []
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    first = get_embedder(("local", "model.gguf"), factory)
+    second = get_embedder(("local", "model.gguf"), factory)
+    other = get_embedder(("local", "other.gguf"), factory)
+
+    assert first is second
+    assert other is not first
+    assert len(built) == 2
+    clear_embedders()
+
+
+def test_clear_embedders_forces_rebuild():
+    clear_embedders()
+    first = get_embedder("key", object)
+    clear_embedders()
+    assert get_embedder("key", object) is not first
+    clear_embedders()
@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+import asyncio
+
+from app.embeddings import (
+    AsyncOpenAIEmbedder,
+    LocalEmbedder,
+    OpenAIEmbedder,
+    RateGovernor,
+    iter_batches,
+    iter_embeddings,
+)
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input):
+        self.calls.append(list(input))
+        data = [
+            SimpleNamespace(index=index, embedding=[float(len(text))])
+            for index, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+class FakeLlama:
+    def __init__(self):
+        self.calls = []
+
+    def create_embedding(self, input):
+        self.calls.append(list(input))
+        return {
+            "data": [
+                {"index": index, "embedding": [float(len(text))]}
+                for index, text in enumerate(input)
+            ]
+        }
+
+
+def test_iter_batches_splits_by_count():
+    items = [(f"chunk-{i}", 10) for i in range(5)]
+    batches = list(iter_batches(items, 2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_iter_batches_splits_by_token_total():
+    items = [("a", 40), ("b", 40), ("c", 40), ("d", 100)]
+    batches = list(iter_batches(items, 10, max_tokens=90))
+    assert [[text for text, _ in batch] for batch in batches] == [["a", "b"], ["c"], ["d"]]
+
+
+def test_openai_embedder_batches_and_keeps_order():
+    client = SimpleNamespace(embeddings=FakeEmbeddings())
+    embedder = OpenAIEmbedder(client=client, model="text-embedding-3-small")
+    items = [("a", 1), ("bb", 1), ("ccc", 1)]
+
+    embeddings = list(iter_embeddings(embedder, items, 2))
+
+    assert embeddings == [("a", [1.0]), ("bb", [2.0]), ("ccc", [3.0])]
+    assert client.embeddings.calls == [["a", "bb"], ["ccc"]]
+
+
+def test_local_embedder_batches():
+    llm = FakeLlama()
+    embedder = LocalEmbedder(llm=llm)
+
+    embeddings = list(iter_embeddings(embedder, [("a", 1), ("bb", 1)], 8))
+
+    assert embeddings == [("a", [1.0]), ("bb", [2.0])]
+    assert llm.calls == [["a", "bb"]]
+
+
+def test_async_openai_embedder_shares_model_name_and_orders_results():
+    class FakeAsyncEmbeddings(FakeEmbeddings):
+        async def create(self, model, input):
+            return FakeEmbeddings.create(self, model, input)
+
+    embedder = AsyncOpenAIEmbedder(
+        client=SimpleNamespace(embeddings=FakeAsyncEmbeddings()), model="m"
+    )
+    sync_embedder = OpenAIEmbedder(client=None, model="m")
+
+    assert embedder.model_name == sync_embedder.model_name
+    assert asyncio.run(embedder.embed_batch(["a", "bbb"])) == [[1.0], [3.0]]
+
+
+def test_openai_embedder_reports_headers_to_governor():
+    embeddings = FakeEmbeddings()
+    parsed = []
+
+    class RawResponse:
+        headers = {
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "10",
+        }
+
+        def __init__(self, model, input):
+            self.response = FakeEmbeddings.create(embeddings, model, input)
+
+        def parse(self):
+            parsed.append(True)
+            return self.response
+
+    embeddings.with_raw_response = SimpleNamespace(create=RawResponse)
+    governor = RateGovernor()
+    embedder = OpenAIEmbedder(
+        client=SimpleNamespace(embeddings=embeddings), model="m", governor=governor
+    )
+
+    assert embedder.embed_batch(["a", "bb"], token_count=2) == [[1.0], [2.0]]
+    assert parsed == [True]
+    with governor._locked_state() as state:
+        assert state["tokens_limit"] == 1000
+        assert state["factor"] == 0.5
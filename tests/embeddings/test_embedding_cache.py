@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+
+from sqlalchemy.dialects import postgresql
+
+from app import db
+from app.embeddings import BaseEmbedder, CachedEmbedder, DiskEmbeddingCache
+from app.embeddings.cache import DatabaseEmbeddingCache, normalized_hash
+
+
+class CountingEmbedder(BaseEmbedder):
+    type = "test"
+    model_name = "test:counting"
+
+    def __init__(self):
+        self.inputs = []
+
+    def embed_batch(self, texts, token_count=None):
+        self.inputs.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_normalized_hash_ignores_whitespace_differences():
+    assert normalized_hash("Budget  for\n2025 ") == normalized_hash("Budget for 2025")
+
+
+def test_cached_embedder_only_embeds_misses(tmp_path):
+    embedder = CountingEmbedder()
+    cached = CachedEmbedder(embedder, DiskEmbeddingCache(root=str(tmp_path)))
+
+    assert cached.embed_batch(["alpha", "beta", "alpha"]) == [
+        [5.0, 1.0],
+        [4.0, 1.0],
+        [5.0, 1.0],
+    ]
+    assert cached.embed_batch(["beta", "gamma"]) == [[4.0, 1.0], [5.0, 1.0]]
+
+    assert embedder.inputs == ["alpha", "beta", "gamma"]
+    assert (cached.hits, cached.misses) == (2, 3)
+
+
+def test_disk_cache_is_keyed_by_model(tmp_path):
+    cache = DiskEmbeddingCache(root=str(tmp_path))
+    cache.set_many("model-a", {"key": [1.0]})
+
+    assert cache.get_many("model-a", {"key"}) == {"key": [1.0]}
+    assert cache.get_many("model-b", {"key"}) == {}
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskEmbeddingCache(root=str(tmp_path), max_bytes=200)
+    for index in range(20):
+        cache.set_many("model", {f"{index:064d}": [float(index)] * 4})
+
+    remaining = cache.get_many("model", {f"{index:064d}" for index in range(20)})
+    assert 0 < len(remaining) < 20
+    assert f"{19:064d}" in remaining
+    assert f"{0:064d}" not in remaining
+
+
+def test_disk_cache_size_counts_overwritten_entries_once(tmp_path):
+    cache = DiskEmbeddingCache(root=str(tmp_path))
+    cache.set_many("model", {"a" * 64: [1.0, 2.0]})
+    for _ in range(5):
+        cache.set_many("model", {"a" * 64: [3.0, 4.0], "b" * 64: [5.0]})
+
+    assert cache._size == cache._scan_size()
+
+
+def test_database_cache_writes_in_key_order_on_its_own_transaction(monkeypatch):
+    statements = []
+
+    class Connection:
+        def execute(self, statement):
+            statements.append(statement)
+
+    class Engine:
+        @contextmanager
+        def begin(self):
+            yield Connection()
+
+    monkeypatch.setattr(type(db), "engine", property(lambda self: Engine()))
+    monkeypatch.setattr(db, "session", None)
+
+    DatabaseEmbeddingCache().set_many("model", {"c": [3.0], "a": [1.0], "b": [2.0]})
+
+    (statement,) = statements
+    params = statement.compile(dialect=postgresql.dialect()).params
+    hashes = [value for name, value in params.items() if name.startswith("content_hash")]
+    assert hashes == ["a", "b", "c"]
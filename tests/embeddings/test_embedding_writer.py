@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.embeddings import EmbeddingWriter
+from app.models.document_embedding import DocumentEmbedding
+from tests.factories import DocumentFactory
+
+
+def _row(chunk_index, content):
+    return {
+        "chunk_index": chunk_index,
+        "content": content,
+        "content_hash": f"hash-{chunk_index}",
+        "embedding": [0.1, 0.2, 0.3],
+        "metadata": {"source": "test", "quote": 'a "b", c'},
+    }
+
+
+def test_writer_inserts_rows_with_document_type(app):
+    document = DocumentFactory(document_type="national_budget")
+
+    written = EmbeddingWriter(db.session, document).write(
+        [_row(0, "first,\n\"quoted\" line"), _row(1, None)]
+    )
+    db.session.commit()
+
+    rows = (
+        DocumentEmbedding.query.filter_by(document_id=document.id)
+        .order_by(DocumentEmbedding.chunk_index)
+        .all()
+    )
+    assert written == 2
+    assert [row.document_type for row in rows] == ["national_budget", "national_budget"]
+    assert rows[0].content == 'first,\n"quoted" line'
+    assert rows[1].content is None
+    assert rows[0].metadata_ == {"source": "test", "quote": 'a "b", c'}
+    assert [round(value, 4) for value in rows[0].embedding] == [0.1, 0.2, 0.3]
+
+
+def test_writer_keeps_chunk_index_unique(app):
+    document = DocumentFactory()
+    writer = EmbeddingWriter(db.session, document)
+    writer.write([_row(0, "first")])
+    db.session.commit()
+
+    with pytest.raises(IntegrityError):
+        writer.write([_row(0, "duplicate")])
+        db.session.flush()
+    db.session.rollback()
@@ -0,0 +1,83 @@
+import pytest
+
+from app import cli, db
+from app.cli import _embed_document_chunks
+from app.embeddings import BaseEmbedder
+from app.models.document_embedding import DocumentEmbedding
+from tests.factories import DocumentFactory
+
+
+class CountingEmbedder(BaseEmbedder):
+    type = "test"
+    model_name = "test:counting"
+
+    def __init__(self, fail_on=None):
+        self.inputs = []
+        self.fail_on = fail_on
+
+    def embed_batch(self, texts, token_count=None):
+        if self.fail_on in texts:
+            raise RuntimeError("embedding failed")
+        self.inputs.extend(texts)
+        return [[float(len(text)), 0.0, 1.0] for text in texts]
+
+
+def _rows(document):
+    return (
+        DocumentEmbedding.query.filter_by(document_id=document.id)
+        .order_by(DocumentEmbedding.chunk_index)
+        .all()
+    )
+
+
+def test_reembedding_only_embeds_changed_chunks(app):
+    document = DocumentFactory()
+    embedder = CountingEmbedder()
+    _embed_document_chunks(document, [("alpha", 1), ("beta", 1), ("gamma", 1)], embedder)
+    original_ids = {row.content: row.id for row in _rows(document)}
+
+    embedder = CountingEmbedder()
+    _embed_document_chunks(
+        document, [("beta", 1), ("alpha", 1), ("delta", 1)], embedder
+    )
+
+    rows = _rows(document)
+    assert embedder.inputs == ["delta"]
+    assert [(row.chunk_index, row.content) for row in rows] == [
+        (0, "beta"),
+        (1, "alpha"),
+        (2, "delta"),
+    ]
+    assert rows[0].id == original_ids["beta"]
+    assert rows[1].id == original_ids["alpha"]
+    assert "gamma" not in {row.content for row in rows}
+
+
+def test_reembedding_after_a_partial_failure(app, monkeypatch):
+    # Commit after every row so the failed job leaves rows behind.
+    monkeypatch.setattr(cli, "DEFAULT_BATCH_SIZE", 1)
+    document = DocumentFactory()
+    chunks = [("alpha", 1), ("beta", 1), ("gamma", 1)]
+    _embed_document_chunks(document, chunks, CountingEmbedder(), batch_size=1)
+
+    with pytest.raises(RuntimeError):
+        _embed_document_chunks(
+            document,
+            [("delta", 1), ("epsilon", 1), ("zeta", 1)],
+            CountingEmbedder(fail_on="zeta"),
+            batch_size=1,
+        )
+    db.session.rollback()
+    assert min(row.chunk_index for row in _rows(document)) < 0
+
+    embedder = CountingEmbedder()
+    _embed_document_chunks(
+        document, [("alpha", 1), ("delta", 1), ("eta", 1)], embedder, batch_size=1
+    )
+
+    assert embedder.inputs == ["eta"]
+    assert [(row.chunk_index, row.content) for row in _rows(document)] == [
+        (0, "alpha"),
+        (1, "delta"),
+        (2, "eta"),
+    ]
@@ -0,0 +1,113 @@
+import json
+import logging
+
+import pytest
+
+from app import cli
+from app.embeddings.metrics import JobTimer, TimedEmbedder, record_embedding_job
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_nested_stages_are_charged_exclusively(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("app.embeddings.metrics.time.perf_counter", clock)
+    timer = JobTimer(sqs_receive=0.5)
+
+    with timer.stage("db_insert"):
+        clock.now += 1
+        with timer.stage("embedding_api"):
+            clock.now += 3
+        clock.now += 2
+
+    timings = timer.timings()
+    assert timings["db_insert"] == 3
+    assert timings["embedding_api"] == 3
+    assert timings["sqs_receive"] == 0.5
+    assert timings["extraction"] == 0
+    assert timings["total"] == 6.5
+
+
+def test_iter_charges_only_the_time_spent_producing_items(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("app.embeddings.metrics.time.perf_counter", clock)
+    timer = JobTimer()
+
+    def pages():
+        for page in ("a", "b"):
+            clock.now += 2
+            yield page
+
+    for _page in timer.iter("extraction", pages()):
+        with timer.stage("embedding_api"):
+            clock.now += 5
+
+    assert timer.stages["extraction"] == 4
+    assert timer.stages["embedding_api"] == 10
+
+
+def test_timed_embedder_delegates_and_records():
+    class Embedder:
+        model_name = "fake"
+
+        def embed_batch(self, texts, token_count=None):
+            return [[1.0] for _ in texts]
+
+    timer = JobTimer()
+    embedder = TimedEmbedder(Embedder(), timer)
+    assert embedder.model_name == "fake"
+    assert embedder.embed_batch(["a", "b"]) == [[1.0], [1.0]]
+    assert "embedding_api" in timer.stages
+
+
+def test_record_embedding_job_logs_one_json_line(caplog):
+    timer = JobTimer(s3_download=1.25)
+    timer.counts.update(tokens=120, chunks=3)
+
+    with caplog.at_level(logging.INFO, logger="app.embeddings.metrics"):
+        record_embedding_job(
+            timer,
+            content_type="application/pdf",
+            embedder="text-embedding-3-small",
+            document_id="doc-1",
+        )
+
+    [record] = caplog.records
+    line = json.loads(record.getMessage())
+    assert line["event"] == "embedding_job"
+    assert line["status"] == "embedded"
+    assert line["content_type"] == "application/pdf"
+    assert line["embedder"] == "text-embedding-3-small"
+    assert line["timings"]["s3_download"] == 1.25
+    assert line["tokens"] == 120
+    assert line["chunks"] == 3
+    assert line["document_id"] == "doc-1"
+
+
+def test_serial_jobs_share_the_receive_time(monkeypatch):
+    receives = [([{"ReceiptHandle": f"rh-{index}"} for index in range(3)], 3.0)]
+    timers = []
+
+    def _receive(queue, max_messages, wait_time, visibility_timeout):
+        if not receives:
+            raise KeyboardInterrupt
+        return receives.pop(0)
+
+    def _process(message, timer=None, **options):
+        timers.append(timer)
+        return False
+
+    monkeypatch.setattr(cli, "_receive_queue_messages_timed", _receive)
+    monkeypatch.setattr(cli, "_process_sqs_message", _process)
+
+    with pytest.raises(KeyboardInterrupt):
+        cli._poll_queue_serial(None, 0, 30, True, 10, {})
+
+    assert [timer.stages["sqs_receive"] for timer in timers] == [1.0, 1.0, 1.0]
+    assert all(timer.timings()["total"] >= 1.0 for timer in timers)
@@ -0,0 +1,58 @@
+from app.embeddings.query_cache import QueryEmbeddingCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SharedCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get_many(self, model_name, keys):
+        return {key: self.entries[(model_name, key)] for key in keys if (model_name, key) in self.entries}
+
+    def set_many(self, model_name, entries):
+        for key, embedding in entries.items():
+            self.entries[(model_name, key)] = embedding
+
+
+def test_queries_are_keyed_by_model_and_normalized_text():
+    cache = QueryEmbeddingCache()
+    cache.set("model-a", "What is  the budget?", [0.5, 0.25])
+
+    assert cache.get("model-a", " What is the budget? ") == [0.5, 0.25]
+    assert cache.get("model-b", "What is the budget?") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_entries_expire_and_are_evicted_least_recently_used_first():
+    clock = FakeClock()
+    cache = QueryEmbeddingCache(max_entries=2, ttl=10, clock=clock)
+    cache.set("m", "a", [1.0])
+    cache.set("m", "b", [2.0])
+    cache.get("m", "a")
+    cache.set("m", "c", [3.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == [1.0]
+
+    clock.now = 11
+    assert cache.get("m", "a") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_misses_fall_back_to_the_shared_cache():
+    shared = SharedCache()
+    QueryEmbeddingCache(shared=shared).set("m", "question", [1.0, 2.0])
+
+    cache = QueryEmbeddingCache(shared=shared)
+    assert cache.get("m", "question") == [1.0, 2.0]
+    assert cache.get("m", "question") == [1.0, 2.0]
+    assert (cache.stats()["shared_hits"], cache.stats()["hits"]) == (1, 1)
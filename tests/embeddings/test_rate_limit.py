@@ -0,0 +1,156 @@
+import asyncio
+import threading
+
+from openai import DEFAULT_MAX_RETRIES
+import pytest
+
+from app.embeddings import rate_limit
+from app.embeddings.embedders import OpenAIEmbedder
+from app.embeddings.rate_limit import RateGovernor, openai_max_retries, parse_reset
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, headers):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"headers": headers})()
+
+
+class ServerError(Exception):
+    status_code = 500
+
+
+class FlakyEmbeddings:
+    """``embeddings.with_raw_response`` that fails with a 500 first."""
+
+    def __init__(self):
+        self.with_raw_response = self
+        self.calls = 0
+
+    def create(self, model, input):
+        self.calls += 1
+        if self.calls == 1:
+            raise ServerError("internal server error")
+        data = [
+            type("Item", (), {"index": index, "embedding": [float(index)]})()
+            for index in range(len(input))
+        ]
+        return type(
+            "Raw",
+            (),
+            {"headers": {}, "parse": lambda self: type("Response", (), {"data": data})()},
+        )()
+
+
+def test_parse_reset_handles_openai_durations():
+    assert parse_reset("1s") == 1
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("2.5") == 2.5
+    assert parse_reset("soon") is None
+
+
+def test_reserve_waits_when_token_budget_is_spent():
+    governor = RateGovernor(tokens_per_minute=600)
+    assert governor.reserve(600) == 0
+    # 600 tokens per minute refill at 10 per second.
+    assert governor.reserve(100) == pytest.approx(10, rel=0.05)
+
+
+def test_rate_limit_halves_budget_and_blocks():
+    governor = RateGovernor(tokens_per_minute=1000)
+    governor.record_rate_limited({"retry-after-ms": "1500"})
+    wait = governor.reserve(10)
+    assert 1.0 < wait <= 1.5
+    with governor._locked_state() as state:
+        assert state["factor"] == 0.5
+
+
+def test_successful_calls_grow_the_budget_back():
+    governor = RateGovernor(tokens_per_minute=1000)
+    governor.record_rate_limited({"retry-after": "0"})
+    for _ in range(5):
+        governor.record_response({})
+    with governor._locked_state() as state:
+        assert state["factor"] == pytest.approx(0.6)
+
+
+def test_call_retries_rate_limited_requests():
+    governor = RateGovernor()
+    attempts = []
+
+    def func():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited({"retry-after-ms": "10"})
+        return "ok"
+
+    assert governor.call(func, 10) == "ok"
+    assert len(attempts) == 3
+    assert governor.rate_limited == 2
+    assert governor.throttled_seconds > 0
+
+
+def test_call_retries_server_errors_after_a_backoff(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RETRY_BACKOFF", 0.001)
+    embeddings = FlakyEmbeddings()
+    client = type("Client", (), {"embeddings": embeddings})()
+    embedder = OpenAIEmbedder(client=client, model="text-embedding-3-small", governor=RateGovernor())
+
+    assert embedder.embed_batch(["a", "b"]) == [[0.0], [1.0]]
+    assert embeddings.calls == 2
+    assert embedder.governor.rate_limited == 0
+
+
+def test_call_does_not_retry_client_errors():
+    governor = RateGovernor()
+    attempts = []
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    def func():
+        attempts.append(1)
+        raise BadRequest("bad request")
+
+    with pytest.raises(BadRequest):
+        governor.call(func, 10)
+    assert len(attempts) == 1
+
+
+def test_state_file_is_shared_between_governors(tmp_path):
+    path = str(tmp_path / "model.json")
+    first = RateGovernor(tokens_per_minute=600, state_path=path)
+    second = RateGovernor(tokens_per_minute=600, state_path=path)
+    assert first.reserve(600) == 0
+    assert second.reserve(100) > 0
+
+
+def test_call_async_keeps_locking_and_file_io_off_the_event_loop(tmp_path):
+    governor = RateGovernor(state_path=str(tmp_path / "state.json"))
+    threads = []
+    for name in ("reserve", "record_response", "record_rate_limited"):
+        method = getattr(governor, name)
+
+        def _recorded(*args, _method=method):
+            threads.append(threading.current_thread())
+            return _method(*args)
+
+        setattr(governor, name, _recorded)
+    attempts = []
+
+    async def func():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise RateLimited({"retry-after-ms": "10"})
+        return "ok"
+
+    assert asyncio.run(governor.call_async(func, 10)) == "ok"
+    assert len(threads) >= 4
+    assert threading.main_thread() not in threads
+
+
+def test_governed_clients_do_not_retry_on_their_own():
+    assert openai_max_retries({"OPENAI_RATE_LIMIT": "true"}) == 0
+    assert openai_max_retries({"OPENAI_RATE_LIMIT": "false"}) == DEFAULT_MAX_RETRIES
@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import tempfile
+from tempfile import SpooledTemporaryFile
+from types import SimpleNamespace
+
+from flask import Flask
+from openpyxl import Workbook
+from pptx import Presentation
+from pptx.util import Inches
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+import pytest
+
+from app import cli
+from app.cli import _extract_text, _iter_text, _iter_text_content
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PPTX = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+def _spooled(write, max_size=64):
+    # A small max_size makes the file roll over to disk like a large upload.
+    handle = SpooledTemporaryFile(max_size=max_size)
+    write(handle)
+    handle.seek(0)
+    return handle
+
+
+def _workbook(handle):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Prices"
+    sheet.append(["item", "price"])
+    sheet.append(["apple", 3])
+    workbook.save(handle)
+
+
+def test_spreadsheets_are_read_from_a_spooled_file():
+    with _spooled(_workbook) as handle:
+        parts = list(_iter_text_content("prices.xlsx", XLSX, handle))
+    assert parts == ["# Sheet: Prices", "item\tprice", "apple\t3"]
+
+
+def test_presentations_are_read_from_a_spooled_file():
+    def _presentation(handle):
+        presentation = Presentation()
+        slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+        box = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1))
+        box.text_frame.text = "Quarterly results"
+        presentation.save(handle)
+
+    with _spooled(_presentation) as handle:
+        parts = list(_iter_text_content("deck.pptx", PPTX, handle))
+    assert parts == ["# Slide 1", "Quarterly results"]
+
+
+def test_text_is_sniffed_and_decoded_from_the_file():
+    with _spooled(lambda handle: handle.write("héllo wörld".encode()), max_size=4) as handle:
+        assert list(_iter_text_content("notes", None, handle)) == ["héllo wörld"]
+
+
+def test_pool_extraction_reads_a_named_copy_of_the_file():
+    document = SimpleNamespace(original_filename="prices.xlsx", content_type=XLSX)
+    with _spooled(_workbook) as handle, ThreadPoolExecutor(max_workers=1) as executor:
+        text = _extract_text(document, handle, executor=executor)
+    assert text == "# Sheet: Prices\nitem\tprice\napple\t3"
+
+
+def _pdf(page_count):
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for number in range(1, page_count + 1):
+        page = writer.add_blank_page(200, 200)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 20 100 Td (Page {number}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+    handle = BytesIO()
+    writer.write(handle)
+    handle.seek(0)
+    return handle
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=3)
+        self.submitted = []
+        self.ranges = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted.append(fn)
+        return super().submit(fn, *args, **kwargs)
+
+    def map(self, fn, *iterables):
+        paths, starts, stops = iterables
+        starts, stops = list(starts), list(stops)
+        self.ranges.extend(zip(starts, stops))
+        return super().map(fn, paths, starts, stops)
+
+
+@pytest.fixture()
+def pdf_settings(monkeypatch, tmp_path):
+    # Temp copies land in tmp_path so the tests can check they are removed.
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    app = Flask(__name__)
+    app.config.update(PDF_PARALLEL_MIN_PAGES=4, PDF_PAGES_PER_TASK=2)
+    with app.app_context():
+        yield tmp_path
+
+
+def _pdf_document():
+    return SimpleNamespace(original_filename="report.pdf", content_type="application/pdf")
+
+
+def test_large_pdfs_are_extracted_in_page_ranges_in_order(pdf_settings):
+    with RecordingExecutor() as executor:
+        pages = list(_iter_text(_pdf_document(), _pdf(5), executor=executor))
+
+    assert pages == [f"Page {number}" for number in range(1, 6)]
+    assert executor.ranges == [(0, 2), (2, 4), (4, 5)]
+    assert executor.submitted == [cli._extract_pdf_pages] * 3
+    assert list(pdf_settings.iterdir()) == []
+
+
+def test_small_pdfs_are_extracted_in_one_task(pdf_settings):
+    with RecordingExecutor() as executor:
+        pages = list(_iter_text(_pdf_document(), _pdf(3), executor=executor))
+
+    assert pages == ["Page 1", "Page 2", "Page 3"]
+    assert executor.ranges == []
+    assert executor.submitted == [cli._extract_text_parts]
+    assert list(pdf_settings.iterdir()) == []
+
+
+def test_parallel_extraction_removes_its_copy_when_stopped_early(pdf_settings):
+    with RecordingExecutor() as executor:
+        pages = _iter_text(_pdf_document(), _pdf(6), executor=executor)
+        assert next(pages) == "Page 1"
+        assert len(list(pdf_settings.iterdir())) == 1
+        pages.close()
+
+    assert list(pdf_settings.iterdir()) == []
@@ -0,0 +1,86 @@
+import asyncio
+
+from flask import Flask
+
+from app.cli import _AsyncEmbeddingWorker
+from app.embeddings import DiskEmbeddingCache, JobTimer
+from app.embeddings.cache import normalized_hash
+
+
+class FakeAsyncEmbedder:
+    model_name = "openai:fake"
+    encoding_model = "cl100k_base"
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def embed_batch(self, texts, token_count=None):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [[float(len(text))] for text in texts]
+
+
+def _worker(embedder, max_embedding_requests, app=None, **overrides):
+    settings = {
+        "max_downloads": 1,
+        "max_extractions": 1,
+        "max_db_writes": 1,
+        "max_embedding_requests": max_embedding_requests,
+        "chunk_size": 10,
+        "embedding_batch_options": (2, None),
+        **overrides,
+    }
+    return _AsyncEmbeddingWorker(app, None, None, embedder, settings)
+
+
+def test_embed_keeps_requests_in_flight_up_to_the_limit():
+    embedder = FakeAsyncEmbedder()
+    worker = _worker(embedder, max_embedding_requests=3)
+    texts = [f"chunk-{index}" for index in range(20)]
+
+    async def _run():
+        worker.stages = {"embedding_requests": asyncio.BoundedSemaphore(3)}
+        return await worker._embed(texts)
+
+    try:
+        vectors = asyncio.run(_run())
+    finally:
+        worker.close()
+
+    assert vectors == {text: [float(len(text))] for text in texts}
+    assert embedder.calls == 10
+    assert embedder.peak == 3
+
+
+def test_embed_cached_only_sends_cache_misses(tmp_path, capsys):
+    cache = DiskEmbeddingCache(root=str(tmp_path))
+    cache.set_many("openai:fake", {normalized_hash("cached  chunk"): [42.0]})
+    embedder = FakeAsyncEmbedder()
+    worker = _worker(
+        embedder, max_embedding_requests=2, app=Flask(__name__), embedding_cache=cache
+    )
+
+    async def _run():
+        worker.loop = asyncio.get_running_loop()
+        worker.stages = {
+            "embedding_requests": asyncio.BoundedSemaphore(2),
+            "db_writes": asyncio.BoundedSemaphore(1),
+        }
+        return await worker._embed_cached(["cached chunk", "new chunk"], JobTimer())
+
+    try:
+        vectors = asyncio.run(_run())
+    finally:
+        worker.close()
+
+    assert vectors == {"cached chunk": [42.0], "new chunk": [9.0]}
+    assert embedder.calls == 1
+    assert cache.get_many("openai:fake", {normalized_hash("new chunk")}) == {
+        normalized_hash("new chunk"): [9.0]
+    }
+    assert "Embedding cache hits: 1, misses: 1" in capsys.readouterr().out
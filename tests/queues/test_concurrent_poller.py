@@ -0,0 +1,132 @@
+import json
+import threading
+
+import pytest
+
+from app import cli
+
+
+class StopPolling(Exception):
+    pass
+
+
+class FakeQueue:
+    delete_batch_size = 10
+
+    def __init__(self, batches, events):
+        self.batches = list(batches)
+        self.events = events
+        self.empty_receives = 0
+
+    def receive(self, max_messages=1, wait_time=0, visibility_timeout=30):
+        if self.batches:
+            return self.batches.pop(0)
+        self.empty_receives += 1
+        if self.empty_receives > 3:
+            raise StopPolling()
+        return []
+
+    def delete_batch(self, receipt_handles):
+        self.events.extend(("deleted", handle) for handle in receipt_handles)
+        return []
+
+
+def _message(handle, key):
+    return {
+        "ReceiptHandle": handle,
+        "Body": json.dumps({"bucket": "bucket", "key": key}),
+    }
+
+
+def _poll(monkeypatch, batches, jobs, concurrency=4):
+    """Run the concurrent poller until ``batches`` are drained.
+
+    ``jobs`` maps a receipt handle to a callable returning the job result.
+    """
+    events = []
+
+    def _process(app, message, options, timer=None):
+        handle = message["ReceiptHandle"]
+        events.append(("started", handle))
+        try:
+            return jobs[handle]()
+        finally:
+            events.append(("finished", handle))
+
+    monkeypatch.setattr(cli, "_process_sqs_message_in_context", _process)
+    queue = FakeQueue(batches, events)
+    with pytest.raises(StopPolling):
+        cli._poll_queue_concurrent(None, queue, 0, 30, True, 10, concurrency, {})
+    return events
+
+
+def test_messages_for_a_document_in_flight_are_deferred(monkeypatch):
+    release = threading.Event()
+
+    def _first():
+        assert release.wait(5)
+        return True
+
+    def _other():
+        release.set()
+        return True
+
+    events = _poll(
+        monkeypatch,
+        [
+            [_message("a", "docs/one.pdf")],
+            [_message("b", "docs/one.pdf"), _message("c", "docs/two.pdf")],
+        ],
+        {"a": _first, "c": _other},
+    )
+
+    started = [handle for event, handle in events if event == "started"]
+    deleted = [handle for event, handle in events if event == "deleted"]
+    assert started == ["a", "c"]
+    assert sorted(deleted) == ["a", "c"]
+
+
+def test_messages_are_acknowledged_after_their_job_finishes(monkeypatch):
+    events = _poll(
+        monkeypatch,
+        [[_message("a", "docs/one.pdf"), _message("b", "docs/two.pdf")]],
+        {"a": lambda: True, "b": lambda: True},
+    )
+
+    for handle in ("a", "b"):
+        assert events.index(("finished", handle)) < events.index(("deleted", handle))
+
+
+def test_failed_jobs_are_not_deleted(monkeypatch):
+    def _crash():
+        raise RuntimeError("worker crashed")
+
+    events = _poll(
+        monkeypatch,
+        [
+            [
+                _message("ok", "docs/one.pdf"),
+                _message("failed", "docs/two.pdf"),
+                _message("crashed", "docs/three.pdf"),
+            ]
+        ],
+        {"ok": lambda: True, "failed": lambda: False, "crashed": _crash},
+    )
+
+    assert [handle for event, handle in events if event == "deleted"] == ["ok"]
+
+
+def test_malformed_messages_have_no_document_key():
+    assert cli._message_document_key({"ReceiptHandle": "bad", "Body": "not json"}) is None
+    assert cli._message_document_key(_message("ok", "docs/one+two.pdf")) == "docs/one two.pdf"
+
+
+def test_malformed_messages_do_not_stop_the_poller(monkeypatch):
+    events = _poll(
+        monkeypatch,
+        [[{"ReceiptHandle": "bad", "Body": "not json"}, _message("ok", "docs/one.pdf")]],
+        {"bad": lambda: False, "ok": lambda: True},
+    )
+
+    assert {handle for event, handle in events if event == "started"} == {"bad", "ok"}
+    assert [handle for event, handle in events if event == "deleted"] == ["ok"]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.models.queue_message import QueueMessage
+from app.queues import DatabaseQueueService, QueueError
+
+
+@pytest.fixture()
+def queue(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    QueueMessage.__table__.create(engine)
+    yield DatabaseQueueService(engine=engine, queue_name="embeddings", poll_interval=0.01)
+    engine.dispose()
+
+
+def _bodies(messages):
+    return [json.loads(message["Body"])["n"] for message in messages]
+
+
+def test_receive_returns_batches_in_send_order(queue):
+    for n in range(5):
+        queue.send(json.dumps({"n": n}))
+
+    first = queue.receive(max_messages=3, visibility_timeout=30)
+    second = queue.receive(max_messages=3, visibility_timeout=30)
+
+    assert _bodies(first) == [0, 1, 2]
+    assert _bodies(second) == [3, 4]
+    assert queue.receive(max_messages=3) == []
+
+
+def test_messages_reappear_after_the_visibility_timeout(queue):
+    queue.send(json.dumps({"n": 1}))
+    [first] = queue.receive(visibility_timeout=0)
+    [second] = queue.receive(visibility_timeout=30)
+
+    assert second["MessageId"] == first["MessageId"]
+    assert second["ReceiptHandle"] != first["ReceiptHandle"]
+    assert second["Attributes"]["ApproximateReceiveCount"] == "2"
+
+
+def test_delete_batch_reports_stale_receipt_handles(queue):
+    queue.send(json.dumps({"n": 1}))
+    [stale] = queue.receive(visibility_timeout=0)
+    [current] = queue.receive(visibility_timeout=30)
+
+    failures = queue.delete_batch([stale["ReceiptHandle"], current["ReceiptHandle"]])
+
+    assert failures == [
+        {
+            "ReceiptHandle": stale["ReceiptHandle"],
+            "SenderFault": True,
+            "Message": "The receipt handle is no longer valid.",
+        }
+    ]
+    assert queue.receive(visibility_timeout=0) == []
+
+
+def test_change_visibility_releases_and_extends_messages(queue):
+    queue.send(json.dumps({"n": 1}))
+    [message] = queue.receive(visibility_timeout=30)
+
+    queue.change_visibility(message["ReceiptHandle"], 0)
+    [message] = queue.receive(visibility_timeout=30)
+    queue.change_visibility(message["ReceiptHandle"], 60)
+
+    assert queue.receive() == []
+    with pytest.raises(QueueError):
+        queue.change_visibility("unknown", 0)
+
+
+def test_receive_waits_for_new_messages_up_to_wait_time(queue):
+    assert queue.receive(wait_time=0.05) == []
@@ -0,0 +1,57 @@
+import time
+
+import click
+import pytest
+
+from app.cli import _heartbeat_interval
+from app.queues import VisibilityHeartbeat, default_heartbeat_interval
+
+
+class FakeQueue:
+    def __init__(self):
+        self.calls = []
+
+    def change_visibility(self, receipt_handle, visibility_timeout):
+        self.calls.append(visibility_timeout)
+
+
+def test_heartbeat_extends_visibility_until_stopped():
+    queue = FakeQueue()
+    heartbeat = VisibilityHeartbeat(queue, "receipt", 30, interval=0.01)
+
+    with heartbeat:
+        time.sleep(0.1)
+    calls = len(queue.calls)
+    time.sleep(0.05)
+
+    assert heartbeat.beats >= 2
+    assert set(queue.calls) == {30}
+    assert len(queue.calls) == calls
+
+
+def test_heartbeat_releases_message_on_failure():
+    queue = FakeQueue()
+
+    with pytest.raises(RuntimeError):
+        with VisibilityHeartbeat(queue, "receipt", 30, interval=10):
+            raise RuntimeError("embedding failed")
+
+    assert queue.calls == [0]
+
+
+def test_default_interval_stays_below_the_visibility_timeout():
+    assert default_heartbeat_interval(120) == 40
+    assert default_heartbeat_interval(4) == 1
+    assert default_heartbeat_interval(2) == 1
+    assert default_heartbeat_interval(1) == pytest.approx(1 / 3)
+    assert default_heartbeat_interval(0) == 0
+
+
+def test_only_explicit_intervals_are_validated():
+    assert _heartbeat_interval(None, 1) == pytest.approx(1 / 3)
+    assert _heartbeat_interval(0, 1) == 0
+    assert _heartbeat_interval(10, 30) == 10
+    with pytest.raises(click.ClickException):
+        _heartbeat_interval(30, 30)
+    with pytest.raises(click.ClickException):
+        _heartbeat_interval(-1, 30)
@@ -0,0 +1,99 @@
+import pytest
+
+from app import cli
+from app.cli import _delete_queue_messages, _poll_queue_serial, _process_sqs_message
+from app.queues import SqsQueueService
+
+
+class FakeSQS:
+    def __init__(self, failures=None):
+        # failures: receipt handle -> list of (sender_fault) per attempt
+        self.failures = failures or {}
+        self.calls = []
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self.calls.append([entry["ReceiptHandle"] for entry in Entries])
+        failed = []
+        for entry in Entries:
+            faults = self.failures.get(entry["ReceiptHandle"])
+            if faults:
+                failed.append(
+                    {"Id": entry["Id"], "SenderFault": faults.pop(0), "Code": "Error"}
+                )
+        return {"Failed": failed}
+
+
+def _messages(count):
+    return [{"ReceiptHandle": f"rh-{index}"} for index in range(count)]
+
+
+def _queue(sqs):
+    return SqsQueueService(queue_url="queue", client=sqs)
+
+
+def test_delete_sqs_messages_sends_batches_of_ten():
+    sqs = FakeSQS()
+    assert _delete_queue_messages(_queue(sqs), _messages(23)) == 23
+    assert [len(call) for call in sqs.calls] == [10, 10, 3]
+
+
+def test_delete_sqs_messages_retries_server_failures(monkeypatch):
+    monkeypatch.setattr(cli, "QUEUE_DELETE_RETRY_DELAY", 0)
+    sqs = FakeSQS(failures={"rh-1": [False]})
+    assert _delete_queue_messages(_queue(sqs), _messages(3)) == 3
+    assert sqs.calls == [["rh-0", "rh-1", "rh-2"], ["rh-1"]]
+
+
+def test_delete_sqs_messages_drops_sender_faults(monkeypatch):
+    monkeypatch.setattr(cli, "QUEUE_DELETE_RETRY_DELAY", 0)
+    sqs = FakeSQS(failures={"rh-0": [True]})
+    assert _delete_queue_messages(_queue(sqs), _messages(2)) == 1
+    assert len(sqs.calls) == 1
+
+
+class StopPolling(Exception):
+    pass
+
+
+class FakeQueue:
+    delete_batch_size = 10
+
+    def __init__(self, batches, events):
+        self.batches = list(batches)
+        self.events = events
+
+    def receive(self, max_messages=1, wait_time=0, visibility_timeout=30):
+        if not self.batches:
+            raise StopPolling()
+        return self.batches.pop(0)
+
+    def delete_batch(self, receipt_handles):
+        self.events.append(("deleted", list(receipt_handles)))
+        return []
+
+
+def test_serial_worker_acknowledges_each_message_when_its_job_ends(monkeypatch):
+    events = []
+
+    def _process(message, timer=None, **options):
+        events.append(("processed", message["ReceiptHandle"]))
+        return message["ReceiptHandle"] != "rh-1"
+
+    monkeypatch.setattr(cli, "_process_sqs_message", _process)
+    queue = FakeQueue([_messages(3)], events)
+
+    with pytest.raises(StopPolling):
+        _poll_queue_serial(queue, 0, 30, True, 10, {})
+
+    assert events == [
+        ("processed", "rh-0"),
+        ("deleted", ["rh-0"]),
+        ("processed", "rh-1"),
+        ("processed", "rh-2"),
+        ("deleted", ["rh-2"]),
+    ]
+
+
+def test_malformed_messages_are_skipped():
+    message = {"ReceiptHandle": "rh", "Body": "not json"}
+    assert _process_sqs_message(message, None, 10, 2) is False
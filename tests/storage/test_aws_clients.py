@@ -0,0 +1,51 @@
+from app.helpers import aws_helpers
+from app.helpers.aws_helpers import aws_client_options, clear_aws_clients, get_aws_client
+from app.storage.services import AmazonStorageService
+
+
+def _client(**overrides):
+    settings = {
+        "region": "us-east-1",
+        "endpoint_url": "http://localhost:4566",
+        "access_key_id": "test-access-key",
+        "secret_access_key": "test-secret-key",
+    }
+    settings.update(overrides)
+    return get_aws_client("s3", **settings)
+
+
+def test_get_aws_client_reuses_client_for_same_settings():
+    clear_aws_clients()
+    assert _client() is _client()
+    assert _client(region="eu-west-1") is not _client()
+    clear_aws_clients()
+
+
+def test_aws_client_options_are_applied():
+    clear_aws_clients()
+    options = aws_client_options({"AWS_MAX_POOL_CONNECTIONS": 7, "AWS_MAX_ATTEMPTS": 2})
+    client = get_aws_client("s3", region="us-east-1", options=options)
+    assert client.meta.config.max_pool_connections == 7
+    assert client.meta.config.retries["mode"] == "standard"
+    clear_aws_clients()
+
+
+def test_clients_are_rebuilt_after_fork():
+    clear_aws_clients()
+    before = _client()
+    aws_helpers._reset_after_fork()
+    assert _client() is not before
+    clear_aws_clients()
+
+
+def test_storage_service_shares_pooled_client():
+    clear_aws_clients()
+    service = AmazonStorageService(
+        bucket="test-bucket",
+        region="us-east-1",
+        access_key_id="test-access-key",
+        secret_access_key="test-secret-key",
+        endpoint_url="http://localhost:4566",
+    )
+    assert service._client is _client(options=None)
+    clear_aws_clients()
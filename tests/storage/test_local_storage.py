@@ -0,0 +1,127 @@
+import io
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from flask import Flask
+
+from app import create_app, db
+from app.storage import build_storage_service
+from app.storage.services import LocalStorageService, StorageError
+from tests.factories import DocumentFactory
+from tests.settings import TestConfig
+
+
+class LocalStorageConfig(TestConfig):
+    STORAGE_BACKEND = "local"
+
+
+@pytest.fixture()
+def storage(tmp_path):
+    return LocalStorageService(root=str(tmp_path / "files"), secret_key="secret")
+
+
+@pytest.fixture()
+def local_app(monkeypatch, tmp_path):
+    monkeypatch.setenv("STORAGE_LOCAL_ROOT", str(tmp_path))
+    app = create_app(LocalStorageConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_save_read_open_and_delete(storage):
+    storage.save("a/doc.txt", b"hello")
+    storage.save("b.txt", io.BytesIO(b"streamed"))
+    storage.save("empty", b"")
+
+    assert storage.read("a/doc.txt") == b"hello"
+    assert storage.read("empty") == b""
+    with storage.open("b.txt") as handle:
+        assert handle.read() == b"streamed"
+    assert storage.head("b.txt")["size"] == 8
+
+    storage.delete("a/doc.txt")
+    storage.delete("a/doc.txt")
+    assert storage.head("a/doc.txt") is None
+
+
+def test_failed_writes_leave_no_partial_file(storage):
+    storage.save("doc", b"original")
+
+    class Broken(io.BytesIO):
+        def read(self, *args):
+            raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        storage.save("doc", Broken())
+
+    assert storage.read("doc") == b"original"
+    assert [path.name for path in storage.path("doc").parent.iterdir()] == ["doc"]
+
+
+def test_keys_cannot_escape_the_root(storage):
+    with pytest.raises(StorageError):
+        storage.read("../outside")
+
+
+def test_symlinked_roots_accept_keys_inside_them(tmp_path):
+    target = tmp_path / "target"
+    target.mkdir()
+    (tmp_path / "link").symlink_to(target, target_is_directory=True)
+    storage = LocalStorageService(root=str(tmp_path / "link"), secret_key="secret")
+
+    storage.save("a/doc.txt", b"hello")
+
+    assert storage.read("a/doc.txt") == b"hello"
+    assert (target / "a" / "doc.txt").read_bytes() == b"hello"
+    with pytest.raises(StorageError):
+        storage.read("../link-outside")
+
+
+def test_signed_urls_are_bound_to_method_and_key(storage):
+    query = parse_qs(urlsplit(storage.url("doc", expires_in=60)).query)
+    expires, signature = query["expires"][0], query["signature"][0]
+
+    assert storage.verify("GET", "doc", expires, signature)
+    assert not storage.verify("PUT", "doc", expires, signature)
+    assert not storage.verify("GET", "other", expires, signature)
+    assert not storage.verify("GET", "doc", "1", signature)
+
+
+def test_build_storage_service_selects_local(monkeypatch, tmp_path):
+    monkeypatch.setenv("FLASK_ENV", "test")
+    app = Flask(__name__)
+    app.config.update(
+        STORAGE_BACKEND="local", STORAGE_LOCAL_ROOT=str(tmp_path), SECRET_KEY="secret"
+    )
+    assert isinstance(build_storage_service(app), LocalStorageService)
+
+
+def test_storage_routes_upload_and_serve_files(local_app):
+    client = local_app.test_client()
+    storage = local_app.extensions["storage"]
+
+    upload = storage.presigned_upload("doc.txt", content_type="text/plain", max_bytes=5)
+    assert client.put(upload["url"], data=b"toolong").status_code == 413
+    assert client.put(upload["url"], data=b"hello", headers=upload["headers"]).status_code == 200
+
+    response = client.get(storage.url("doc.txt"))
+    assert response.status_code == 200
+    assert response.data == b"hello"
+    assert response.mimetype == "application/octet-stream"
+    assert client.get("/storage/doc.txt").status_code == 403
+
+
+def test_storage_route_serves_the_document_content_type(local_app):
+    client = local_app.test_client()
+    storage = local_app.extensions["storage"]
+    key = "documents/3f2a9c0e-report"
+    storage.save(key, b"%PDF-1.7")
+    DocumentFactory(storage_key=key, storage_provider="local", content_type="application/pdf")
+
+    response = client.get(storage.url(key))
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
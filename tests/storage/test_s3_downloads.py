@@ -0,0 +1,158 @@
+import io
+
+import boto3
+import pytest
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from s3transfer.manager import TransferManager
+
+from app.helpers.aws_helpers import download_s3_fileobj, s3_transfer_options
+from app.storage.cache import CachedStorageService
+from app.storage.services import AmazonStorageService, StorageError
+
+
+class FakeS3:
+    def __init__(self, body, version_id=None):
+        self.body = body
+        self.version_id = version_id
+        self.download_args = None
+
+    def head_object(self, Bucket, Key):
+        head = {"ContentType": "text/plain", "ContentLength": len(self.body), "ETag": '"abc"'}
+        if self.version_id:
+            head["VersionId"] = self.version_id
+        return head
+
+    def download_fileobj(self, Bucket, Key, Fileobj, ExtraArgs=None, Callback=None, Config=None):
+        # s3transfer rejects anything else with a ValueError.
+        assert set(ExtraArgs or {}) <= set(TransferManager.ALLOWED_DOWNLOAD_ARGS)
+        self.download_args = {"ExtraArgs": ExtraArgs, "Config": Config}
+        # Parts may arrive out of order; the file must be seekable.
+        half = len(self.body) // 2
+        Fileobj.seek(half)
+        Fileobj.write(self.body[half:])
+        Fileobj.seek(0)
+        Fileobj.write(self.body[:half])
+
+
+def test_download_spools_to_disk_above_the_memory_limit():
+    s3 = FakeS3(b"x" * 100 + b"y" * 100, version_id="v1")
+    options = s3_transfer_options({"S3_DOWNLOAD_SPOOL_MAX_BYTES": 64})
+
+    handle, content_type, length = download_s3_fileobj(s3, "bucket", "key", options)
+    with handle:
+        assert handle._rolled
+        assert handle.read() == s3.body
+    assert (content_type, length) == ("text/plain", 200)
+    assert s3.download_args["ExtraArgs"] == {"VersionId": "v1"}
+
+
+def test_transfer_options_configure_multipart_downloads():
+    options = s3_transfer_options(
+        {"S3_TRANSFER_MULTIPART_CHUNKSIZE": 5 * 1024 * 1024, "S3_TRANSFER_MAX_CONCURRENCY": 4}
+    )
+    s3 = FakeS3(b"data")
+
+    handle, _content_type, _length = download_s3_fileobj(s3, "bucket", "key", options)
+    handle.close()
+
+    config = s3.download_args["Config"]
+    assert config.multipart_chunksize == 5 * 1024 * 1024
+    assert config.max_request_concurrency == 4
+    assert s3.download_args["ExtraArgs"] is None
+
+
+def _stub_download(stubber, body, key="key", version_id=None, etag='"abc"'):
+    head = {"ContentLength": len(body), "ContentType": "text/plain", "ETag": etag}
+    version = {"VersionId": version_id} if version_id else {}
+    head.update(version)
+    stubber.add_response("head_object", head, {"Bucket": "bucket", "Key": key})
+    # s3transfer reads the size of the requested version before fetching it.
+    stubber.add_response("head_object", head, {"Bucket": "bucket", "Key": key, **version})
+    stubber.add_response(
+        "get_object",
+        {"Body": StreamingBody(io.BytesIO(body), len(body)), "ContentLength": len(body)},
+        {"Bucket": "bucket", "Key": key, **version},
+    )
+
+
+def _stubbed_client(body, version_id=None):
+    client = boto3.client(
+        "s3",
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    stubber = Stubber(client)
+    _stub_download(stubber, body, version_id=version_id)
+    return client, stubber
+
+
+def test_download_through_a_boto3_client_pins_the_object_version():
+    client, stubber = _stubbed_client(b"hello world", version_id="v1")
+
+    with stubber:
+        handle, content_type, length = download_s3_fileobj(client, "bucket", "key")
+        with handle:
+            assert handle.read() == b"hello world"
+        stubber.assert_no_pending_responses()
+    assert (content_type, length) == ("text/plain", 11)
+
+
+def test_download_through_a_boto3_client_without_versioning():
+    client, stubber = _stubbed_client(b"hello world")
+
+    with stubber:
+        handle, _content_type, _length = download_s3_fileobj(client, "bucket", "key")
+        with handle:
+            assert handle.read() == b"hello world"
+        stubber.assert_no_pending_responses()
+
+
+def _cached_s3(monkeypatch, tmp_path):
+    client = boto3.client(
+        "s3",
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    monkeypatch.setattr(AmazonStorageService, "_client", property(lambda self: client))
+    service = AmazonStorageService(
+        bucket="bucket",
+        region="us-east-1",
+        access_key_id="test",
+        secret_access_key="test",
+        prefix="documents",
+    )
+    return CachedStorageService(storage=service, root=str(tmp_path)), Stubber(client)
+
+
+def _cache_head(stubber, etag='"abc"'):
+    stubber.add_response(
+        "head_object",
+        {"ContentLength": 11, "ContentType": "text/plain", "ETag": etag},
+        {"Bucket": "bucket", "Key": "documents/doc"},
+    )
+
+
+def test_cache_fills_from_s3_pinned_to_the_object_version(monkeypatch, tmp_path):
+    cache, stubber = _cached_s3(monkeypatch, tmp_path)
+    _cache_head(stubber)
+    _stub_download(stubber, b"hello world", key="documents/doc", version_id="v1")
+    _cache_head(stubber)
+
+    with stubber:
+        assert cache.read("doc") == b"hello world"
+        # The second read is served from disk after a single head_object.
+        assert cache.read("doc") == b"hello world"
+        stubber.assert_no_pending_responses()
+
+
+def test_cache_rejects_objects_replaced_before_the_download(monkeypatch, tmp_path):
+    cache, stubber = _cached_s3(monkeypatch, tmp_path)
+    _cache_head(stubber, etag='"abc"')
+    _stub_download(stubber, b"hello again", key="documents/doc", etag='"def"')
+
+    with stubber, pytest.raises(StorageError):
+        cache.read("doc")
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
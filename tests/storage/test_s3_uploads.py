@@ -0,0 +1,61 @@
+import io
+import logging
+
+import pytest
+
+from app.helpers.aws_helpers import s3_transfer_options
+from app.storage.services import AmazonStorageService
+
+
+class FakeS3:
+    def __init__(self):
+        self.calls = []
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Callback=None, Config=None):
+        self.calls.append(("upload_fileobj", Key, ExtraArgs, Config))
+        while chunk := Fileobj.read(4):
+            Callback(len(chunk))
+
+    def put_object(self, **params):
+        self.calls.append(("put_object", params["Key"], params, None))
+
+
+@pytest.fixture()
+def s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(AmazonStorageService, "_client", property(lambda self: fake))
+    return fake
+
+
+def _service(**overrides):
+    settings = {
+        "bucket": "test-bucket",
+        "region": "us-east-1",
+        "access_key_id": "test-access-key",
+        "secret_access_key": "test-secret-key",
+        "prefix": "documents",
+    }
+    settings.update(overrides)
+    return AmazonStorageService(**settings)
+
+
+def test_streams_upload_with_checksum_and_transfer_config(s3, caplog):
+    options = s3_transfer_options({"S3_TRANSFER_MULTIPART_CHUNKSIZE": 16 * 1024 * 1024})
+    service = _service(transfer_options=options)
+
+    with caplog.at_level(logging.INFO, logger="app.storage.services"):
+        service.save("key.pdf", io.BytesIO(b"0123456789"), content_type="application/pdf")
+
+    [(method, key, extra_args, config)] = s3.calls
+    assert (method, key) == ("upload_fileobj", "documents/key.pdf")
+    assert extra_args == {"ContentType": "application/pdf", "ChecksumAlgorithm": "CRC32"}
+    assert config.multipart_chunksize == 16 * 1024 * 1024
+    assert "Uploaded s3 object documents/key.pdf: 10 bytes" in caplog.text
+
+
+def test_bytes_are_put_without_a_checksum_when_disabled(s3):
+    _service(checksum_algorithm=None).save("key.txt", b"hello")
+
+    [(method, _key, params, _config)] = s3.calls
+    assert method == "put_object"
+    assert "ChecksumAlgorithm" not in params
@@ -0,0 +1,89 @@
+import io
+import os
+
+import pytest
+
+from app.storage.cache import CachedStorageService
+from app.storage.services import BaseStorageService
+
+
+class FakeStorage(BaseStorageService):
+    provider = "s3"
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+
+    def save(self, key, data, content_type=None):
+        version = self.objects.get(key, (0, b""))[0] + 1
+        self.objects[key] = (version, data)
+
+    def head(self, key):
+        if key not in self.objects:
+            return None
+        version, data = self.objects[key]
+        return {"size": len(data), "content_type": None, "etag": f'"v{version}"'}
+
+    def open(self, key):
+        return io.BytesIO(self.objects[key][1])
+
+    def download(self, key, fileobj, etag=None):
+        self.downloads.append(key)
+        super().download(key, fileobj, etag=etag)
+
+    def delete(self, key):
+        self.objects.pop(key, None)
+
+
+@pytest.fixture()
+def inner():
+    return FakeStorage()
+
+
+def test_reads_are_served_from_the_cache(inner, tmp_path):
+    cache = CachedStorageService(storage=inner, root=str(tmp_path))
+    inner.save("doc", b"hello")
+
+    assert cache.read("doc") == b"hello"
+    with cache.open("doc") as handle:
+        assert handle.read() == b"hello"
+
+    assert inner.downloads == ["doc"]
+
+
+def test_changed_objects_are_fetched_again(inner, tmp_path):
+    cache = CachedStorageService(storage=inner, root=str(tmp_path))
+    inner.save("doc", b"first")
+    cache.read("doc")
+
+    inner.save("doc", b"second")
+
+    assert cache.read("doc") == b"second"
+    assert inner.downloads == ["doc", "doc"]
+    assert len(cache._versions("doc")) == 1
+
+
+def test_least_recently_read_files_are_evicted(inner, tmp_path):
+    cache = CachedStorageService(storage=inner, root=str(tmp_path), max_bytes=25)
+    for key in ("a", "b", "c"):
+        inner.save(key, b"0123456789")
+
+    cache.read("a")
+    cache.read("b")
+    os.utime(cache._versions("a")[0], (100, 100))
+    os.utime(cache._versions("b")[0], (200, 200))
+    cache.read("a")
+    cache.read("c")
+
+    assert cache._versions("b") == []
+    assert cache._versions("a") and cache._versions("c")
+
+
+def test_missing_and_oversized_objects_bypass_the_cache(inner, tmp_path):
+    cache = CachedStorageService(storage=inner, root=str(tmp_path), max_bytes=4)
+    inner.save("big", b"0123456789")
+
+    assert cache.read("big") == b"0123456789"
+    assert inner.downloads == []
+    with pytest.raises(KeyError):
+        cache.read("missing")
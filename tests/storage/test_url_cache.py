@@ -0,0 +1,70 @@
+from app.storage.url_cache import PresignedUrlCache
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeStorage:
+    def __init__(self):
+        self.signed = []
+
+    def url(self, key, expires_in=3600):
+        self.signed.append(key)
+        return f"https://bucket/{key}?n={len(self.signed)}&expires={expires_in}"
+
+
+def test_urls_are_reused_within_an_expiry_bucket():
+    clock = FakeClock(now=3000 * 400)
+    storage = FakeStorage()
+    cache = PresignedUrlCache(expires_in=3600, refresh_margin=600, clock=clock)
+
+    first = cache.get(storage, "doc-1")
+    clock.now += 2999
+    second = cache.get(storage, "doc-1")
+
+    assert second == first
+    assert storage.signed == ["doc-1"]
+    assert first["expires_at"] - clock.now >= 600
+
+
+def test_urls_are_resigned_before_they_expire():
+    clock = FakeClock(now=3000 * 400)
+    storage = FakeStorage()
+    cache = PresignedUrlCache(expires_in=3600, refresh_margin=600, clock=clock)
+
+    first = cache.get(storage, "doc-1")
+    clock.now += 3000
+    second = cache.get(storage, "doc-1")
+
+    assert second["url"] != first["url"]
+    assert second["expires_at"] == clock.now + 3600
+    assert storage.signed == ["doc-1", "doc-1"]
+
+
+def test_invalidate_and_eviction_bound_the_cache():
+    storage = FakeStorage()
+    cache = PresignedUrlCache(max_entries=2, clock=FakeClock())
+
+    for key in ("a", "b", "c"):
+        cache.get(storage, key)
+    assert len(cache) == 2
+
+    cache.invalidate("c")
+    cache.get(storage, "c")
+    assert storage.signed == ["a", "b", "c", "c"]
+
+
+def test_zero_size_disables_caching():
+    storage = FakeStorage()
+    cache = PresignedUrlCache(max_entries=0, clock=FakeClock())
+
+    cache.get(storage, "a")
+    cache.get(storage, "a")
+
+    assert storage.signed == ["a", "a"]
+    assert len(cache) == 0
@@ -0,0 +1,42 @@
+from app.operations.inquiries.answer_cache import AnswerCache
+
+
+SCOPE = ("embedding-model", "inference-model", ("policy",), 5)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_similar_questions_replay_the_cached_answer():
+    cache = AnswerCache(similarity=0.95)
+    cache.set(SCOPE, "v1", "What is the policy?", [1.0, 0.0, 0.0], ["It ", "is."])
+
+    assert cache.get(SCOPE, "v1", "what's the policy", [0.99, 0.1, 0.0]) == ["It ", "is."]
+    assert cache.get(SCOPE, "v1", "Who wrote it?", [0.0, 1.0, 0.0]) is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_answers_are_scoped_to_document_types_and_corpus_version():
+    cache = AnswerCache()
+    cache.set(SCOPE, "v1", "What is the policy?", [1.0, 0.0], ["Answer"])
+    other_scope = ("embedding-model", "inference-model", ("audit",), 5)
+
+    assert cache.get(other_scope, "v1", "What is the policy?", [1.0, 0.0]) is None
+    assert cache.get(SCOPE, "v2", "What is the policy?", [1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_and_large_answers_are_not_cached():
+    clock = FakeClock()
+    cache = AnswerCache(ttl=10, max_chars=5, clock=clock)
+    cache.set(SCOPE, "v1", "short", [1.0], ["12345"])
+    cache.set(SCOPE, "v1", "long", [1.0], ["123", "456"])
+
+    assert cache.stats()["entries"] == 1
+    clock.now = 11
+    assert cache.get(SCOPE, "v1", "short", [1.0]) is None
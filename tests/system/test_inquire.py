@@ -1,17 +1,51 @@
 from types import SimpleNamespace
 
+import pytest
+
 from app import db
+from app.embeddings import get_rate_governor
 from app.models.document_embedding import DocumentEmbedding
+from app.operations.inquiries.inquire import Inquire
 from tests.factories import DocumentFactory
 
 
+DOCUMENT_TYPE = "national_budget"
+
+RATE_LIMIT_HEADERS = {
+    "x-ratelimit-limit-tokens": "1000000",
+    "x-ratelimit-remaining-tokens": "999000",
+}
+
+
+class FakeRawResponse:
+    headers = RATE_LIMIT_HEADERS
+
+    def __init__(self, parsed):
+        self._parsed = parsed
+
+    def parse(self):
+        return self._parsed
+
+
 class FakeEmbeddings:
+    calls = 0
+
+    def __init__(self):
+        self.with_raw_response = SimpleNamespace(
+            create=lambda **kwargs: FakeRawResponse(self.create(**kwargs))
+        )
+
     def create(self, model, input):
+        FakeEmbeddings.calls += 1
         return SimpleNamespace(data=[SimpleNamespace(embedding=[0.1, 0.2, 0.3])])
 
 
 class FakeResponses:
+    calls = 0
+
     def create(self, model, input, stream=False):
+        FakeResponses.calls += 1
+        FakeResponses.prompt = input[-1]["content"]
         return [
             SimpleNamespace(type="response.output_text.delta", delta="Hello"),
             SimpleNamespace(type="response.output_text.delta", delta=" world"),
@@ -19,11 +53,38 @@ class FakeResponses:
 
 
 class FakeOpenAI:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, max_retries=None):
         self.embeddings = FakeEmbeddings()
         self.responses = FakeResponses()
 
 
+@pytest.fixture()
+def inquire(app, client, auth_headers, monkeypatch):
+    """Post to ``/inquire`` as an admin allowed ``DOCUMENT_TYPE``, with a fake OpenAI."""
+    app.config["DOCUMENT_TYPES"] = [DOCUMENT_TYPE]
+    monkeypatch.setattr("app.operations.inquiries.inquire.OpenAI", FakeOpenAI)
+
+    def post(**payload):
+        return client.post(
+            "/inquire",
+            json={"document_types": [DOCUMENT_TYPE], **payload},
+            headers=auth_headers,
+        )
+
+    return post
+
+
+def test_query_embeddings_report_rate_limit_headers_to_the_governor(tmp_path):
+    config = {"QUERY_EMBEDDING_CACHE_SIZE": 0, "OPENAI_RATE_LIMIT_DIR": str(tmp_path)}
+    inquiry = Inquire(query="What is the policy?", document_types=["policy"], config=config)
+
+    assert inquiry._embed_query(FakeOpenAI(), "text-embedding-3-small") == [0.1, 0.2, 0.3]
+
+    governor = get_rate_governor(config, "text-embedding-3-small")
+    with governor._locked_state() as state:
+        assert state["tokens_limit"] == 1000000
+
+
 def test_inquire_requires_query_and_document_types(client):
     response = client.post("/inquire", json={"document_types": ["policy"]})
     assert response.status_code == 422
@@ -55,3 +116,74 @@ def test_inquire_streams_response(client, monkeypatch):
     )
     assert response.status_code == 200
     assert response.get_data(as_text=True) == "Hello world"
+
+
+def test_inquire_validates_ef_search(inquire):
+    for ef_search in (0, 1001, "64", True):
+        response = inquire(query="hello", ef_search=ef_search)
+        assert response.status_code == 422
+        assert response.json == {"message": "ef_search must be an integer between 1 and 1000"}
+
+
+def test_inquire_reuses_cached_query_embeddings(inquire, monkeypatch):
+    monkeypatch.setattr(FakeEmbeddings, "calls", 0)
+    DocumentFactory(document_type=DOCUMENT_TYPE)
+
+    for query in ("What is the policy?", "What is  the policy? "):
+        response = inquire(query=query, k=1)
+        assert response.status_code == 200
+        assert response.get_data(as_text=True) == "Hello world"
+
+    assert FakeEmbeddings.calls == 1
+
+
+def test_inquire_replays_cached_answers_until_documents_change(inquire, monkeypatch):
+    monkeypatch.setattr(FakeResponses, "calls", 0)
+    document = DocumentFactory(document_type=DOCUMENT_TYPE)
+
+    def ask():
+        response = inquire(query="What is the policy?", k=1)
+        assert response.status_code == 200
+        return response.get_data(as_text=True)
+
+    assert ask() == "Hello world"
+    assert ask() == "Hello world"
+    assert FakeResponses.calls == 1
+
+    updated_at = document.updated_at
+    document.description = "Updated"
+    db.session.commit()
+    assert document.updated_at != updated_at
+
+    assert ask() == "Hello world"
+    assert FakeResponses.calls == 2
+    assert ask() == "Hello world"
+    assert FakeResponses.calls == 2
+
+
+def test_inquire_fuses_full_text_matches_into_vector_results(inquire, monkeypatch):
+    monkeypatch.setattr(FakeResponses, "prompt", None, raising=False)
+    document = DocumentFactory(document_type=DOCUMENT_TYPE)
+    for chunk_index, (embedding, content) in enumerate(
+        [
+            # Nearest to the fake query embedding, but without the line code.
+            ([0.1, 0.2, 0.3], "General overview of the education budget."),
+            ([-0.3, 0.2, -0.1], "Line ED-2025-017 covers school meals."),
+        ]
+    ):
+        db.session.add(
+            DocumentEmbedding(
+                document_id=document.id,
+                embedding=embedding,
+                chunk_index=chunk_index,
+                content=content,
+            )
+        )
+    db.session.commit()
+
+    response = inquire(query="ED-2025-017", k=1)
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == "Hello world"
+
+    assert "ED-2025-017 covers school meals" in FakeResponses.prompt
+    assert "General overview" not in FakeResponses.prompt